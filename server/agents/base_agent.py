@@ -1,6 +1,74 @@
+import math
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from server.utils.bulk import run_ndjson, spool
+from server.utils.gemini_client import GeminiError
+from server.utils.limits import ClientDisconnected, Overloaded, route_limiter, until_disconnected
+
+
+def gemini_http_error(e: GeminiError) -> HTTPException:
+    # Upstream throttling and open circuits tell the client when to come back.
+    headers = {"Retry-After": str(max(1, math.ceil(e.retry_after)))} if e.retry_after is not None else None
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+
+
 class BaseAgent:
     name = "agent"
 
     async def run(self, *args, **kwargs):
         raise NotImplementedError
 
+    @property
+    def limiter(self):
+        return route_limiter(self.name)
+
+    async def _admitted(self, args, kwargs):
+        limiter = self.limiter
+        await limiter.acquire()
+        try:
+            return await self.run(*args, **kwargs)
+        finally:
+            limiter.release()
+
+    async def serve(self, request: Request, *args, **kwargs):
+        """``run`` for an HTTP handler: admitted through the agent's route limiter,
+        cancelled (queued or running) when the client disconnects, with errors
+        mapped to HTTP statuses."""
+        try:
+            return await until_disconnected(request.receive, self._admitted(args, kwargs))
+        except Overloaded as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        except ClientDisconnected:
+            # Nobody is listening; the status only shows up in metrics and access logs.
+            raise HTTPException(status_code=499, detail="Client closed request")
+        except GeminiError as e:
+            raise gemini_http_error(e)
+
+    async def serve_bulk(self, request: Request, prepare, concurrency: int):
+        """NDJSON in, NDJSON out: one ``run`` per line via ``prepare`` (see
+        ``run_ndjson``), holding one ``<name>_bulk`` limiter slot for the whole stream.
+        The slot is released in the body's ``finally``: background tasks are skipped
+        when the body raises or the client disconnects."""
+        limiter = route_limiter(f"{self.name}_bulk")
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        try:
+            body = await spool(request.stream())
+        except BaseException:
+            limiter.release()
+            raise
+
+        async def lines():
+            results = run_ndjson(body, prepare, concurrency)
+            try:
+                async for line in results:
+                    yield line
+            finally:
+                limiter.release()
+                await results.aclose()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
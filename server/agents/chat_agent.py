@@ -0,0 +1,196 @@
+import asyncio
+from functools import lru_cache
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from .base_agent import BaseAgent
+from server.config.gemini import gemini
+from server.models.ai import ChatReply
+from server.utils.chat_sessions import ChatSession
+from server.utils.gemini_client import GeminiError, client
+from server.utils.json_stream import ObjectStreamParser
+from server.utils.structured import parse, parse_stats
+
+
+@lru_cache(maxsize=512)
+def _preamble(personas: Tuple[Tuple[str, str], ...]) -> str:
+    personas_text = "\n".join([f"- {name}: {bio}" for name, bio in personas])
+    return (
+        "You are simulating a short group chat for students. Here are the personas.\n"
+        f"Personas:\n{personas_text}\n\n"
+        "RULES: Reply as exactly one persona each turn. Keep it friendly and concise (<= 2 sentences)."
+        " Return strictly JSON: {\"name\": string, \"text\": string}. Do not add extra text.\n\n"
+    )
+
+
+def preamble(personas: List[dict]) -> str:
+    """Persona block and rules; identical persona lists share one cached string."""
+    return _preamble(tuple((p["name"], p.get("bio") or "") for p in personas))
+
+
+def build_prompt(personas: List[dict], history: Iterable[Tuple[str, str]], summary: str = "") -> str:
+    history_text = "\n".join([f"{role.upper()}: {text}" for role, text in history])
+    earlier = f"Earlier in this chat (summary): {summary}\n\n" if summary else ""
+    return (
+        preamble(personas)
+        + earlier
+        + f"History so far:\n{history_text}\n\n"
+        "Now produce the next reply JSON."
+    )
+
+
+def _default_name(personas: List[dict]) -> str:
+    return personas[0]["name"] if personas else "Student"
+
+
+async def _stream_events(prompt: str, personas: List[dict], model: Optional[str]) -> AsyncIterator[Tuple[str, dict]]:
+    # Yields ("name", ...) once the persona is known, then ("delta", ...) with text
+    # as it arrives, then ("done", ...) with the full reply. Text deltas seen before
+    # the name are held back so clients can always label the bubble first.
+    parser = ObjectStreamParser()
+    raw = []
+    name = None
+    pending = []
+    async for chunk in client.stream(prompt, model=model, timeout=30, schema=ChatReply):
+        raw.append(chunk)
+        for key, delta in parser.feed(chunk):
+            if key == "name" and delta is None and name is None:
+                name = str(parser.values["name"])
+                yield "name", {"name": name}
+                if pending:
+                    yield "delta", {"text": "".join(pending)}
+                    pending = []
+            elif key == "text" and delta:
+                if name is None:
+                    pending.append(delta)
+                else:
+                    yield "delta", {"text": delta}
+    complete = parser.done and all(isinstance(parser.values.get(k), str) for k in ("name", "text"))
+    parse_stats.record("chat", model or gemini.model, "ok" if complete else "schema" if parser.started else "no_json")
+    if not parser.started:
+        # Model ignored the JSON instruction; send the raw text as the reply.
+        text = "".join(raw)
+        name = _default_name(personas)
+        yield "name", {"name": name}
+        yield "delta", {"text": text}
+        yield "done", {"name": name, "text": text}
+        return
+    if name is None:
+        name = _default_name(personas)
+        yield "name", {"name": name}
+        if pending:
+            yield "delta", {"text": "".join(pending)}
+    yield "done", {"name": name, "text": str(parser.values.get("text", ""))}
+
+
+class ChatAgent(BaseAgent):
+    name = "chat"
+
+    async def run(self, personas: List[dict], messages: List[dict], model: Optional[str] = None):
+        if not gemini.api_key:
+            raise GeminiError(500, "GEMINI_API_KEY not configured")
+        prompt = build_prompt(personas, [(m["role"], m["text"]) for m in messages])
+        text = await client.generate(prompt, model=model, timeout=30, schema=ChatReply)
+        parsed = parse(text, ChatReply, "chat", model or gemini.model)
+        if parsed is None:
+            return {"name": _default_name(personas), "text": text}
+        return parsed.model_dump()
+
+    async def stream(
+        self, personas: List[dict], messages: List[dict], model: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        if not gemini.api_key:
+            raise GeminiError(500, "GEMINI_API_KEY not configured")
+        prompt = build_prompt(personas, [(m["role"], m["text"]) for m in messages])
+        async for event in _stream_events(prompt, personas, model):
+            yield event
+
+
+def _fold(summary: str, turns: List[Tuple[str, str]], max_chars: int) -> str:
+    # Local stand-in for a model summary: clipped turns appended, oldest text dropped first.
+    lines = [f"{role}: {text[:160]}" for role, text in turns]
+    return " ".join([summary, *lines]).strip()[-max_chars:]
+
+
+class ChatSessionAgent(BaseAgent):
+    """Turns of a server-side ``ChatSession``: the client sends only the new message.
+
+    The prompt is the cached persona preamble, the rolling summary, and the turns
+    still held verbatim. Turns leaving the ring buffer are folded into the summary
+    in the background (by the model, or locally if that fails or falls behind).
+    """
+
+    # Shares the /chat route limiter with ChatAgent.
+    name = "chat"
+
+    def __init__(self):
+        self._tasks = set()
+        self.summaries = 0
+        self.summary_failures = 0
+
+    def _prompt(self, session: ChatSession, text: str) -> str:
+        history = [*session.overflow, *session.history, ("user", text)]
+        return build_prompt(session.personas, history, session.summary)
+
+    def _record(self, session: ChatSession, text: str, reply: dict, model: Optional[str]) -> None:
+        max_chars = gemini.chat_max_message_chars
+        session.append("user", text, max_chars)
+        session.append(str(reply.get("name") or _default_name(session.personas)), str(reply.get("text") or ""), max_chars)
+        batch = max(1, session.history.maxlen // 2)
+        if len(session.overflow) > session.history.maxlen:
+            # Summaries are failing or lagging; never let the overflow grow unbounded.
+            session.summary = _fold(session.summary, session.overflow, gemini.chat_summary_chars)
+            session.overflow.clear()
+        elif len(session.overflow) >= batch and not session.summarizing:
+            session.summarizing = True
+            task = asyncio.ensure_future(self._summarize(session, model))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session: ChatSession, model: Optional[str]) -> None:
+        turns = list(session.overflow)
+        lines = "\n".join([f"{role}: {text}" for role, text in turns])
+        prompt = (
+            "Update the running summary of a conversation between students. "
+            f"Keep who said what, plans and open questions, in at most {gemini.chat_summary_chars // 6} words. "
+            "Return only the summary text.\n\n"
+            f"Summary so far:\n{session.summary or '(none)'}\n\nNew turns:\n{lines}"
+        )
+        try:
+            summary = (await client.generate(prompt, model=model, timeout=20)).strip()[:gemini.chat_summary_chars]
+            self.summaries += 1
+        except GeminiError:
+            summary = _fold(session.summary, turns, gemini.chat_summary_chars)
+            self.summary_failures += 1
+        finally:
+            session.summarizing = False
+        # The overflow may have been folded locally meanwhile; only drop what was summarized.
+        if session.overflow[:len(turns)] == turns:
+            del session.overflow[:len(turns)]
+            session.summary = summary
+
+    async def run(self, session: ChatSession, text: str, model: Optional[str] = None):
+        if not gemini.api_key:
+            raise GeminiError(500, "GEMINI_API_KEY not configured")
+        async with session.lock:
+            reply_text = await client.generate(self._prompt(session, text), model=model, timeout=30, schema=ChatReply)
+            parsed = parse(reply_text, ChatReply, "chat", model or gemini.model)
+            reply = parsed.model_dump() if parsed is not None else {"name": _default_name(session.personas), "text": reply_text}
+            self._record(session, text, reply, model)
+        return {**reply, "session_id": session.id}
+
+    async def stream(self, session: ChatSession, text: str, model: Optional[str] = None) -> AsyncIterator[Tuple[str, dict]]:
+        if not gemini.api_key:
+            raise GeminiError(500, "GEMINI_API_KEY not configured")
+        async with session.lock:
+            async for event, data in _stream_events(self._prompt(session, text), session.personas, model):
+                if event == "done":
+                    self._record(session, text, data, model)
+                    data = {**data, "session_id": session.id}
+                yield event, data
+
+    def stats(self) -> dict:
+        return {"summaries": self.summaries, "summary_failures": self.summary_failures, "preambles": _preamble.cache_info()._asdict()}
+
+
+agent = ChatAgent()
+session_agent = ChatSessionAgent()
@@ -0,0 +1,84 @@
+from typing import List, Optional
+
+from .base_agent import BaseAgent
+from server.config.gemini import gemini
+from server.models.ai import BatchTokens, CourseTokens
+from server.utils.batching import MicroBatcher
+from server.utils.cache import response_cache
+from server.utils import upstream
+from server.utils.gemini_client import GeminiError, client
+from server.utils.structured import parse
+from server.utils.tokens import extract_tokens
+
+
+def _normalize_tokens(toks) -> List[str]:
+    uniq = []
+    seen = set()
+    if not isinstance(toks, list):
+        return uniq
+    for t in toks:
+        u = str(t).strip().upper()
+        if u and u not in seen:
+            seen.add(u)
+            uniq.append(u)
+    return uniq
+
+
+async def _extract_batch(model_name: str, texts: List[str]) -> dict:
+    # One model call for every profile that arrived within the batching window;
+    # results are keyed by position so they can be routed back to each request.
+    if len(texts) == 1:
+        prompt = (
+            "Extract normalized course/subject tokens from the user text. "
+            "Prefer uppercase abbreviations like CSE, BIO, ECN and explicit codes like 'CSE 230'. "
+            "Return strictly JSON: {\"tokens\": [string]}.\n\nTEXT:\n" + texts[0]
+        )
+        parsed = parse(await client.generate(prompt, model=model_name, timeout=20, schema=CourseTokens), CourseTokens, "extract", model_name)
+        toks = _normalize_tokens(parsed.tokens) if parsed is not None else []
+        return {0: toks} if toks else {}
+
+    blob = "\n\n".join(f"### TEXT {i}\n{t}" for i, t in enumerate(texts))
+    prompt = (
+        "Extract normalized course/subject tokens from each numbered text below. "
+        "Prefer uppercase abbreviations like CSE, BIO, ECN and explicit codes like 'CSE 230'. "
+        "Return strictly JSON: {\"results\": [{\"id\": number, \"tokens\": [string]}]} "
+        "with one entry per text, using the number after TEXT as id.\n\n" + blob
+    )
+    parsed = parse(await client.generate(prompt, model=model_name, timeout=20, schema=BatchTokens), BatchTokens, "extract", model_name)
+    results = {}
+    for entry in parsed.results if parsed is not None else []:
+        toks = _normalize_tokens(entry.tokens)
+        if 0 <= entry.id < len(texts) and toks:
+            results[entry.id] = toks
+    return results
+
+
+extract_batcher = MicroBatcher("extract", _extract_batch)
+
+
+class ExtractAgent(BaseAgent):
+    name = "extract"
+
+    async def run(self, text: str, model: Optional[str] = None):
+        model_name = model or gemini.model
+        # Try Gemini if configured and its circuit is closed
+        if gemini.api_key and upstream.available(model_name):
+
+            async def call():
+                toks = await extract_batcher.submit(model_name, text)
+                if not toks:
+                    raise GeminiError(502, "No tokens for this profile in the batch response")
+                return toks
+
+            try:
+                toks = await response_cache.get_or_call(model_name, "extract:" + text, call)
+            except GeminiError:
+                toks = None
+            if toks:
+                return {"tokens": toks, "model_used": model_name}
+
+        # Fallback regex
+        return {"tokens": extract_tokens(text)}
+
+
+agent = ExtractAgent()
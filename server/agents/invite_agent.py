@@ -0,0 +1,105 @@
+import random
+import re
+from typing import List, Optional
+
+from .base_agent import BaseAgent
+from server.config.gemini import gemini
+from server.utils import upstream
+from server.models.ai import InviteMessages
+from server.utils.gemini_client import client
+from server.utils.structured import parse
+from server.utils.invite_pool import InvitePool
+from server.utils.students import students as student_repo
+from server.utils.tokens import extract_tokens
+
+
+_GREETING_NAME_RE = re.compile(r"^(hey|hi|hello)\s+[A-Z][a-z]+(?:\s[A-Z][a-z]+)*[,!]?\s*", re.I)
+_LEADING_NAME_RE = re.compile(r"^[A-Z][a-z]+(?:\s[A-Z][a-z]+)*[,!]?\s*")
+_GREETING_RE = re.compile(r"^(Hey|Hi|Hello)\b")
+_GREETING_PUNCT_RE = re.compile(r"^(hey|hi|hello)[^a-zA-Z0-9]*", re.I)
+_COURSE_KEY_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def _sanitize(msg: str) -> str:
+    s = msg.strip()
+    # Collapse greeting with name like "Hey Oscar," -> "Hey, "
+    s = _GREETING_NAME_RE.sub(lambda m: m.group(1).capitalize() + ", ", s)
+    # Remove starting bare name like "Oscar," or "Oscar Butler,"
+    s = _LEADING_NAME_RE.sub("", s)
+    # Ensure generic Hey at start
+    if not _GREETING_RE.match(s):
+        s = "Hey, " + s
+    s = _GREETING_PUNCT_RE.sub("Hey, ", s)
+    return s.strip()
+
+
+def _pool_keys(tokens: List[str]) -> List[str]:
+    # Most specific first: a course key from the profile, its subject, then any course.
+    course = next((t for t in tokens if _COURSE_KEY_RE.match(t)), None)
+    subject = _COURSE_KEY_RE.match(course).group(1) if course else next((t for t in tokens if t.isalpha()), None)
+    return [k for k in (course, subject) if k] + ["*"]
+
+
+def _topic(key: str) -> str:
+    m = _COURSE_KEY_RE.match(key)
+    if m:
+        return f"{m.group(1)} {m.group(2)}"
+    return "any course" if key == "*" else f"{key} courses"
+
+
+async def _refill(key: str, n: int) -> List[str]:
+    model_name = gemini.model
+    if not gemini.api_key or not upstream.available(model_name):
+        return []
+    prompt = (
+        f"Write {n} distinct study invites, each a short, friendly one-liner asking a classmate to study {_topic(key)} together. "
+        "Do NOT include anyone's name — keep them generic. "
+        "Start each with 'Hey' (no name), then the invite. Keep it casual (<= 12 words). "
+        "Return strictly a JSON array of strings."
+    )
+    parsed = parse(await client.generate(prompt, model=model_name, timeout=30, schema=InviteMessages), InviteMessages, "invites", model_name)
+    out = []
+    for text in parsed.root if parsed is not None else []:
+        if text.strip():
+            out.append(_sanitize(text)[:160])
+    return out
+
+
+invite_pool = InvitePool(_refill)
+
+
+class InviteAgent(BaseAgent):
+    name = "invites"
+
+    async def run(self, text: str, count: int = 5, model: Optional[str] = None):
+        # ``model`` is accepted for compatibility; pools are generated with the default model.
+        students = student_repo.all()
+
+        # Extract tokens locally (keeps it robust even if model fails)
+        tokens = extract_tokens(text)
+
+        # Filter by tokens if any; sample positions so only the picked students become dicts
+        pool = range(len(students))
+        if tokens:
+            pool = student_repo.match_positions(tokens) or pool
+
+        selected = students.rows(random.sample(pool, min(len(pool), max(1, min(count, 6)))))
+
+        # Messages are generic, so they come pregenerated from the pool; the model
+        # is only called in the background when a pool runs low.
+        messages = invite_pool.take(_pool_keys(tokens), len(selected), can_refill=bool(gemini.api_key))
+
+        invites = []
+        for s, message in zip(selected, messages):
+            invites.append({
+                "id": s.get("id"),
+                "name": s.get("name"),
+                "photo": s.get("photo"),
+                "major": s.get("major"),
+                "courses": s.get("courses", []),
+                "message": message,
+            })
+        return {"invites": invites}
+
+
+agent = InviteAgent()
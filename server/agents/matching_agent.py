@@ -1,12 +1,45 @@
 from .base_agent import BaseAgent
+from server.utils.scoring import ScoringEngine, roster_engine
+from server.utils.students import students as student_repo
+from server.utils.text_index import similarity_index
 
 
 class MatchingAgent(BaseAgent):
     name = "matching"
 
-    async def run(self, profile, pool=None):
-        return pool or []
+    async def run(self, profile, pool=None, k: int = 10):
+        # Score against an explicit pool when given, otherwise the whole roster.
+        engine = ScoringEngine(pool) if pool is not None else roster_engine()
+        hits = engine.score(profile, k=k, exclude_id=profile.get("id"))
+        return [{**engine.students[pos], "compatibility": score} for pos, score in hits]
 
+    def _describe(self, index, doc_id: str) -> dict:
+        store = student_repo.all()
+        pos = store.position(int(doc_id)) if doc_id.isdigit() else None
+        if pos is None:
+            pos = store.position(doc_id)
+        if doc_id in index.profiles or pos is None:
+            return {"id": doc_id, **index.profiles.get(doc_id, {})}
+        return store[pos]
 
-agent = MatchingAgent()
+    async def similar(self, profile=None, user_id=None, k: int = 10):
+        """Nearest profiles by bio/major/courses text from the local index; no model call.
+
+        Queries by ``user_id``'s indexed vector when given, otherwise by ``profile``.
+        Returns None for an unknown ``user_id``.
+        """
+        index = similarity_index()
+        if user_id is not None:
+            vector = index.vector_of(str(user_id))
+            if vector is None:
+                return None
+        else:
+            vector = index.vectorize(profile or {})
+        hits = index.query(vector, k=k, exclude=str(user_id) if user_id is not None else None)
+        return [{**self._describe(index, doc_id), "similarity": score} for doc_id, score in hits]
+
+    def upsert_profile(self, user_id: str, profile: dict) -> None:
+        similarity_index().upsert(str(user_id), {**profile, "id": user_id}, keep_profile=True)
 
+
+agent = MatchingAgent()
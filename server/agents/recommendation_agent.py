@@ -0,0 +1,50 @@
+from typing import Optional
+
+from .base_agent import BaseAgent
+from server.config.gemini import gemini
+from server.models.ai import Recommendations
+from server.utils.gemini_client import GeminiError, client
+from server.utils.hedging import hedged
+from server.utils.structured import parse
+
+
+class RecommendationAgent(BaseAgent):
+    name = "recommendations"
+
+    async def run(self, profile: dict, model: Optional[str] = None):
+        if not gemini.api_key:
+            raise GeminiError(500, "GEMINI_API_KEY not configured on server")
+
+        courses = [c.strip() for c in (profile.get("courses") or []) if c.strip()]
+        if not courses:
+            return {"courses": [], "notes": "No courses found in profile"}
+
+        prompt = (
+            "You are a study-planning assistant. Given a list of course codes and a short profile, "
+            "return only targeted study recommendations for each course. Respond strictly in JSON with this schema: "
+            "{\"courses\":[{\"course\":string,\"recommendations\":[string]}]} without extra text.\n\n"
+            f"Profile: name={profile.get('name') or ''}, major={profile.get('major') or ''}, "
+            f"availability={profile.get('availability') or ''}, bio={profile.get('bio') or ''}.\n"
+            f"Courses: {', '.join(courses)}."
+        )
+
+        async def call_model(model_name: str):
+            # (text, parsed) so each attempt is parsed, and its outcome recorded, once.
+            text = await client.generate(prompt, model=model_name, timeout=30, cache=True, schema=Recommendations)
+            return text, parse(text, Recommendations, "recommendations", model_name)
+
+        # All models failing raises the last GeminiError.
+        result = await hedged(
+            [model or gemini.model, *gemini.fallback_models],
+            call_model,
+            hedge_after=gemini.hedge_after("recommendations"),
+            validate=lambda value: value[1] is not None,
+        )
+
+        text, parsed = result.value
+        if not result.valid:
+            return {"raw": text, "model_used": result.model, "attempts": result.attempts}
+        return {**parsed.model_dump(), "model_used": result.model, "attempts": result.attempts}
+
+
+agent = RecommendationAgent()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from typing import Dict, Optional
+
+from .base_agent import BaseAgent
+from server.config.gemini import gemini
+from server.models.ai import PlanEnrichment
+from server.utils import plan_templates, upstream
+from server.utils.cache import cache_key, response_cache
+from server.utils.gemini_client import GeminiError, client
+from server.utils.presence import hub
+from server.utils.structured import parse
+from server.utils.students import course_key
+
+
+def pairing_profile(you: Optional[dict], partner: Optional[dict]) -> str:
+    # Coarse on purpose: enriched plans are shared by every pair with the same
+    # course, duration and profile, so nothing personal goes into the key or prompt.
+    def field(name):
+        return "/".join(sorted(str((s or {}).get(name) or "-").strip().lower() for s in (you, partner)))
+    return f"{field('major')};{field('availability')}"
+
+
+def _merge(plan: dict, parsed: Optional[PlanEnrichment]) -> Optional[dict]:
+    # Keep the skeleton's timing and titles; take only the rewritten descriptions.
+    if parsed is None or len(parsed.blocks) != len(plan["blocks"]):
+        return None
+    merged = []
+    for block, new in zip(plan["blocks"], parsed.blocks):
+        desc = new.desc.strip()
+        merged.append({**block, "desc": desc or block["desc"]})
+    notes = parsed.notes.strip()
+    return {**plan, "blocks": merged, "notes": notes or plan["notes"]}
+
+
+class StudyPlanAgent(BaseAgent):
+    """Plans come from precomputed templates and never wait on the model.
+
+    Gemini only enriches block descriptions, in the background. The enriched plan
+    is cached per (course, duration, pairing profile) for the next requester, and
+    pushed to the presence room returned in ``enrichment.room`` when it is ready.
+    At most ``gemini.study_plan_max_pending`` enrichments run at once; past that
+    the template is served without one.
+    """
+
+    name = "study_plan"
+
+    def __init__(self):
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.enrichments = 0
+        self.enrich_failures = 0
+        self.enrich_skipped = 0
+
+    async def run(
+        self,
+        you: Optional[dict] = None,
+        partner: Optional[dict] = None,
+        course: Optional[str] = None,
+        duration: int = 45,
+        model: Optional[str] = None,
+    ):
+        course = plan_templates.canonical_course(course)
+        plan = plan_templates.render(course, duration)
+        if not gemini.api_key:
+            return {"plan": plan, "model_used": None, "source": "template"}
+
+        model_name = model or gemini.model
+        key = f"study_plan:{course_key(course or '')}|{plan['duration']}|{pairing_profile(you, partner)}"
+        enriched = await response_cache.peek(model_name, key)
+        if enriched is not None:
+            return {"plan": {**enriched, "course": plan["course"]}, "model_used": model_name, "source": "model"}
+        if not upstream.available(model_name):
+            # Circuit open: the template is the answer; don't queue work that would be refused.
+            return {"plan": plan, "model_used": None, "source": "template"}
+
+        room = "study-plan:" + cache_key(model_name, key)[:16]
+        if key not in self._pending:
+            if len(self._pending) >= gemini.study_plan_max_pending:
+                self.enrich_skipped += 1
+                return {"plan": plan, "model_used": None, "source": "template"}
+            task = asyncio.ensure_future(self._enrich(model_name, key, plan, you, partner, room))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return {
+            "plan": plan,
+            "model_used": None,
+            "source": "template",
+            "enrichment": {"status": "pending", "room": room},
+        }
+
+    async def _enrich(self, model_name: str, key: str, plan: dict, you: Optional[dict], partner: Optional[dict], room: str) -> None:
+        prompt = (
+            f"Improve this collaborative study session plan for {plan['course']} ({plan['duration']} minutes). "
+            f"The two students' majors and availability: {pairing_profile(you, partner)}. "
+            "Keep every block's start, end and title; rewrite each desc to be specific to the course (<= 20 words). "
+            "Return STRICT JSON with shape: {\"blocks\": [ {\"desc\": string } ], \"notes\": string } "
+            f"with exactly {len(plan['blocks'])} blocks in the same order.\n\nPLAN:\n"
+            + json.dumps(plan["blocks"])
+        )
+
+        async def call():
+            text = await client.generate(prompt, model=model_name, timeout=30, schema=PlanEnrichment)
+            enriched = _merge(plan, parse(text, PlanEnrichment, "study_plan", model_name))
+            if enriched is None:
+                raise GeminiError(502, "Enrichment did not match the plan skeleton")
+            return enriched
+
+        try:
+            enriched = await response_cache.get_or_call(model_name, key, call)
+        except GeminiError:
+            self.enrich_failures += 1
+            return
+        self.enrichments += 1
+        hub.publish(room, {"type": "study_plan", "plan": enriched, "model_used": model_name})
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "enrichments": self.enrichments,
+            "enrich_failures": self.enrich_failures,
+            "enrich_skipped": self.enrich_skipped,
+        }
+
+
+agent = StudyPlanAgent()
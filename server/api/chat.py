@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
-import requests
+import json
+from server.agents.base_agent import gemini_http_error
+from server.agents.chat_agent import agent as chat_agent, session_agent
 from server.config.gemini import gemini
+from server.models.ai import ModelName
+from server.utils.chat_sessions import ChatSession, chat_sessions
+from server.utils.gemini_client import GeminiError
+from server.utils.limits import ClientDisconnected, Overloaded, route_limiter, until_disconnected
 
 
 router = APIRouter()
@@ -14,58 +21,112 @@ class ChatMessage(BaseModel):
 
 
 class Persona(BaseModel):
-    name: str
-    bio: Optional[str] = ""
+    name: str = Field(max_length=gemini.chat_max_name_chars)
+    bio: Optional[str] = Field("", max_length=gemini.chat_max_bio_chars)
 
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
-    personas: List[Persona]
-    model: Optional[str] = None
+    # Either the full history and personas on every turn, or a session_id from
+    # POST /chat/sessions plus just the new message.
+    messages: List[ChatMessage] = []
+    personas: List[Persona] = Field([], max_length=gemini.chat_max_personas)
+    session_id: Optional[str] = None
+    message: Optional[str] = None
+    model: ModelName = None
+
+
+class ChatSessionRequest(BaseModel):
+    personas: List[Persona] = Field(max_length=gemini.chat_max_personas)
+    # Optional earlier turns to seed the session with.
+    messages: List[ChatMessage] = []
+
+
+def _dump(req: ChatRequest):
+    return [p.model_dump() for p in req.personas], [m.model_dump() for m in req.messages]
+
+
+def _session(req: ChatRequest) -> ChatSession:
+    session = chat_sessions.get(req.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired chat session")
+    if not req.message:
+        raise HTTPException(status_code=422, detail="message is required with session_id")
+    return session
+
+
+# Async so the session store is only touched on the event loop, where chat turns
+# read and sweep it.
+@router.post("/chat/sessions")
+async def create_chat_session(req: ChatSessionRequest):
+    session = chat_sessions.create([p.model_dump() for p in req.personas])
+    for m in req.messages:
+        session.append(m.role, m.text, gemini.chat_max_message_chars)
+    return {"session_id": session.id, "idle_ttl": chat_sessions.idle_ttl}
+
+
+@router.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired chat session")
+    return {"ok": True}
 
 
 @router.post("/chat")
-def chat(req: ChatRequest):
-    if not gemini.api_key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
-
-    personas_text = "\n".join([f"- {p.name}: {p.bio}" for p in req.personas])
-    history_text = "\n".join([f"{m.role.upper()}: {m.text}" for m in req.messages])
-
-    prompt = (
-        "You are simulating a short group chat for students. Here are the personas.\n"
-        f"Personas:\n{personas_text}\n\n"
-        "RULES: Reply as exactly one persona each turn. Keep it friendly and concise (<= 2 sentences)."
-        " Return strictly JSON: {\"name\": string, \"text\": string}. Do not add extra text.\n\n"
-        f"History so far:\n{history_text}\n\n"
-        "Now produce the next reply JSON."
-    )
+async def chat(req: ChatRequest, request: Request):
+    if req.session_id:
+        return await session_agent.serve(request, _session(req), req.message, model=req.model)
+    personas, messages = _dump(req)
+    return await chat_agent.serve(request, personas, messages, model=req.model)
 
-    model_name = req.model or gemini.model
-    url = (
-        "https://generativelanguage.googleapis.com/v1beta/models/"
-        + model_name
-        + ":generateContent?key="
-        + gemini.api_key
-    )
-    body = {"contents": [{"parts": [{"text": prompt}]}]}
-    resp = requests.post(url, json=body, timeout=30)
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
 
-    data = resp.json()
-    try:
-        text = data["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception:
-        raise HTTPException(status_code=500, detail="Gemini response parsing error")
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    import json, re
 
-    match = re.search(r"\{[\s\S]*\}", text)
-    if not match:
-        return {"name": req.personas[0].name if req.personas else "Student", "text": text}
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    # Held for the whole stream and released in body()'s finally, which runs
+    # however the stream ends (background tasks are skipped on errors and disconnects).
+    session = _session(req) if req.session_id else None
+    limiter = route_limiter("chat_stream")
     try:
-        return json.loads(match.group(0))
-    except json.JSONDecodeError:
-        return {"name": req.personas[0].name if req.personas else "Student", "text": text}
-
+        await limiter.acquire()
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+    if session is not None:
+        events = session_agent.stream(session, req.message, model=req.model)
+    else:
+        events = chat_agent.stream(*_dump(req), model=req.model)
+    # Pull the first event before responding so upstream failures still map to an HTTP status.
+    try:
+        first = await until_disconnected(request.receive, events.__anext__())
+    except GeminiError as e:
+        limiter.release()
+        raise gemini_http_error(e)
+    except StopAsyncIteration:
+        limiter.release()
+        raise HTTPException(status_code=502, detail="Model returned an empty reply")
+    except ClientDisconnected:
+        limiter.release()
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except BaseException:
+        limiter.release()
+        raise
+
+    async def body():
+        try:
+            yield _sse(*first)
+            async for event in events:
+                yield _sse(*event)
+        except GeminiError as e:
+            yield _sse("error", {"status": e.status_code, "detail": e.detail})
+        finally:
+            limiter.release()
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,94 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+from typing import Optional
+import uuid
+from server.utils.heatmap import encode_binary, encode_delta, heatmap
+from server.utils.spatial import GeoIndex
+from server.utils.students import students as student_repo
 
 router = APIRouter()
 
+CHECK_IN_TTL = 2 * 60 * 60
+
+# The index and the heatmap are mutated by check-ins and expiry, so every handler
+# here is async and runs on the event loop rather than on threadpool threads.
+index = GeoIndex()
+_seeded_version = None
+
+
+def _ensure_seeded():
+    # Static student locations from students.json; re-seeded when the roster reloads.
+    global _seeded_version
+    version = student_repo.version
+    if version == _seeded_version:
+        return
+    for s in student_repo.all():
+        if s.get("lat") is None or s.get("lng") is None:
+            continue
+        payload = {"name": s.get("name"), "major": s.get("major"), "location": s.get("location")}
+        index.upsert(f"student:{s.get('id')}", s["lat"], s["lng"], payload=payload)
+    _seeded_version = version
+
+
+def _result(dist, point_id, entry):
+    return {"id": point_id, "lat": entry[0], "lng": entry[1], "distance_m": round(dist, 1), **entry[3]}
+
 
 @router.get("/nearby")
-def nearby(lat: float, lng: float):
-    return {"lat": lat, "lng": lng, "results": []}
+async def nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0, description="meters"),
+    k: int = Query(20, ge=1, le=500),
+):
+    _ensure_seeded()
+    hits = index.nearest(lat, lng, k=k, radius_m=radius)
+    return {"lat": lat, "lng": lng, "results": [_result(*h) for h in hits]}
 
 
 @router.post("/check-in")
-def check_in(lat: float, lng: float):
-    return {"ok": True, "lat": lat, "lng": lng}
+async def check_in(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    user_id: Optional[str] = None,
+    label: Optional[str] = None,
+):
+    _ensure_seeded()
+    point_id = f"user:{user_id}" if user_id else f"anon:{uuid.uuid4().hex}"
+    index.upsert(point_id, lat, lng, ttl=CHECK_IN_TTL, payload={"label": label} if label else None)
+    binned = heatmap.check_in(point_id, lat, lng, ttl=CHECK_IN_TTL)
+    return {"ok": True, "id": point_id, "lat": lat, "lng": lng, "expires_in": CHECK_IN_TTL, "on_campus": binned}
+
+
+@router.post("/check-out")
+async def check_out(id: Optional[str] = None, user_id: Optional[str] = None):
+    point_id = id or (f"user:{user_id}" if user_id else None)
+    if not point_id:
+        raise HTTPException(status_code=400, detail="id or user_id is required")
+    removed = index.remove(point_id)
+    heatmap.check_out(point_id)
+    return {"ok": removed, "id": point_id}
+
+
+@router.get("/heatmap/meta")
+async def heatmap_meta():
+    return heatmap.meta()
+
 
+@router.get("/heatmap")
+async def heatmap_tile(
+    zoom: int = Query(0, ge=0),
+    south: Optional[float] = None,
+    west: Optional[float] = None,
+    north: Optional[float] = None,
+    east: Optional[float] = None,
+    format: str = Query("delta", pattern="^(delta|bin)$"),
+):
+    # Live check-ins only; the roster's static locations are not density.
+    try:
+        tile = heatmap.tile(zoom, south=south, west=west, north=north, east=east)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if format == "bin":
+        return Response(content=encode_binary(tile), media_type="application/octet-stream")
+    return encode_delta(tile)
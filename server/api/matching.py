@@ -1,14 +1,87 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from typing import List, Optional
+from server.agents.matching_agent import agent as matching_agent
+from server.models.match import Match
+from server.utils.likes import likes
+from server.utils.persistence import matches
+from server.utils.presence import hub
+from server.utils.scoring import pair_score, roster_engine
+from server.utils.students import students as student_repo
 
 router = APIRouter()
 
 
+class TextProfile(BaseModel):
+    name: Optional[str] = None
+    major: Optional[str] = None
+    year: Optional[str] = None
+    courses: Optional[List[str] | str] = None
+    bio: Optional[str] = None
+
+
 @router.get("/recommendations")
-def recommendations():
-    return []
+async def recommendations(
+    user_id: Optional[int] = None,
+    courses: List[str] = Query([]),
+    major: Optional[str] = None,
+    year: Optional[str] = None,
+    availability: Optional[str] = None,
+    k: int = Query(10, ge=1, le=100),
+):
+    if user_id is not None:
+        profile = roster_engine().by_id(user_id)
+        if profile is None:
+            raise HTTPException(status_code=404, detail="Unknown user_id")
+    else:
+        profile = {"courses": courses, "major": major, "year": year, "availability": availability}
+        if not any(profile.values()):
+            return []
+    return await matching_agent.run(profile, k=k)
 
 
-@router.post("/like/{user_id}")
-def like(user_id: str):
+@router.get("/similar/{user_id}")
+async def similar_to_user(user_id: str, k: int = Query(10, ge=1, le=100)):
+    hits = await matching_agent.similar(user_id=user_id, k=k)
+    if hits is None:
+        raise HTTPException(status_code=404, detail="Unknown user_id")
+    return hits
+
+
+@router.post("/similar")
+async def similar_to_profile(profile: TextProfile, k: int = Query(10, ge=1, le=100)):
+    return await matching_agent.similar(profile=profile.model_dump(exclude_none=True), k=k)
+
+
+# Async so upserts run on the event loop thread, like the index's queries.
+@router.put("/profiles/{user_id}")
+async def upsert_profile(user_id: str, profile: TextProfile):
+    matching_agent.upsert_profile(user_id, profile.model_dump(exclude_none=True))
     return {"ok": True, "id": user_id}
 
+
+def _profile(user_id: str) -> dict:
+    # Roster ids are ints in students.json; unknown users score on an empty profile.
+    store = student_repo.all()
+    pos = store.position(int(user_id)) if user_id.isdigit() else None
+    if pos is None:
+        pos = store.position(user_id)
+    return store[pos] if pos is not None else {}
+
+
+# Async so every like is applied on the event loop thread, in order, without locks.
+@router.post("/like/{user_id}")
+async def like(user_id: str, liker_id: str):
+    try:
+        mutual = likes.like(liker_id, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not mutual:
+        return {"ok": True, "id": user_id, "match": None}
+    a, b = sorted((liker_id, user_id))
+    match = Match(id=f"match_{a}_{b}", a_user_id=a, b_user_id=b, score=pair_score(_profile(a), _profile(b)))
+    matches.put(match)
+    event = {"type": "match", "match": match.model_dump()}
+    hub.publish(f"user:{a}", event)
+    hub.publish(f"user:{b}", event)
+    return {"ok": True, "id": user_id, "match": match.model_dump()}
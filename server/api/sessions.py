@@ -1,14 +1,58 @@
-from fastapi import APIRouter
+import uuid
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from server.models.session import StudySession
+from server.utils.persistence import study_sessions
 
 router = APIRouter()
 
 
-@router.get("")
-def list_sessions():
-    return []
+class SessionCreate(BaseModel):
+    topic: Optional[str] = None
+    owner_id: Optional[str] = None
+
+
+class SessionUpdate(BaseModel):
+    topic: Optional[str] = None
+    owner_id: Optional[str] = None
+
+
+# Writes return once the session is in the worker's cache; the backend commit
+# happens in the background (see DocumentStore). Handlers that write are async so
+# the store is only touched on the event loop.
+
+
+@router.get("", response_model=List[StudySession])
+async def list_sessions(limit: int = Query(100, ge=1, le=500)):
+    return await study_sessions.list(limit)
+
+
+@router.post("", response_model=StudySession)
+async def create_session(req: Optional[SessionCreate] = None):
+    fields = req.model_dump() if req else {}
+    return study_sessions.put(StudySession(id=f"session_{uuid.uuid4().hex[:12]}", **fields))
+
+
+@router.get("/{session_id}", response_model=StudySession)
+async def get_session(session_id: str):
+    session = await study_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return session
+
 
+@router.patch("/{session_id}", response_model=StudySession)
+async def update_session(session_id: str, req: SessionUpdate):
+    session = await study_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return study_sessions.put(session.model_copy(update=req.model_dump(exclude_unset=True)))
 
-@router.post("")
-def create_session():
-    return {"id": "session_1"}
 
+@router.delete("/{session_id}")
+async def delete_session(session_id: str):
+    study_sessions.delete(session_id)
+    return {"ok": True, "id": session_id}
@@ -0,0 +1,85 @@
+from fastapi import APIRouter
+from server.agents.chat_agent import session_agent
+from server.agents.invite_agent import invite_pool
+from server.agents.study_plan_agent import agent as study_plan_agent
+from server.utils.batching import batchers
+from server.utils.cache import response_cache
+from server.utils.chat_sessions import chat_sessions
+from server.utils.heatmap import heatmap
+from server.utils.likes import likes
+from server.utils import upstream
+from server.utils.limits import limiters
+from server.utils.persistence import documents
+from server.utils.presence import hub
+from server.utils.structured import parse_stats
+from server.utils.text_index import index_stats
+
+router = APIRouter()
+
+# Async so the stats are read on the event loop, which is what mutates them;
+# from threadpool threads a dict could change size mid-iteration.
+
+
+@router.get("/cache")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/presence")
+async def presence_stats():
+    return hub.stats()
+
+
+@router.get("/batching")
+async def batching_stats():
+    return {name: b.stats() for name, b in batchers.items()}
+
+
+@router.get("/invites")
+async def invite_stats():
+    return invite_pool.stats()
+
+
+@router.get("/upstream")
+async def upstream_stats():
+    return upstream.stats()
+
+
+@router.get("/documents")
+async def document_stats():
+    return documents.stats()
+
+
+@router.get("/heatmap")
+async def heatmap_stats():
+    return heatmap.stats()
+
+
+@router.get("/likes")
+async def like_stats():
+    return likes.stats()
+
+
+@router.get("/similarity")
+async def similarity_stats():
+    return index_stats()
+
+
+@router.get("/parsing")
+async def parsing_stats():
+    return parse_stats.stats()
+
+
+@router.get("/limits")
+async def limit_stats():
+    return {name: l.stats() for name, l in limiters.items()}
+
+
+@router.get("/chat")
+async def chat_stats():
+    return {**chat_sessions.stats(), **session_agent.stats()}
+
+
+@router.get("/study-plan")
+async def study_plan_stats():
+    return study_plan_agent.stats()
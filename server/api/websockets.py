@@ -1,11 +1,71 @@
-from fastapi import APIRouter, WebSocket
+import json
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from server.utils.presence import TOKEN_SECRET, hub, verify_token
 
 router = APIRouter()
 
 
+# Connect as /ws?token=<presence token> to publish locations as that user and
+# join its user:<id> room. Without PRESENCE_TOKEN_SECRET (local development),
+# /ws?user_id=42 sets an unverified id that can publish locations only.
+# Client messages (JSON):
+#   {"type": "subscribe", "rooms": ["course:CSE 310", "building:Noble Library"]}
+#   {"type": "unsubscribe", "rooms": [...]}
+#   {"type": "location", "lat": 33.42, "lng": -111.93, "rooms": [...]}
+#   {"type": "publish", "room": "...", "data": {...}}
+#   {"type": "ping"}
+# Any message counts as a heartbeat. The server sends JSON arrays of updates,
+# at most one per broadcast tick; a refused message gets a {"type": "error"} update.
 @router.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
+async def websocket_endpoint(ws: WebSocket, token: Optional[str] = None, user_id: Optional[str] = None):
+  verified = False
+  if token is not None:
+    user_id = verify_token(token)
+    verified = user_id is not None
+  if (token is not None and not verified) or (user_id is not None and not verified and TOKEN_SECRET):
+    # Policy violation: a bad token, or a bare user_id where tokens are required.
+    await ws.close(code=1008)
+    return
   await ws.accept()
-  await ws.send_json({"hello": "world"})
-  await ws.close()
-
+  conn = hub.connect(ws.send_text, ws.close, user_id, verified)
+  await ws.send_json({"type": "hello", "id": conn.id})
+  try:
+    while True:
+      text = await ws.receive_text()
+      hub.touch(conn)
+      try:
+        msg = json.loads(text)
+      except ValueError:
+        continue
+      if not isinstance(msg, dict):
+        continue
+      kind = msg.get("type")
+      if not isinstance(msg.get("rooms") or [], list):
+        hub.refuse(conn, "rooms must be a list of room names")
+        continue
+      rooms = [str(r) for r in (msg.get("rooms") or [])]
+      if kind == "subscribe":
+        allowed = [r for r in rooms if hub.may_subscribe(conn, r)]
+        if len(allowed) < len(rooms):
+          hub.refuse(conn, "user rooms can only be joined with that user's token")
+        hub.subscribe(conn, allowed)
+      elif kind == "unsubscribe":
+        hub.unsubscribe(conn, rooms)
+      elif kind == "location":
+        if conn.user_id is None or str(msg.get("user_id", conn.user_id)) != conn.user_id:
+          hub.refuse(conn, "location updates are published as the connection's own user_id")
+          continue
+        targets = [r for r in (rooms or list(conn.rooms)) if hub.may_publish(conn, r)]
+        payload = {"lat": msg.get("lat"), "lng": msg.get("lng")}
+        hub.publish_location(targets, conn.user_id, payload)
+      elif kind == "publish" and msg.get("room"):
+        room = str(msg["room"])
+        if not hub.may_publish(conn, room):
+          hub.refuse(conn, "can only publish to rooms you have joined, and never to server rooms")
+          continue
+        hub.publish(room, msg.get("data") or {})
+  except (WebSocketDisconnect, RuntimeError):
+    pass
+  finally:
+    hub.disconnect(conn)
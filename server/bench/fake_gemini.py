@@ -0,0 +1,129 @@
+"""Local stand-in for the generativelanguage API, for benchmarks and load tests.
+
+Answers generateContent and streamGenerateContent (alt=sse) with canned JSON
+shaped after whatever the prompt asks for: bare when the request sets a
+responseSchema, otherwise fenced in a line of prose as models tend to without
+JSON mode. Latency, jitter, error rate and stream chunking are configurable:
+
+    python -m server.bench.fake_gemini --port 8090 --latency-ms 400 --error-rate 0.02
+
+then point the server at it with GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+
+LATENCY_MS = float(os.getenv('FAKE_GEMINI_LATENCY_MS', '300'))
+JITTER_MS = float(os.getenv('FAKE_GEMINI_JITTER_MS', '100'))
+ERROR_RATE = float(os.getenv('FAKE_GEMINI_ERROR_RATE', '0'))
+STREAM_CHUNKS = int(os.getenv('FAKE_GEMINI_STREAM_CHUNKS', '8'))
+
+calls = {'generate': 0, 'stream': 0, 'errors': 0, 'structured': 0}
+
+
+def _reply_for(prompt: str):
+    if 'each numbered text' in prompt:
+        ids = [int(i) for i in re.findall(r'### TEXT (\d+)', prompt)]
+        return {'results': [{'id': i, 'tokens': ['CSE 310', 'CSE'] } for i in ids]}
+    if 'distinct study invites' in prompt:
+        n = int(re.search(r'Write (\d+) distinct', prompt).group(1))
+        return [f'Hey, want to work through problem set {i} together?' for i in range(n)]
+    if 'group chat' in prompt:
+        return {'name': 'Alex', 'text': "Sounds good, let's start with the practice set and compare answers after."}
+    if 'rewrite each desc' in prompt:
+        blocks = json.loads(prompt.split('PLAN:\n', 1)[1])
+        return {'blocks': [{'desc': f"{b['title']}: focused practice on the course material."} for b in blocks], 'notes': 'Bring notes.'}
+    if 'study session plan' in prompt:
+        return {
+            'course': 'CSE 310', 'duration': 45, 'status': 'draft', 'notes': 'Bring notes.',
+            'blocks': [
+                {'start': 0, 'end': 10, 'title': 'Warm-up', 'desc': 'Review last lecture.'},
+                {'start': 10, 'end': 35, 'title': 'Problems', 'desc': 'Work the problem set together.'},
+                {'start': 35, 'end': 45, 'title': 'Wrap-up', 'desc': 'Summarize and plan next steps.'},
+            ],
+        }
+    if 'study-planning assistant' in prompt:
+        courses = re.findall(r'Courses: (.+)\.', prompt)
+        names = [c.strip() for c in courses[0].split(',')] if courses else []
+        return {'courses': [{'course': c, 'recommendations': ['Do past exams', 'Form a study group']} for c in names]}
+    if 'tokens' in prompt:
+        return {'tokens': ['CSE 310', 'CSE']}
+    return {'text': 'ok'}
+
+
+def _envelope(text: str) -> dict:
+    return {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 'STOP'}]}
+
+
+async def _delay():
+    await asyncio.sleep(max(0.0, random.gauss(LATENCY_MS, JITTER_MS)) / 1000.0)
+
+
+async def models(request: Request):
+    target = request.path_params['target']
+    _, _, method = target.partition(':')
+    body = await request.json()
+    prompt = body['contents'][0]['parts'][0]['text']
+    if random.random() < ERROR_RATE:
+        calls['errors'] += 1
+        await _delay()
+        return JSONResponse({'error': {'code': 429, 'message': 'Resource exhausted (fake)'}}, status_code=429)
+    text = json.dumps(_reply_for(prompt))
+    if (body.get('generationConfig') or {}).get('responseSchema'):
+        calls['structured'] += 1
+    else:
+        text = f'Here is the JSON you asked for:\n```json\n{text}\n```'
+    if method == 'streamGenerateContent':
+        calls['stream'] += 1
+        step = max(1, len(text) // STREAM_CHUNKS)
+
+        async def events():
+            await _delay()
+            for i in range(0, len(text), step):
+                yield f'data: {json.dumps(_envelope(text[i:i + step]))}\r\n\r\n'
+                await asyncio.sleep(LATENCY_MS / 1000.0 / STREAM_CHUNKS)
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+    if method != 'generateContent':
+        return Response(status_code=404)
+    calls['generate'] += 1
+    await _delay()
+    return JSONResponse(_envelope(text))
+
+
+async def stats(request: Request):
+    return JSONResponse(calls)
+
+
+app = Starlette(routes=[
+    Route('/v1beta/models/{target}', models, methods=['POST']),
+    Route('/stats', stats),
+])
+
+
+def main():
+    import uvicorn
+
+    global LATENCY_MS, JITTER_MS, ERROR_RATE, STREAM_CHUNKS
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--port', type=int, default=8090)
+    ap.add_argument('--latency-ms', type=float, default=LATENCY_MS)
+    ap.add_argument('--jitter-ms', type=float, default=JITTER_MS)
+    ap.add_argument('--error-rate', type=float, default=ERROR_RATE)
+    ap.add_argument('--stream-chunks', type=int, default=STREAM_CHUNKS)
+    args = ap.parse_args()
+    LATENCY_MS, JITTER_MS, ERROR_RATE, STREAM_CHUNKS = args.latency_ms, args.jitter_ms, args.error_rate, args.stream_chunks
+    uvicorn.run(app, host='127.0.0.1', port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Import-time budget for the API process (what a cold start pays before serving).
+
+Runs ``python -X importtime -c "import server.main"`` in fresh interpreters and
+reports the best run: total, self time per top-level package and the heaviest
+server modules. Exits 1 when the total is over ``--budget-ms`` or a module
+that should only load lazily (``--forbid``) was imported at startup.
+
+    python -m server.bench.importtime --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+# "import time:   self [us] | cumulative | imported package" with nesting shown by indentation.
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def profile(module: str) -> list:
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append({'module': m.group(4), 'self_us': int(m.group(1)), 'cumulative_us': int(m.group(2)), 'depth': len(m.group(3)) // 2})
+    return rows
+
+
+def _ms(us: int) -> float:
+    return round(us / 1000, 1)
+
+
+def subtree(rows: list, module: str) -> list:
+    """Rows imported by ``module`` (children are printed before their parent), itself included."""
+    end = next((i for i, r in enumerate(rows) if r['module'] == module and r['depth'] == 0), None)
+    if end is None:
+        return rows
+    start = end
+    while start > 0 and rows[start - 1]['depth'] > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def report(rows: list, module: str, top: int) -> dict:
+    rows = subtree(rows, module)
+    by_package = {}
+    for r in rows:
+        package = r['module'].split('.')[0]
+        by_package[package] = by_package.get(package, 0) + r['self_us']
+    packages = sorted(by_package.items(), key=lambda kv: -kv[1])
+    ours = sorted((r for r in rows if r['module'].startswith('server.')), key=lambda r: -r['self_us'])
+    return {
+        'module': module,
+        'total_ms': _ms(rows[-1]['cumulative_us']),
+        'modules': len(rows),
+        'packages': [{'package': name, 'self_ms': _ms(us)} for name, us in packages[:top]],
+        'server_modules': [{'module': r['module'], 'self_ms': _ms(r['self_us'])} for r in ours[:top]],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--module', default='server.main')
+    ap.add_argument('--runs', type=int, default=3, help='fresh interpreters; the fastest run is reported')
+    ap.add_argument('--top', type=int, default=10)
+    ap.add_argument('--budget-ms', type=float, default=1500)
+    ap.add_argument('--forbid', default='numpy,scipy', help='comma-separated packages that must not load at startup')
+    args = ap.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda rows: report(rows, args.module, 0)['total_ms'])
+    out = report(best, args.module, args.top)
+    forbidden = [f.strip() for f in args.forbid.split(',') if f.strip()]
+    loaded = sorted({r['module'] for r in subtree(best, args.module) if r['module'].split('.')[0] in forbidden})
+    out['budget_ms'] = args.budget_ms
+    out['forbidden_loaded'] = loaded
+    print(json.dumps(out, indent=2))
+
+    failures = []
+    if out['total_ms'] > args.budget_ms:
+        failures.append(f"import of {args.module} took {out['total_ms']} ms (budget {args.budget_ms} ms)")
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(sorted({m.split('.')[0] for m in loaded}))}")
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
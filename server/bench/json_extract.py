@@ -0,0 +1,82 @@
+"""The balanced JSON extractor against the greedy regex scrape it replaced.
+
+Replies are canned model outputs in the shapes models produce without JSON mode:
+bare, fenced, wrapped in prose, prose containing braces, and trailing notes
+with braces. Reports how many each approach recovers and the time per reply.
+Hostile replies (thousands of stray or unclosed brackets, as a chat user can
+coax out of the model) check that extraction stays linear: each should take
+milliseconds, not seconds.
+
+    python -m server.bench.json_extract --rounds 20000
+"""
+import argparse
+import json
+import re
+import time
+
+from server.utils.structured import first_json
+
+
+_OBJECT_RE = re.compile(r"\{[\s\S]*\}")
+
+_VALUE = {'name': 'Alex', 'text': 'Sounds good, start with {set 3} and compare after.'}
+_BODY = json.dumps(_VALUE)
+REPLIES = {
+    'bare': _BODY,
+    'fenced': f'```json\n{_BODY}\n```',
+    'prose': f'Sure! Here is the reply:\n{_BODY}\nLet me know if you need more.',
+    'brace_before': f'Format {{name, text}} as asked:\n{_BODY}',
+    'brace_after': f'{_BODY}\n(Use {{name}} as the label.)',
+    'long': 'Thinking it over. ' * 200 + _BODY,
+}
+HOSTILE = {
+    'stray_braces': '{' * 8000,
+    'unclosed_objects': '{"a":1' * 4000,
+    'unclosed_mixed': '{[' * 8000,
+    'unterminated_escapes': '{' + '"\\' * 8000,
+}
+
+
+def _regex(text: str):
+    m = _OBJECT_RE.search(text)
+    if not m:
+        return None
+    try:
+        return json.loads(m.group(0))
+    except json.JSONDecodeError:
+        return None
+
+
+def _time(fn, text: str, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(text)
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def bench(rounds: int) -> dict:
+    out = {}
+    for name, text in REPLIES.items():
+        out[name] = {
+            'regex_ok': _regex(text) == _VALUE,
+            'extractor_ok': first_json(text) == _VALUE,
+            'regex_us': round(_time(_regex, text, rounds), 2),
+            'extractor_us': round(_time(first_json, text, rounds), 2),
+        }
+    for name, text in HOSTILE.items():
+        out[name] = {
+            'extractor_ok': first_json(text) is None,
+            'extractor_ms': round(_time(first_json, text, max(1, rounds // 1000)) / 1000, 2),
+        }
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rounds', type=int, default=20000)
+    args = ap.parse_args()
+    print(json.dumps(bench(args.rounds), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Like ingestion rate, adjacency memory and log replay time for LikeGraph.
+
+Swipes go from random users to random users out of ``--users``; the log is
+written to a temp file and replayed into a fresh graph.
+
+    python -m server.bench.likes --users 20000 --likes 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from server.utils.likes import LikeGraph
+
+
+async def bench(args) -> dict:
+    rng = random.Random(5)
+    names = [str(i) for i in range(args.users)]
+    swipes = []
+    for _ in range(args.likes):
+        a, b = rng.sample(names, 2)
+        swipes.append((a, b))
+
+    path = tempfile.mktemp(suffix='.likes')
+    graph = LikeGraph(path)
+    t0 = time.perf_counter()
+    for a, b in swipes:
+        graph.like(a, b)
+    ingest_s = time.perf_counter() - t0
+    await graph.flush()
+
+    fresh = LikeGraph(path)
+    t0 = time.perf_counter()
+    fresh.load()
+    replay_s = time.perf_counter() - t0
+    assert fresh.stats()['mutual'] == graph.stats()['mutual']
+    size = os.path.getsize(path)
+    os.unlink(path)
+
+    stats = graph.stats()
+    return {
+        'users': args.users,
+        'swipes': args.likes,
+        'likes': stats['likes'],
+        'mutual': stats['mutual'],
+        'likes_per_s': round(args.likes / ingest_s),
+        'adjacency_mb': round(stats['adjacency_bytes'] / 1e6, 2),
+        'log_mb': round(size / 1e6, 2),
+        'replay_s': round(replay_s, 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--users', type=int, default=20000)
+    ap.add_argument('--likes', type=int, default=500000)
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(bench(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
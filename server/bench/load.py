@@ -0,0 +1,369 @@
+"""Open-loop load test for the whole FastAPI server against a local fake Gemini.
+
+Starts server.bench.fake_gemini and `uvicorn server.main:app` as subprocesses
+(GEMINI_BASE_URL pointed at the fake), then drives every router at fixed
+arrival rates concurrently. Latency is measured from each request's scheduled
+send time, so a stalled server shows up as queueing delay instead of a lower
+request rate. Prints one JSON report.
+
+    python -m server.bench.load --seconds 20 --latency-ms 300 --error-rate 0.01
+    python -m server.bench.load --save server/bench/baseline.json
+    python -m server.bench.load --baseline server/bench/baseline.json   # exit 1 on regression
+
+--scale multiplies every rate; --only picks scenarios (comma separated). Use
+--url to hit an already running server instead (no subprocesses started).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from server.bench.synthetic import make_students
+
+
+# name -> (method, path, requests per second)
+SCENARIOS = {
+    'chat': ('POST', '/ai/chat', 10),
+    'chat_stream': ('POST', '/ai/chat/stream', 5),
+    'invites': ('POST', '/ai/invites', 10),
+    'extract': ('POST', '/ai/extract', 20),
+    'recommendations': ('POST', '/ai/recommendations', 10),
+    'study_plan': ('POST', '/ai/study-plan', 10),
+    'matching': ('GET', '/matching/recommendations', 20),
+    'locations_nearby': ('GET', '/locations/nearby', 100),
+    'locations_check_in': ('POST', '/locations/check-in', 50),
+    'ws': ('WS', '/ws', 20),
+}
+
+# Campus-ish box used for location traffic.
+_LAT, _LNG = 33.4242, -111.9281
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _request(name: str, profiles: list) -> dict:
+    """Keyword arguments for httpx for one request of a scenario.
+
+    Bodies are randomized so the response cache sees realistic, mostly-cold traffic.
+    """
+    p = random.choice(profiles)
+    nonce = uuid.uuid4().hex[:6]
+    profile = {'name': p['name'], 'major': p['major'], 'courses': p['courses'], 'bio': f"{p.get('bio', '')} {nonce}"}
+    if name in ('chat', 'chat_stream'):
+        return {'json': {
+            'personas': [{'name': q['name'], 'bio': q.get('bio', '')} for q in random.sample(profiles, 3)],
+            'messages': [{'role': 'user', 'text': f'Anyone up for reviewing {random.choice(p["courses"])}? {nonce}'}],
+        }}
+    if name == 'invites':
+        return {'json': {'profile': profile, 'count': 5}}
+    if name == 'extract':
+        return {'json': {'profile': profile}}
+    if name == 'recommendations':
+        return {'json': {'profile': profile}}
+    if name == 'study_plan':
+        q = random.choice(profiles)
+        return {'json': {'you': profile, 'partner': {'name': q['name'], 'courses': q['courses']},
+                         'course': random.choice(p['courses']), 'duration': random.choice((30, 45, 60, 90))}}
+    if name == 'matching':
+        # A list, so httpx sends one courses= parameter per course as List[str] expects.
+        return {'params': {'courses': list(p['courses']), 'major': p['major'], 'k': 10}}
+    lat, lng = _LAT + random.uniform(-0.01, 0.01), _LNG + random.uniform(-0.01, 0.01)
+    if name == 'locations_nearby':
+        return {'params': {'lat': lat, 'lng': lng, 'k': 20}}
+    return {'params': {'lat': lat, 'lng': lng, 'user_id': str(random.randrange(5000))}}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.first_byte = []
+        self.statuses = {}
+        self.sent = 0
+        self.errors = 0
+
+    def record(self, status, latency, ttfb=None):
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if isinstance(status, int) and status < 400:
+            self.latencies.append(latency)
+            if ttfb is not None:
+                self.first_byte.append(ttfb)
+        else:
+            self.errors += 1
+
+    def report(self, seconds: float) -> dict:
+        done = len(self.latencies) + self.errors
+        out = {
+            'sent': self.sent,
+            'completed': done,
+            'ok': len(self.latencies),
+            'throughput_rps': round(len(self.latencies) / seconds, 2),
+            'error_rate': round(self.errors / done, 4) if done else 0.0,
+            'p50_ms': _pct(self.latencies, 0.50),
+            'p95_ms': _pct(self.latencies, 0.95),
+            'p99_ms': _pct(self.latencies, 0.99),
+            'max_ms': _pct(self.latencies, 1.0),
+            'statuses': self.statuses,
+        }
+        if self.first_byte:
+            out['ttfb_p50_ms'] = _pct(self.first_byte, 0.50)
+            out['ttfb_p95_ms'] = _pct(self.first_byte, 0.95)
+        return out
+
+
+async def _one(http: httpx.AsyncClient, name: str, method: str, path: str, profiles: list, scheduled: float, rec: Recorder, timeout: float):
+    kwargs = _request(name, profiles)
+    try:
+        if name == 'chat_stream':
+            async with http.stream(method, path, timeout=timeout, **kwargs) as r:
+                ttfb = None
+                async for _ in r.aiter_raw():
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - scheduled
+                rec.record(r.status_code, time.perf_counter() - scheduled, ttfb)
+                return
+        r = await http.request(method, path, timeout=timeout, **kwargs)
+        rec.record(r.status_code, time.perf_counter() - scheduled)
+    except httpx.TimeoutException:
+        rec.record('timeout', None)
+    except httpx.HTTPError as e:
+        rec.record(type(e).__name__, None)
+
+
+async def _drive(name: str, rate: float, seconds: float, http: httpx.AsyncClient, profiles: list, rec: Recorder, timeout: float):
+    method, path, _ = SCENARIOS[name]
+    tasks = set()
+    start = time.perf_counter()
+    total = int(rate * seconds)
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        rec.sent += 1
+        t = asyncio.ensure_future(_one(http, name, method, path, profiles, scheduled, rec, timeout))
+        tasks.add(t)
+        t.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+
+
+async def _drive_ws(url: str, rate: float, seconds: float, clients: int, rec: Recorder):
+    """Publish timestamped events into one room at `rate`; latency is publish to
+    delivery at every subscribed client."""
+    import websockets
+
+    room = 'bench:' + uuid.uuid4().hex[:6]
+    ws_url = url.replace('http', 'ws', 1) + '/ws'
+    sent_at = {}
+    conns = []
+    try:
+        for _ in range(clients):
+            c = await websockets.connect(ws_url, max_queue=None)
+            await c.recv()  # hello
+            await c.send(json.dumps({'type': 'subscribe', 'rooms': [room]}))
+            conns.append(c)
+    except OSError:
+        rec.record('connect_error', None)
+        for c in conns:
+            await c.close()
+        return
+
+    async def reader(c):
+        try:
+            async for frame in c:
+                now = time.perf_counter()
+                for ev in json.loads(frame):
+                    seq = (ev.get('data') or {}).get('seq')
+                    if seq in sent_at:
+                        rec.record(200, now - sent_at[seq])
+        except websockets.ConnectionClosed:
+            pass
+
+    readers = [asyncio.ensure_future(reader(c)) for c in conns]
+    publisher = conns[0]
+    start = time.perf_counter()
+    for seq in range(int(rate * seconds)):
+        scheduled = start + seq / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent_at[seq] = scheduled
+        rec.sent += 1
+        await publisher.send(json.dumps({'type': 'publish', 'room': room, 'data': {'seq': seq}}))
+    await asyncio.sleep(1.0)  # let the last ticks drain
+    # Deliveries are counted per client; report sends as the expected total.
+    rec.sent *= len(conns)
+    for c in conns:
+        await c.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+    missing = rec.sent - len(rec.latencies) - rec.errors
+    if missing > 0:
+        rec.errors += missing
+        rec.statuses['lost'] = missing
+
+
+async def run(url: str, names: list, scale: float, seconds: float, ws_clients: int, timeout: float) -> dict:
+    profiles = make_students(500, seed=7)
+    recorders = {n: Recorder() for n in names}
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=url, limits=limits) as http:
+        jobs = []
+        for n in names:
+            rate = SCENARIOS[n][2] * scale
+            if n == 'ws':
+                jobs.append(_drive_ws(url, rate, seconds, ws_clients, recorders[n]))
+            else:
+                jobs.append(_drive(n, rate, seconds, http, profiles, recorders[n], timeout))
+        t0 = time.perf_counter()
+        await asyncio.gather(*jobs)
+        wall = time.perf_counter() - t0
+        try:
+            server_stats = {k: (await http.get(f'/stats/{k}')).json() for k in ('cache', 'batching', 'presence')}
+        except (httpx.HTTPError, ValueError):
+            server_stats = {}
+    return {
+        'seconds': seconds,
+        'wall_seconds': round(wall, 2),
+        'scale': scale,
+        'scenarios': {n: {'rate_rps': SCENARIOS[n][2] * scale, **recorders[n].report(seconds)} for n in names},
+        'server': server_stats,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, slack_ms: float) -> dict:
+    """Per-scenario deltas against a stored report; flags p95/p99 latency growth
+    beyond ``tolerance`` (relative, plus ``slack_ms`` absolute) and any error-rate
+    increase above one percentage point."""
+    out = {}
+    for name, cur in report['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        regressions = []
+        for key in ('p95_ms', 'p99_ms'):
+            if cur.get(key) is not None and base.get(key) is not None:
+                if cur[key] > base[key] * (1 + tolerance) + slack_ms:
+                    regressions.append(f'{key} {base[key]} -> {cur[key]}')
+        if cur['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"error_rate {base['error_rate']} -> {cur['error_rate']}")
+        if base['throughput_rps'] and cur['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"throughput_rps {base['throughput_rps']} -> {cur['throughput_rps']}")
+        out[name] = {
+            'p95_ms': [base.get('p95_ms'), cur.get('p95_ms')],
+            'p99_ms': [base.get('p99_ms'), cur.get('p99_ms')],
+            'error_rate': [base['error_rate'], cur['error_rate']],
+            'throughput_rps': [base['throughput_rps'], cur['throughput_rps']],
+            'regressions': regressions,
+        }
+    return out
+
+
+def _wait_ready(url: str, procs: list, deadline: float = 30.0) -> None:
+    t0 = time.time()
+    while time.time() - t0 < deadline:
+        for p in procs:
+            if p.poll() is not None:
+                raise SystemExit(f'subprocess exited early: {p.args}')
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f'{url} did not become ready in {deadline}s')
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--seconds', type=float, default=15)
+    ap.add_argument('--scale', type=float, default=1.0)
+    ap.add_argument('--only', default='', help='comma-separated scenario names')
+    ap.add_argument('--ws-clients', type=int, default=20)
+    ap.add_argument('--timeout', type=float, default=30)
+    ap.add_argument('--url', default='', help='existing server; skips starting subprocesses')
+    ap.add_argument('--latency-ms', type=float, default=300)
+    ap.add_argument('--jitter-ms', type=float, default=100)
+    ap.add_argument('--error-rate', type=float, default=0.0)
+    ap.add_argument('--stream-chunks', type=int, default=8)
+    ap.add_argument('--workers', type=int, default=1, help='uvicorn workers for the app under test')
+    ap.add_argument('--baseline', default='', help='report to compare against; exit 1 on regression')
+    ap.add_argument('--tolerance', type=float, default=0.2)
+    ap.add_argument('--slack-ms', type=float, default=5.0)
+    ap.add_argument('--save', default='', help='write the report here (e.g. to refresh a baseline)')
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.only.split(',') if n.strip()] or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        ap.error(f'unknown scenarios: {", ".join(unknown)}')
+
+    procs = []
+    url = args.url.rstrip('/')
+    try:
+        if not url:
+            fake_port, app_port = _free_port(), _free_port()
+            procs.append(subprocess.Popen([
+                sys.executable, '-m', 'server.bench.fake_gemini', '--port', str(fake_port),
+                '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+                '--error-rate', str(args.error_rate), '--stream-chunks', str(args.stream_chunks),
+            ]))
+            env = {
+                **os.environ,
+                'GEMINI_API_KEY': os.getenv('GEMINI_API_KEY') or 'bench',
+                'GEMINI_BASE_URL': f'http://127.0.0.1:{fake_port}/v1beta',
+            }
+            procs.append(subprocess.Popen([
+                sys.executable, '-m', 'uvicorn', 'server.main:app', '--host', '127.0.0.1',
+                '--port', str(app_port), '--workers', str(args.workers), '--log-level', 'warning',
+            ], env=env))
+            url = f'http://127.0.0.1:{app_port}'
+            _wait_ready(f'http://127.0.0.1:{fake_port}/stats', procs)
+            _wait_ready(url + '/', procs)
+        report = asyncio.run(run(url, names, args.scale, args.seconds, args.ws_clients, args.timeout))
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    report['config'] = {
+        'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate, 'workers': args.workers, 'external': bool(args.url),
+    }
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report, json.load(f), args.tolerance, args.slack_ms)
+        failed = any(c['regressions'] for c in report['comparison'].values())
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
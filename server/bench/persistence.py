@@ -0,0 +1,114 @@
+"""Write-behind DocumentStore against a commit-per-request baseline.
+
+The backend is the memory or sqlite stand-in with ``--rtt-ms`` added to every
+commit to stand in for a Firestore round trip. Writers update ``--docs``
+documents at random (so repeated updates coalesce) at ``--rps`` for ``--seconds``.
+
+    python -m server.bench.persistence --backend sqlite --rtt-ms 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from server.utils.persistence import DocumentStore, MemoryStore, SqliteStore
+
+
+class _SlowBackend:
+    def __init__(self, backend, rtt: float):
+        self.backend = backend
+        self.rtt = rtt
+
+    @property
+    def commits(self):
+        return self.backend.commits
+
+    def get(self, collection, doc_id):
+        time.sleep(self.rtt)
+        return self.backend.get(collection, doc_id)
+
+    def list(self, collection, limit):
+        time.sleep(self.rtt)
+        return self.backend.list(collection, limit)
+
+    def commit(self, ops):
+        time.sleep(self.rtt)
+        self.backend.commit(ops)
+
+
+def _backend(kind: str, rtt: float):
+    inner = SqliteStore(tempfile.mktemp(suffix='.sqlite3')) if kind == 'sqlite' else MemoryStore()
+    return _SlowBackend(inner, rtt)
+
+
+async def _drive(write, n: int, docs: int, rps: float) -> list:
+    rng = random.Random(3)
+    latencies = []
+
+    async def one(i: int):
+        doc_id = f'session_{rng.randrange(docs)}'
+        t0 = time.perf_counter()
+        await write(doc_id, {'id': doc_id, 'topic': f'topic {i}', 'owner_id': 'bench'})
+        latencies.append(time.perf_counter() - t0)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(n):
+        delay = start + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(i)))
+    await asyncio.gather(*tasks)
+    return sorted(latencies)
+
+
+def _summary(latencies: list) -> dict:
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+    return {'p50_ms': pct(0.5), 'p99_ms': pct(0.99), 'mean_ms': round(statistics.mean(latencies) * 1000, 2)}
+
+
+async def bench(args) -> dict:
+    n = int(args.rps * args.seconds)
+    rtt = args.rtt_ms / 1000.0
+
+    direct = _backend(args.backend, rtt)
+
+    async def write_through(doc_id, doc):
+        await asyncio.to_thread(direct.commit, [('sessions', doc_id, doc)])
+
+    through = _summary(await _drive(write_through, n, args.docs, args.rps))
+    through['commits'] = direct.commits
+
+    store = DocumentStore(_backend(args.backend, rtt), flush_interval=args.flush_ms / 1000.0, batch_size=args.batch_size)
+    store.start()
+
+    async def write_behind(doc_id, doc):
+        store.put('sessions', doc_id, doc)
+
+    behind = _summary(await _drive(write_behind, n, args.docs, args.rps))
+    await store.close()
+    behind.update({k: store.stats()[k] for k in ('commits', 'coalesced', 'flushed_docs')})
+
+    return {'writes': n, 'docs': args.docs, 'rtt_ms': args.rtt_ms, 'write_through': through, 'write_behind': behind}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--backend', choices=['memory', 'sqlite'], default='sqlite')
+    ap.add_argument('--rtt-ms', type=float, default=30)
+    ap.add_argument('--rps', type=float, default=500)
+    ap.add_argument('--seconds', type=float, default=4)
+    ap.add_argument('--docs', type=int, default=200)
+    ap.add_argument('--flush-ms', type=float, default=500)
+    ap.add_argument('--batch-size', type=int, default=500)
+    args = ap.parse_args()
+    print(json.dumps(asyncio.run(bench(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
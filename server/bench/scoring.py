@@ -0,0 +1,62 @@
+"""Per-request latency of the compatibility scoring engine on synthetic rosters.
+
+    python -m server.bench.scoring --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import statistics
+import time
+
+from server.bench.synthetic import make_students
+from server.utils.scoring import ScoringEngine
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def bench(n: int, queries: int, batch: int, k: int) -> dict:
+    students = make_students(n)
+    t0 = time.perf_counter()
+    engine = ScoringEngine(students)
+    build = time.perf_counter() - t0
+
+    probes = [students[(i * 7919) % n] for i in range(queries)]
+    latencies = []
+    for p in probes:
+        t0 = time.perf_counter()
+        engine.score(p, k=k, exclude_id=p['id'])
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    batch_profiles = [students[(i * 104729) % n] for i in range(batch)]
+    t0 = time.perf_counter()
+    engine.score_many(batch_profiles, k=k, exclude_ids=[p['id'] for p in batch_profiles])
+    batch_s = time.perf_counter() - t0
+
+    return {
+        'students': n,
+        'features': len(engine.vocab),
+        'nnz': int(engine.matrix.nnz),
+        'build_ms': _ms(build),
+        'single_ms': {
+            'p50': _ms(latencies[len(latencies) // 2]),
+            'p95': _ms(latencies[int(len(latencies) * 0.95)]),
+            'mean': _ms(statistics.fmean(latencies)),
+        },
+        'batch': {'profiles': batch, 'total_ms': _ms(batch_s), 'per_profile_ms': _ms(batch_s / batch)},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    ap.add_argument('--queries', type=int, default=200)
+    ap.add_argument('--batch', type=int, default=1000)
+    ap.add_argument('-k', type=int, default=10)
+    args = ap.parse_args()
+    print(json.dumps([bench(n, args.queries, args.batch, args.k) for n in args.sizes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
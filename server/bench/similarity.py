@@ -0,0 +1,101 @@
+"""Build, load and query cost of the text similarity index, with recall against exact search.
+
+Synthetic students (server.bench.synthetic) get short generated bios. The index
+is saved to a temp directory and memory-mapped back before querying; recall@k
+compares the clustered search with an exhaustive scan of the same vectors.
+
+    python -m server.bench.similarity --students 100000
+"""
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from server.bench.synthetic import make_students
+from server.config.matching import matching
+from server.utils.text_index import SimilarityIndex
+
+
+_INTERESTS = (
+    'algorithms databases machine learning statistics calculus organic chemistry genetics '
+    'microeconomics econometrics writing physics circuits robotics design psychology history '
+    'flashcards whiteboard practice problems late night early morning quiet group coffee exams'
+).split()
+
+
+def _with_bios(students: list, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    for s in students:
+        s['bio'] = 'I like ' + ' and '.join(rng.sample(_INTERESTS, rng.randint(3, 7)))
+    return students
+
+
+def bench(n: int, queries: int, k: int, probes: int) -> dict:
+    students = _with_bios(make_students(n))
+    t0 = time.perf_counter()
+    index = SimilarityIndex.build(((str(s['id']), s) for s in students), matching.dim, probes, matching.min_cluster_rows)
+    build_s = time.perf_counter() - t0
+
+    path = tempfile.mkdtemp(prefix='simindex-')
+    try:
+        t0 = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        loaded = SimilarityIndex.load(path, probes, matching.min_cluster_rows)
+        load_s = time.perf_counter() - t0
+
+        rng = random.Random(2)
+        picks = [str(rng.randrange(1, n + 1)) for _ in range(queries)]
+        latencies, recalls = [], []
+        exact = np.asarray(loaded.base)
+        for doc_id in picks:
+            vector = loaded.vector_of(doc_id)
+            t0 = time.perf_counter()
+            hits = loaded.query(vector, k=k, exclude=doc_id)
+            latencies.append(time.perf_counter() - t0)
+            scores = exact @ vector
+            scores[loaded.rows[doc_id]] = -np.inf
+            kth = np.partition(-scores, k - 1)[k - 1]
+            # Ties at the k-th score count as found either way (hit scores are rounded to 4 places).
+            recalls.append(sum(1 for _, s in hits if -s <= kth + 1e-4) / k)
+
+        t0 = time.perf_counter()
+        for i in range(1000):
+            loaded.upsert(f'new-{i}', students[i])
+        upsert_us = (time.perf_counter() - t0) / 1000 * 1e6
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    latencies.sort()
+    return {
+        'students': n,
+        'clusters': len(index.centroids),
+        'probes': probes,
+        'build_s': round(build_s, 2),
+        'save_s': round(save_s, 2),
+        'load_ms': round(load_s * 1000, 1),
+        'query_p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'query_p99_ms': round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000, 3),
+        'recall_at_k': round(statistics.mean(recalls), 3),
+        'upsert_us': round(upsert_us, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--students', type=int, nargs='+', default=[100000])
+    ap.add_argument('--queries', type=int, default=500)
+    ap.add_argument('--k', type=int, default=10)
+    ap.add_argument('--probes', type=int, default=matching.probes)
+    args = ap.parse_args()
+    print(json.dumps([bench(n, args.queries, args.k, args.probes) for n in args.students], indent=2))
+
+
+if __name__ == '__main__':
+    main()
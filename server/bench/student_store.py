@@ -0,0 +1,76 @@
+"""Memory of the columnar StudentStore against the list-of-dicts roster it replaced.
+
+Both are measured with tracemalloc after parsing the same synthetic students.json
+payload, so strings are as unshared as they are when loaded from disk.
+
+    python -m server.bench.student_store --students 100000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from server.bench.synthetic import make_students
+from server.utils.student_store import StudentStore
+
+
+def _allocated(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, size
+
+
+def _timed(build) -> float:
+    # Separate from _allocated: tracing slows allocation-heavy code several times over.
+    t0 = time.perf_counter()
+    build()
+    return time.perf_counter() - t0
+
+
+def bench(n: int, lookups: int) -> dict:
+    payload = json.dumps(make_students(n)).encode('utf-8')
+    dicts, dict_bytes = _allocated(lambda: json.loads(payload))
+    store, store_bytes = _allocated(lambda: StudentStore.from_dicts(json.loads(payload)))
+    assert store[n // 2] == dicts[n // 2]
+    parse_s = _timed(lambda: json.loads(payload))
+    build_s = _timed(lambda: StudentStore.from_dicts(dicts))
+
+    rng = random.Random(1)
+    positions = [rng.randrange(n) for _ in range(lookups)]
+    t0 = time.perf_counter()
+    for p in positions:
+        store[p]
+    row_us = (time.perf_counter() - t0) / lookups * 1e6
+
+    mb = 1024 * 1024
+    return {
+        'students': n,
+        'dict_list_mb': round(dict_bytes / mb, 1),
+        'store_mb': round(store_bytes / mb, 1),
+        'store_nbytes_mb': round(store.nbytes() / mb, 1),
+        'ratio': round(dict_bytes / max(1, store_bytes), 1),
+        'bytes_per_student': {'dict_list': dict_bytes // n, 'store': store_bytes // n},
+        'parse_s': round(parse_s, 3),
+        'build_s': round(build_s, 3),
+        'row_us': round(row_us, 2),
+        'distinct_courses': len(store.courses.levels) - 1,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--students', type=int, nargs='+', default=[100000])
+    ap.add_argument('--lookups', type=int, default=10000)
+    args = ap.parse_args()
+    print(json.dumps([bench(n, args.lookups) for n in args.students], indent=2))
+
+
+if __name__ == '__main__':
+    main()
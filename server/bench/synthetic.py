@@ -0,0 +1,55 @@
+"""Synthetic rosters shaped like src/data/students.json, for benchmarks."""
+import random
+
+from server.utils.students import students as student_repo
+
+
+_FALLBACK = {
+    'majors': ['Computer Science', 'Software Engineering', 'Biology', 'Economics'],
+    'years': ['Freshman', 'Sophomore', 'Junior', 'Senior'],
+    'availability': ['Mornings', 'Afternoons', 'Evenings', 'Flexible'],
+    'locations': ['Hayden Library', 'Noble Library', 'Memorial Union'],
+    'subjects': ['CSE', 'MAT', 'BIO', 'ECN', 'SER', 'PSY'],
+}
+
+
+def _vocabulary():
+    roster = student_repo.all()
+    if not roster:
+        return _FALLBACK
+    return {
+        'majors': sorted({s['major'] for s in roster if s.get('major')}),
+        'years': sorted({s['year'] for s in roster if s.get('year')}),
+        'availability': sorted({s['availability'] for s in roster if s.get('availability')}),
+        'locations': sorted({s['location'] for s in roster if s.get('location')}),
+        'subjects': sorted({c.split()[0] for s in roster for c in s.get('courses') or [] if c.strip()}),
+    }
+
+
+def make_students(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    vocab = _vocabulary()
+    # Skew subjects so a few are popular, like the real roster.
+    subjects = vocab['subjects']
+    weights = [1.0 / (i + 1) for i in range(len(subjects))]
+    out = []
+    for i in range(n):
+        courses = {
+            f"{rng.choices(subjects, weights)[0]} {rng.choice([1, 2, 3, 4])}{rng.randrange(10)}{rng.randrange(10)}"
+            for _ in range(rng.randint(2, 5))
+        }
+        out.append({
+            'id': i + 1,
+            'name': f'Student {i + 1}',
+            'gender': rng.choice(['female', 'male']),
+            'major': rng.choice(vocab['majors']),
+            'year': rng.choice(vocab['years']),
+            'courses': sorted(courses),
+            'availability': rng.choice(vocab['availability']),
+            'location': rng.choice(vocab['locations']),
+            'compatibility': rng.randint(40, 99),
+            'photo': f'https://images.unsplash.com/photo-{1500000000000 + i}?q=80&w=2574&auto=format&fit=crop',
+            'lat': round(33.415 + rng.random() * 0.02, 4),
+            'lng': round(-111.945 + rng.random() * 0.03, 4),
+        })
+    return out
@@ -0,0 +1,70 @@
+"""Micro-benchmark of the course-token extractor over the students.json roster.
+
+Compares the shared single-pass extractor (cold and memoized) against the
+two-pass regex it replaced in extract.py / invites.py.
+
+    python -m server.bench.tokens --repeat 200
+"""
+import argparse
+import json
+import re
+import time
+
+from server.utils.students import students as student_repo
+from server.utils.tokens import _tokens, extract_many, extract_tokens
+
+
+def _legacy_tokens(text):
+    if not text:
+        return []
+    t = text.upper()
+    tokens = set()
+    for m in re.findall(r"\b([A-Z]{2,4})\s?-?\s?(\d{2,3})\b", t):
+        tokens.add(f"{m[0]} {m[1]}")
+        tokens.add(f"{m[0]}{m[1]}")
+        tokens.add(m[0])
+    for m in re.findall(r"\b(BIO|BIOL|BIOLOGY|ECN|ECON|ECONOMICS|CSE|CS|EE|EEE|MAT|MATH|PSY|PSYCH)\b", t):
+        tokens.add(m)
+    return list(sorted(tokens))
+
+
+def _profile_text(s):
+    return '\n'.join([f"MAJOR: {s.get('major') or ''}", 'COURSES: ' + ', '.join(s.get('courses') or [])])
+
+
+def _time(fn, texts, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(texts)
+    return (time.perf_counter() - t0) / (repeat * len(texts)) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--repeat', type=int, default=200)
+    args = ap.parse_args()
+    texts = [_profile_text(s) for s in student_repo.all()]
+    if not texts:
+        raise SystemExit('students.json not found')
+
+    legacy_us = _time(lambda ts: [_legacy_tokens(t) for t in ts], texts, args.repeat)
+
+    def cold(ts):
+        _tokens.cache_clear()
+        extract_many(ts)
+
+    cold_us = _time(cold, texts, args.repeat)
+    extract_many(texts)
+    warm_us = _time(extract_many, texts, args.repeat)
+    changed = sum(1 for t in texts if extract_tokens(t) != _legacy_tokens(t))
+    print(json.dumps({
+        'profiles': len(texts),
+        'legacy_two_pass_us': round(legacy_us, 2),
+        'single_pass_cold_us': round(cold_us, 2),
+        'single_pass_memoized_us': round(warm_us, 2),
+        'profiles_with_canonicalized_tokens': changed,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Fan-out load test for the presence hub behind /ws.
+
+Drives server.utils.presence.PresenceHub in-process with lightweight fake
+clients (no sockets), so the numbers isolate hub cost: coalescing, per-tick
+room serialization, fan-out and writer scheduling. Latency is measured from
+publish to delivery on every Nth client.
+
+    python -m server.bench.ws_fanout --clients 10000 --rooms 50 --rate 2000 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from server.utils.presence import PresenceHub
+
+
+def _pct(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+
+
+async def run(clients: int, rooms: int, rate: float, seconds: float, users: int, sample_every: int, tick: float, slow: float):
+    hub = PresenceHub(tick_interval=tick)
+    latencies = []
+    received = [0]
+
+    def make_client(i):
+        sampled = i % sample_every == 0
+        lagging = random.random() < slow
+
+        async def send(batch: str):
+            received[0] += 1
+            if lagging:
+                await asyncio.sleep(tick * 4)
+            if sampled:
+                now = time.perf_counter()
+                for frame in json.loads(batch):
+                    latencies.extend(now - item['t'] for item in frame.get('items', ()))
+
+        async def close():
+            pass
+
+        conn = hub.connect(send, close)
+        hub.subscribe(conn, [f'room:{i % rooms}'])
+
+    for i in range(clients):
+        make_client(i)
+
+    interval = 1.0 / rate
+    sent = 0
+    t_start = time.perf_counter()
+    next_at = t_start
+    while time.perf_counter() - t_start < seconds:
+        now = time.perf_counter()
+        # Open-loop arrivals: publish everything that is due, then yield.
+        while next_at <= now:
+            room = f'room:{random.randrange(rooms)}'
+            user = str(random.randrange(users))
+            hub.publish_location([room], user, {'lat': 33.42, 'lng': -111.93, 't': time.perf_counter()})
+            sent += 1
+            next_at += interval
+        await asyncio.sleep(min(tick / 2, max(0.0, next_at - time.perf_counter())))
+    await asyncio.sleep(tick * 3)
+    elapsed = time.perf_counter() - t_start
+    stats = hub.stats()
+    await hub.stop()
+    return {
+        'clients': clients,
+        'rooms': rooms,
+        'published': sent,
+        'publish_rate': round(sent / seconds, 1),
+        'frames_delivered': received[0],
+        'frames_per_sec': round(received[0] / elapsed, 1),
+        'coalesced': stats['coalesced'],
+        'dropped': stats['dropped'],
+        'latency_ms': {
+            'samples': len(latencies),
+            'p50': _pct(latencies, 0.50),
+            'p95': _pct(latencies, 0.95),
+            'p99': _pct(latencies, 0.99),
+            'mean': round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+        },
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--clients', type=int, default=10000)
+    ap.add_argument('--rooms', type=int, default=50)
+    ap.add_argument('--users', type=int, default=2000, help='distinct user ids publishing locations')
+    ap.add_argument('--rate', type=float, default=2000, help='location updates per second')
+    ap.add_argument('--seconds', type=float, default=5)
+    ap.add_argument('--tick', type=float, default=0.1)
+    ap.add_argument('--slow', type=float, default=0.0, help='fraction of clients that stall on send')
+    ap.add_argument('--sample-every', type=int, default=100, help='measure latency on every Nth client')
+    args = ap.parse_args()
+    result = asyncio.run(run(args.clients, args.rooms, args.rate, args.seconds, args.users, args.sample_every, args.tick, args.slow))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
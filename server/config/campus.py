@@ -0,0 +1,17 @@
+import os
+
+
+class CampusConfig:
+    # Bounding box of the live heatmap (defaults cover ASU Tempe); points outside are not binned.
+    south: float = float(os.getenv("CAMPUS_SOUTH", "33.405"))
+    west: float = float(os.getenv("CAMPUS_WEST", "-111.945"))
+    north: float = float(os.getenv("CAMPUS_NORTH", "33.435"))
+    east: float = float(os.getenv("CAMPUS_EAST", "-111.905"))
+    # Zoom levels 0..heatmap_levels-1; the finest has heatmap_finest x heatmap_finest cells.
+    heatmap_levels: int = int(os.getenv("HEATMAP_LEVELS", "5"))
+    heatmap_finest: int = int(os.getenv("HEATMAP_FINEST", "256"))
+    # A check-in's weight halves every heatmap_half_life seconds until it checks out or expires.
+    heatmap_half_life: float = float(os.getenv("HEATMAP_HALF_LIFE", "1800"))
+
+
+campus = CampusConfig()
@@ -1,6 +1,21 @@
+import os
+
+
 class FirebaseConfig:
-    project_id: str = "demo"
+    project_id: str = os.getenv("FIREBASE_PROJECT_ID", os.getenv("GOOGLE_CLOUD_PROJECT", "demo"))
+    # Document storage for sessions, matches and users: "firestore" in production,
+    # "sqlite" or "memory" (per worker, lost on restart) as local stand-ins.
+    backend: str = os.getenv("FIRESTORE_BACKEND", "memory")
+    sqlite_path: str = os.getenv("FIRESTORE_SQLITE_PATH", "documents.sqlite3")
+    # Write-behind: dirty documents are committed every flush_ms, or once batch_size are pending.
+    flush_ms: float = float(os.getenv("FIRESTORE_FLUSH_MS", "500"))
+    batch_size: int = int(os.getenv("FIRESTORE_BATCH_SIZE", "500"))
+    # Read-through cache of documents per worker.
+    cache_size: int = int(os.getenv("FIRESTORE_CACHE_SIZE", "10000"))
+    # Pending documents held while the backend is down before new writes are refused (503).
+    max_pending: int = int(os.getenv("FIRESTORE_MAX_PENDING", "100000"))
+    # Append-only log the like graph is rebuilt from on start; empty keeps likes in memory only.
+    likes_log_path: str = os.getenv("LIKES_LOG_PATH", "")
 
 
 firebase = FirebaseConfig()
-
@@ -1,9 +1,98 @@
 import os
 
 
+def _route_budgets(raw: str) -> dict:
+    # "recommendations=4,study_plan=6" -> {"recommendations": 4.0, "study_plan": 6.0}
+    budgets = {}
+    for item in raw.split(","):
+        route, _, seconds = item.partition("=")
+        if route.strip() and seconds.strip():
+            budgets[route.strip()] = float(seconds)
+    return budgets
+
+
 class GeminiConfig:
     api_key: str = os.getenv("GEMINI_API_KEY", "")
     model: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    base_url: str = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+    # Upper bound on model calls in flight per worker; extra callers wait for a slot.
+    max_concurrency: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "256"))
+    timeout: float = float(os.getenv("GEMINI_TIMEOUT", "30"))
+    # Response cache: "memory" (per worker) or "sqlite" (survives restarts, shared by workers).
+    cache_backend: str = os.getenv("GEMINI_CACHE_BACKEND", "memory")
+    cache_path: str = os.getenv("GEMINI_CACHE_PATH", "gemini_cache.sqlite3")
+    cache_ttl: float = float(os.getenv("GEMINI_CACHE_TTL", "3600"))
+    cache_max_entries: int = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "2048"))
+    # Micro-batching of /ai/extract and /ai/invites calls: flush after this window or at this many items.
+    batch_window_ms: float = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "20"))
+    batch_max_items: int = int(os.getenv("GEMINI_BATCH_MAX_ITEMS", "16"))
+    fallback_models: list = [m.strip() for m in os.getenv("GEMINI_FALLBACK_MODELS", "gemini-2.0-flash,gemini-1.5-flash").split(",") if m.strip()]
+    # Models a request may name in its "model" field; anything else is rejected (422) before
+    # it can become a rate-limit guard or a metric label. The defaults above are always allowed.
+    extra_models: list = [m.strip() for m in os.getenv("GEMINI_ALLOWED_MODELS", "").split(",") if m.strip()]
+    # Seconds to wait on a model (roughly its p95) before hedging with the next one; routes not listed don't hedge.
+    hedge_budgets: dict = _route_budgets(os.getenv("GEMINI_HEDGE_BUDGETS", "recommendations=4"))
+    # Ask for JSON output constrained by a response schema on routes that parse JSON; off for models without it.
+    structured_output: bool = os.getenv("GEMINI_STRUCTURED_OUTPUT", "1") not in ("0", "false", "False")
+
+    # Adaptive per-model token bucket (per worker): starts at rate_limit_rps, halves on 429
+    # (pausing for Retry-After) and creeps back up on success, never below rate_limit_min_rps.
+    rate_limit_rps: float = float(os.getenv("GEMINI_RATE_LIMIT_RPS", "100"))
+    rate_limit_min_rps: float = float(os.getenv("GEMINI_RATE_LIMIT_MIN_RPS", "0.5"))
+    rate_limit_burst: float = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "20"))
+    # Per-model circuit breaker: opens when at least breaker_failure_ratio of the last
+    # breaker_window calls (once breaker_min_calls are seen) failed with 429/5xx/timeouts.
+    breaker_window: int = int(os.getenv("GEMINI_BREAKER_WINDOW", "20"))
+    breaker_min_calls: int = int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "10"))
+    breaker_failure_ratio: float = float(os.getenv("GEMINI_BREAKER_FAILURE_RATIO", "0.5"))
+    breaker_cooldown: float = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "15"))
+    breaker_max_cooldown: float = float(os.getenv("GEMINI_BREAKER_MAX_COOLDOWN", "120"))
+    # Retries of 429/5xx/timeouts with full-jitter backoff, only while the call's timeout allows.
+    max_retries: int = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+    retry_base: float = float(os.getenv("GEMINI_RETRY_BASE", "0.25"))
+    retry_cap: float = float(os.getenv("GEMINI_RETRY_CAP", "4"))
+
+    # Per-route cap on AI requests being served per worker; past it up to route_queue
+    # requests wait (at most route_queue_timeout seconds, then 503) and the rest get 429.
+    route_concurrency: dict = _route_budgets(os.getenv(
+        "GEMINI_ROUTE_CONCURRENCY",
+        "chat=64,chat_stream=64,extract=128,invites=128,recommendations=64,study_plan=64,"
+        "extract_bulk=4,recommendations_bulk=4",
+    ))
+    route_queue: int = int(os.getenv("GEMINI_ROUTE_QUEUE", "256"))
+    route_queue_timeout: float = float(os.getenv("GEMINI_ROUTE_QUEUE_TIMEOUT", "5"))
+
+    # Server-side /ai/chat sessions (per worker): LRU-capped count, idle expiry, turns kept
+    # verbatim before older ones are folded into a rolling summary, and per-text size caps.
+    chat_max_sessions: int = int(os.getenv("GEMINI_CHAT_MAX_SESSIONS", "10000"))
+    chat_session_ttl: float = float(os.getenv("GEMINI_CHAT_SESSION_TTL", "1800"))
+    chat_history_turns: int = int(os.getenv("GEMINI_CHAT_HISTORY_TURNS", "12"))
+    chat_max_message_chars: int = int(os.getenv("GEMINI_CHAT_MAX_MESSAGE_CHARS", "2000"))
+    chat_summary_chars: int = int(os.getenv("GEMINI_CHAT_SUMMARY_CHARS", "1500"))
+    # Personas per chat and their field sizes, which bound a session's preamble.
+    chat_max_personas: int = int(os.getenv("GEMINI_CHAT_MAX_PERSONAS", "8"))
+    chat_max_name_chars: int = int(os.getenv("GEMINI_CHAT_MAX_NAME_CHARS", "80"))
+    chat_max_bio_chars: int = int(os.getenv("GEMINI_CHAT_MAX_BIO_CHARS", "1000"))
+
+    # /ai/invites message pools (per worker): messages kept per course/subject key, the
+    # level below which a background refill starts, and picks before a message retires.
+    invite_pool_size: int = int(os.getenv("GEMINI_INVITE_POOL_SIZE", "48"))
+    invite_pool_watermark: int = int(os.getenv("GEMINI_INVITE_POOL_WATERMARK", "16"))
+    invite_message_uses: int = int(os.getenv("GEMINI_INVITE_MESSAGE_USES", "20"))
+    invite_pool_keys: int = int(os.getenv("GEMINI_INVITE_POOL_KEYS", "512"))
+    # Background study-plan enrichments in flight per worker; past it plans are served
+    # as plain templates until one finishes.
+    study_plan_max_pending: int = int(os.getenv("GEMINI_STUDY_PLAN_MAX_PENDING", "32"))
+
+    def hedge_after(self, route: str):
+        return self.hedge_budgets.get(route)
+
+    def concurrency_for(self, route: str) -> int:
+        return int(self.route_concurrency.get(route, 64))
+
+    @property
+    def allowed_models(self) -> frozenset:
+        return frozenset([self.model, *self.fallback_models, *self.extra_models])
 
 
 gemini = GeminiConfig()
@@ -0,0 +1,15 @@
+import os
+
+
+class MatchingConfig:
+    # Directory the similarity index is saved to and memory-mapped from; empty rebuilds it in memory on every start.
+    index_path: str = os.getenv("MATCH_INDEX_PATH", "")
+    # Width of the hashed profile vectors.
+    dim: int = int(os.getenv("MATCH_INDEX_DIM", "128"))
+    # Clusters probed per query; more is slower and closer to exact.
+    probes: int = int(os.getenv("MATCH_INDEX_PROBES", "8"))
+    # Rosters smaller than this are scanned exhaustively instead of clustered.
+    min_cluster_rows: int = int(os.getenv("MATCH_INDEX_MIN_CLUSTER_ROWS", "4096"))
+
+
+matching = MatchingConfig()
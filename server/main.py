@@ -1,13 +1,61 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from server.api import auth, matching, sessions, locations
 from server.api import recommendations
 from server.api import chat
 from server.api import extract
 from server.api import invites
 from server.api import study_plan
+from server.api import stats
+from server.api import websockets
+from server.agents.chat_agent import session_agent
+from server.agents.invite_agent import invite_pool
+from server.agents.study_plan_agent import agent as study_plan_agent
+from server.utils.gemini_client import client as gemini_client
+from server.utils import performance, upstream
+from server.utils.batching import batchers
+from server.utils.cache import response_cache
+from server.utils.chat_sessions import chat_sessions
+from server.utils.heatmap import heatmap
+from server.utils.likes import likes
+from server.utils.limits import Overloaded, limiters
+from server.utils.persistence import documents
+from server.utils.presence import hub
+from server.utils.readiness import readiness
+from server.utils.scoring import roster_engine
+from server.utils.structured import parse_stats
+from server.utils.students import students
+from server.utils.text_index import index_stats, save_similarity_index, similarity_index
 
-app = FastAPI(title="Aithena API")
+
+# Loaded after the server is listening rather than on the first request after a cold start.
+readiness.step("students", students.all)
+readiness.step("scoring", roster_engine)
+readiness.step("similarity", similarity_index)
+readiness.step("gemini_client", gemini_client.warm)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness.start()
+    documents.start()
+    likes.start()
+    yield
+    await readiness.stop()
+    await hub.stop()
+    await gemini_client.aclose()
+    await likes.close()
+    await asyncio.to_thread(save_similarity_index)
+    # Last, so pending session/match/user writes are committed before exit.
+    await documents.close()
+
+
+app = FastAPI(title="Aithena API", lifespan=lifespan)
+
+app.add_middleware(performance.MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,8 +74,63 @@ app.include_router(chat.router, prefix="/ai", tags=["ai"])
 app.include_router(extract.router, prefix="/ai", tags=["ai"])
 app.include_router(invites.router, prefix="/ai", tags=["ai"])
 app.include_router(study_plan.router, prefix="/ai", tags=["ai"])
+app.include_router(stats.router, prefix="/stats", tags=["stats"])
+app.include_router(websockets.router, tags=["realtime"])
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(request, e: Overloaded):
+    # Shed load from shared resources (e.g. a backed-up document store) outside the agents.
+    return JSONResponse({"detail": e.detail}, status_code=e.status_code, headers={"Retry-After": str(e.retry_after)})
 
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    # Liveness stays on "/"; this turns 200 once startup warmup has finished.
+    if not readiness.ready:
+        return JSONResponse(readiness.stats(), status_code=503)
+    return readiness.stats()
+
+
+@app.get("/_ah/warmup", include_in_schema=False)
+async def warmup():
+    # App Engine warmup request: hold it until the instance is warm.
+    await readiness.wait()
+    return readiness.stats()
+
+
+performance.register_collector("cache", response_cache.stats)
+performance.register_collector("batching", lambda: {name: b.stats() for name, b in batchers.items()})
+performance.register_collector("presence", hub.stats)
+performance.register_collector("chat", lambda: {**chat_sessions.stats(), **session_agent.stats()})
+performance.register_collector("study_plan", study_plan_agent.stats)
+performance.register_collector("invites", invite_pool.stats)
+performance.register_collector("readiness", lambda: readiness.timings_ms)
+performance.register_collector("upstream", upstream.stats)
+performance.register_collector("documents", documents.stats)
+performance.register_collector("heatmap", heatmap.stats)
+performance.register_collector("likes", likes.stats)
+performance.register_collector("similarity", index_stats)
+performance.register_collector("parsing", parse_stats.stats)
+performance.register_collector("limits", lambda: {name: l.stats() for name, l in limiters.items()})
+
+
+# Async, like the /stats handlers: the collectors walk live dicts the event loop mutates.
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(performance.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+async def profile(profile_id: str, x_profile: str = Header("")):
+    if not performance.PROFILE_TOKEN or x_profile != performance.PROFILE_TOKEN:
+        raise HTTPException(status_code=404)
+    report = performance.profile_report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404)
+    return Response(content=report[1], media_type=report[0])
@@ -0,0 +1,60 @@
+from typing import Annotated, List, Optional
+
+from pydantic import AfterValidator, BaseModel, RootModel
+
+from server.config.gemini import gemini
+
+
+def _allowed_model(name: str) -> str:
+    if name not in gemini.allowed_models:
+        raise ValueError(f"unknown model; use one of {sorted(gemini.allowed_models)}")
+    return name
+
+
+# The optional "model" field of AI requests: only configured models are accepted, so
+# client strings never become upstream guards, cache keys or metric labels.
+ModelName = Optional[Annotated[str, AfterValidator(_allowed_model)]]
+
+
+# Shapes the AI routes ask the model for; sent as Gemini response schemas and
+# used to validate what comes back.
+
+
+class ChatReply(BaseModel):
+    name: str
+    text: str
+
+
+class CourseTokens(BaseModel):
+    tokens: List[str]
+
+
+class NumberedTokens(BaseModel):
+    id: int
+    tokens: List[str]
+
+
+class BatchTokens(BaseModel):
+    results: List[NumberedTokens]
+
+
+class PlanBlockText(BaseModel):
+    desc: str
+
+
+class PlanEnrichment(BaseModel):
+    blocks: List[PlanBlockText]
+    notes: str = ""
+
+
+class CourseRecommendations(BaseModel):
+    course: str
+    recommendations: List[str]
+
+
+class Recommendations(BaseModel):
+    courses: List[CourseRecommendations]
+
+
+class InviteMessages(RootModel[List[str]]):
+    pass
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from server.config.gemini import gemini
+
+
+# name -> batcher, for /stats/batching
+batchers: Dict[str, 'MicroBatcher'] = {}
+
+
+class MicroBatcher:
+    """Collects concurrent jobs for a short window and runs them as one batch.
+
+    ``handler(key, items)`` receives every item submitted under the same ``key``
+    (e.g. the model name) within ``window`` seconds, or as soon as ``max_items``
+    are waiting, and returns a dict from item position to result. Positions it
+    leaves out, and every item of a batch whose handler raised, resolve to
+    ``None`` so callers can fall back per item.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Hashable, List[Any]], Awaitable[Dict[int, Any]]],
+        max_items: Optional[int] = None,
+        window: Optional[float] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.max_items = max_items or gemini.batch_max_items
+        self.window = window if window is not None else gemini.batch_window_ms / 1000.0
+        self._pending: Dict[Hashable, List[tuple]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self.batches = 0
+        self.items = 0
+        self.missing = 0
+        self.failed_batches = 0
+        self.flushed_full = 0
+        self.flushed_window = 0
+        batchers[name] = self
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, fut))
+        if len(pending) >= self.max_items:
+            self.flushed_full += 1
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.window, self._flush_window, key)
+        return await fut
+
+    def _flush_window(self, key: Hashable) -> None:
+        self.flushed_window += 1
+        self._flush(key)
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        # Drop jobs whose callers already went away.
+        batch = [(item, fut) for item, fut in batch if not fut.done()]
+        if batch:
+            asyncio.ensure_future(self._run(key, batch))
+
+    async def _run(self, key: Hashable, batch: List[tuple]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.handler(key, [item for item, _ in batch])
+        except Exception:
+            self.failed_batches += 1
+            results = {}
+        for pos, (_, fut) in enumerate(batch):
+            value = results.get(pos)
+            if value is None:
+                self.missing += 1
+            if not fut.done():
+                fut.set_result(value)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'missing_items': self.missing,
+            'failed_batches': self.failed_batches,
+            'flushed_full': self.flushed_full,
+            'flushed_window': self.flushed_window,
+            'max_items': self.max_items,
+            'window_ms': round(self.window * 1000, 1),
+        }
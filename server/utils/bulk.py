@@ -0,0 +1,124 @@
+import asyncio
+import json
+import tempfile
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, IO, Iterator, Tuple
+
+from pydantic import ValidationError
+
+from server.utils.gemini_client import GeminiError
+
+
+# Uploads above this are spooled to disk rather than held in memory.
+SPOOL_BYTES = 1 << 20
+MAX_LINE_BYTES = 1 << 20
+
+
+async def spool(chunks: AsyncIterator[bytes]) -> IO[bytes]:
+    """Copy a request body to a temp file (in memory while small) and rewind it.
+
+    Bulk bodies are read in full before the response starts because a streaming
+    response listens on the same ASGI channel for disconnects.
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    async for chunk in chunks:
+        f.write(chunk)
+    f.seek(0)
+    return f
+
+
+def _lines(f: IO[bytes]) -> Iterator[bytes]:
+    while True:
+        line = f.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_LINE_BYTES and not line.endswith(b'\n'):
+            # Skip the rest of an oversized line; the item is reported as an error.
+            while line and not line.endswith(b'\n'):
+                line = f.readline(MAX_LINE_BYTES)
+            yield b''
+            continue
+        if line.strip():
+            yield line
+
+
+def _error(index: int, item_id: Any, status: int, detail: str) -> dict:
+    return {'index': index, 'id': item_id, 'error': {'status': status, 'detail': detail}}
+
+
+async def run_ndjson(
+    f: IO[bytes],
+    prepare: Callable[[dict], Tuple[Hashable, Callable[[], Awaitable[Any]]]],
+    concurrency: int = 16,
+) -> AsyncIterator[str]:
+    """Process NDJSON items from ``f`` with at most ``concurrency`` in flight, yielding
+    one NDJSON result line per input line in completion order.
+
+    ``prepare(item)`` validates an item and returns ``(key, call)``; items with the
+    same key that are in flight at the same time share one ``call()``. Every result
+    carries the input ``index`` and ``id`` (defaulting to the index); a failing item
+    yields ``{"error": {"status", "detail"}}`` and does not affect the others. Queues are bounded, so memory stays flat however many
+    items there are and however slowly the client reads.
+    """
+    jobs: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def process(index: int, line: bytes) -> dict:
+        if not line:
+            return _error(index, index, 413, f'Line longer than {MAX_LINE_BYTES} bytes')
+        try:
+            item = json.loads(line)
+        except ValueError:
+            return _error(index, index, 400, 'Invalid JSON')
+        if not isinstance(item, dict):
+            return _error(index, index, 400, 'Each line must be a JSON object')
+        item_id = item.get('id', index)
+        try:
+            k, call = prepare(item)
+            fut = inflight.get(k)
+            if fut is None:
+                fut = inflight[k] = asyncio.ensure_future(call())
+                fut.add_done_callback(lambda done, k=k: inflight.pop(k) if inflight.get(k) is done else None)
+            result = await asyncio.shield(fut)
+        except ValidationError as e:
+            return _error(index, item_id, 422, str(e.errors(include_url=False)))
+        except GeminiError as e:
+            return _error(index, item_id, e.status_code, e.detail)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return _error(index, item_id, 500, f'{type(e).__name__}: {e}')
+        return {'index': index, 'id': item_id, 'result': result}
+
+    async def reader():
+        for index, line in enumerate(_lines(f)):
+            await jobs.put((index, line))
+        for _ in range(concurrency):
+            await jobs.put(None)
+
+    async def worker():
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            await results.put(await process(*job))
+
+    async def produce():
+        try:
+            await asyncio.gather(reader(), *[worker() for _ in range(concurrency)])
+        finally:
+            await results.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            out = await results.get()
+            if out is None:
+                break
+            yield json.dumps(out) + '\n'
+        await producer
+    finally:
+        producer.cancel()
+        for fut in list(inflight.values()):
+            fut.cancel()
+        f.close()
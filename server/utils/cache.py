@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from server.config.gemini import gemini
+
+
+_WS_RE = re.compile(r'\s+')
+
+
+def cache_key(model: str, prompt: str, variant: str = '') -> str:
+    """``variant`` separates replies to the same prompt that differ in kind, such
+    as JSON mode under a response schema versus free text."""
+    normalized = _WS_RE.sub(' ', prompt or '').strip()
+    if variant:
+        normalized = f'{variant}\n{normalized}'
+    return hashlib.sha256(f'{model}\n{normalized}'.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: 'OrderedDict[str, tuple[float, Any]]' = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteBackend:
+    """File-backed LRU so cached responses survive restarts. Values must be JSON-serializable.
+
+    Calls block on disk, so ResponseCache runs them in a worker thread (``blocking``).
+    The row count is kept in memory and re-read only when it passes ``max_entries``;
+    trimming then goes down to ``trim_to`` so that happens once per many inserts,
+    and rows other workers added are counted again at that point.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.trim_to = max_entries - max_entries // 10
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)')
+        self._count = self._rows()
+
+    def _rows(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute('SELECT value, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[1] <= now:
+                self._count -= self._db.execute('DELETE FROM responses WHERE key = ?', (key,)).rowcount
+                return None
+            self._db.execute('UPDATE responses SET used_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        row = (json.dumps(value), now + ttl, now, key)
+        with self._lock:
+            if not self._db.execute('UPDATE responses SET value = ?, expires_at = ?, used_at = ? WHERE key = ?', row).rowcount:
+                self._db.execute('INSERT OR REPLACE INTO responses (value, expires_at, used_at, key) VALUES (?, ?, ?, ?)', row)
+                self._count += 1
+            if self._count > self.max_entries:
+                self._count = self._rows()
+                overflow = self._count - self.trim_to
+                if overflow > 0:
+                    self._db.execute(
+                        'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used_at LIMIT ?)',
+                        (overflow,),
+                    )
+                    self._count -= overflow
+                    self.evictions += overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class ResponseCache:
+    """TTL + LRU cache for model responses keyed on (model, variant, normalized prompt).
+
+    Concurrent misses for the same key share one upstream call (single-flight).
+    Backends marked ``blocking`` are called through ``asyncio.to_thread``.
+    Those joiners are counted as ``coalesced``, apart from hits and misses, so
+    ``hit_ratio`` is the share of lookups answered from the cache alone.
+    """
+
+    def __init__(self, backend=None, ttl: Optional[float] = None):
+        self.backend = backend if backend is not None else MemoryBackend(gemini.cache_max_entries)
+        self.ttl = ttl if ttl is not None else gemini.cache_ttl
+        # key -> [task, number of callers awaiting it]
+        self._inflight: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def _get(self, key: str) -> Optional[Any]:
+        if getattr(self.backend, 'blocking', False):
+            return await asyncio.to_thread(self.backend.get, key)
+        return self.backend.get(key)
+
+    async def _set(self, key: str, value: Any) -> None:
+        if getattr(self.backend, 'blocking', False):
+            await asyncio.to_thread(self.backend.set, key, value, self.ttl)
+        else:
+            self.backend.set(key, value, self.ttl)
+
+    async def peek(self, model: str, prompt: str, variant: str = '') -> Optional[Any]:
+        """Cached value, or None; never calls upstream."""
+        value = await self._get(cache_key(model, prompt, variant))
+        if value is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    async def get_or_call(self, model: str, prompt: str, call: Callable[[], Awaitable[Any]], variant: str = '') -> Any:
+        key = cache_key(model, prompt, variant)
+        value = await self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            entry = self._inflight[key] = [asyncio.ensure_future(self._fill(key, call)), 0]
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # Shielded so one caller going away does not cancel the call the others
+            # wait on; the upstream call is only cancelled once every caller has left.
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+            raise
+
+    async def _fill(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await call()
+            await self._set(key, value)
+            return value
+        finally:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'inflight': len(self._inflight),
+            'entries': len(self.backend),
+            'evictions': self.backend.evictions,
+        }
+
+
+def _default_backend():
+    if gemini.cache_backend == 'sqlite':
+        return SqliteBackend(gemini.cache_path, gemini.cache_max_entries)
+    return MemoryBackend(gemini.cache_max_entries)
+
+
+response_cache = ResponseCache(_default_backend())
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+from server.config.gemini import gemini
+
+
+class ChatSession:
+    """One conversation: its personas, the last ``history_turns`` turns verbatim,
+    and a rolling summary of everything older.
+
+    Turns pushed out of the ring buffer wait in ``overflow`` until the agent folds
+    them into ``summary``; both are capped so a session's size stays bounded no
+    matter how long the conversation runs.
+    """
+
+    __slots__ = ('id', 'personas', 'history', 'overflow', 'summary', 'turns', 'last_used', 'lock', 'summarizing')
+
+    def __init__(self, session_id: str, personas: List[dict], history_turns: int):
+        self.id = session_id
+        self.personas = personas
+        self.history: Deque[Tuple[str, str]] = deque(maxlen=history_turns)
+        self.overflow: List[Tuple[str, str]] = []
+        self.summary = ''
+        self.turns = 0
+        self.last_used = time.monotonic()
+        # Turns of one session run one at a time so history stays in order.
+        self.lock = asyncio.Lock()
+        self.summarizing = False
+
+    def append(self, role: str, text: str, max_chars: int) -> None:
+        if len(self.history) == self.history.maxlen:
+            self.overflow.append(self.history[0])
+        self.history.append((role, text[:max_chars]))
+        self.turns += 1
+
+
+class ChatSessionStore:
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        history_turns: Optional[int] = None,
+        max_message_chars: Optional[int] = None,
+    ):
+        self.max_sessions = max_sessions or gemini.chat_max_sessions
+        self.idle_ttl = idle_ttl or gemini.chat_session_ttl
+        self.history_turns = history_turns or gemini.chat_history_turns
+        self.max_message_chars = max_message_chars or gemini.chat_max_message_chars
+        # Least recently used first, so both idle expiry and the size cap pop from the front.
+        self._sessions: 'OrderedDict[str, ChatSession]' = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, personas: List[dict]) -> ChatSession:
+        self.sweep()
+        session = ChatSession(uuid.uuid4().hex, personas, self.history_turns)
+        self._sessions[session.id] = session
+        self.created += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        self.sweep()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def sweep(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        removed = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'created': self.created,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
+
+
+chat_sessions = ChatSessionStore()
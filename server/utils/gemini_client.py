@@ -0,0 +1,257 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Optional, Type
+
+import httpx
+from pydantic import BaseModel
+
+from server.config.gemini import gemini
+from server.utils import performance, upstream
+from server.utils.cache import response_cache
+from server.utils.structured import response_schema
+
+
+class GeminiError(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        # Seconds the caller should wait before trying again, when known.
+        self.retry_after = retry_after
+
+
+class UpstreamUnavailable(GeminiError):
+    """Refused locally without calling the model: its circuit is open (503) or its
+    adaptive rate budget cannot admit the call before the deadline (429)."""
+
+
+def extract_text(data: dict) -> str:
+    try:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        raise GeminiError(500, "Gemini response parsing error")
+
+
+def request_body(prompt: str, schema: Optional[Type[BaseModel]] = None) -> dict:
+    body = {"contents": [{"parts": [{"text": prompt}]}]}
+    if schema is not None and gemini.structured_output:
+        # JSON mode constrained to the schema: no prose or fences around the value.
+        body["generationConfig"] = {"responseMimeType": "application/json", "responseSchema": response_schema(schema)}
+    return body
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class GeminiClient:
+    """Shared async client for the Gemini REST API.
+
+    One keep-alive (HTTP/2 when ``h2`` is installed) connection pool per worker,
+    with a semaphore bounding the number of model calls in flight.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_concurrency = max_concurrency or gemini.max_concurrency
+        self.timeout = timeout or gemini.timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(gemini.api_key)
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=_http2_available(),
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._http
+
+    def warm(self) -> None:
+        """Build the connection pool ahead of the first call (imports h2, reads TLS certs)."""
+        self._client()
+
+    def url(self, model: str, method: str = "generateContent") -> str:
+        return f"{gemini.base_url}/models/{model}:{method}"
+
+    async def post(self, model: str, body: dict, timeout: Optional[float] = None) -> dict:
+        """One generateContent call through the model's guard (see ``upstream``).
+
+        429/5xx/timeouts are retried with jittered backoff while ``timeout`` (the
+        whole budget, retries and rate-limit waits included) allows.
+        """
+        timeout = timeout or self.timeout
+        payload = json.dumps(body).encode("utf-8")
+        performance.gemini_prompt_bytes.observe(len(payload), model)
+        guard = upstream.guard(model)
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            rejected = await guard.admit(deadline)
+            if rejected is not None:
+                performance.gemini_calls.inc(model, "short_circuit" if rejected[0] == 503 else "rate_limited")
+                raise UpstreamUnavailable(*rejected)
+            try:
+                return await self._attempt(model, payload, guard, deadline - time.monotonic())
+            except GeminiError as e:
+                attempt += 1
+                if e.status_code not in upstream.RETRIABLE or attempt > gemini.max_retries:
+                    raise
+                delay = guard.backoff(attempt, e.retry_after)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                guard.retries += 1
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, model: str, payload: bytes, guard: "upstream.ModelGuard", timeout: float) -> dict:
+        t0 = time.perf_counter()
+        outcome = "error"
+        status = None
+        try:
+            async with asyncio.timeout(timeout):
+                async with self._semaphore:
+                    resp = await self._client().post(
+                        self.url(model),
+                        content=payload,
+                        headers={"x-goog-api-key": gemini.api_key, "content-type": "application/json"},
+                        timeout=timeout,
+                    )
+            status = resp.status_code
+            outcome = "ok" if status == 200 else f"http_{status}"
+            performance.gemini_response_bytes.observe(len(resp.content), model)
+            if status == 200:
+                data = resp.json()
+        except ValueError:
+            # A 200 with a body that isn't JSON (e.g. a proxy's HTML page): an upstream
+            # failure like any other, so it is retried and counts against the breaker.
+            outcome = "bad_json"
+            guard.record(None)
+            raise GeminiError(502, f"Gemini returned a non-JSON reply from {model}")
+        except (TimeoutError, httpx.TimeoutException):
+            outcome = "timeout"
+            guard.record(None)
+            raise GeminiError(504, f"Gemini request to {model} timed out")
+        except httpx.HTTPError as e:
+            guard.record(None)
+            raise GeminiError(502, f"Gemini request to {model} failed: {e}")
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            guard.breaker.abandon()
+            raise
+        finally:
+            performance.gemini_calls.inc(model, outcome)
+            performance.gemini_latency.observe(time.perf_counter() - t0, model, outcome)
+        if status != 200:
+            retry_after = upstream.parse_retry_after(resp.headers.get("retry-after"), resp.text) if status in upstream.RETRIABLE else None
+            guard.record(status, retry_after)
+            raise GeminiError(status, resp.text, retry_after)
+        guard.record(status)
+        return data
+
+    async def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cache: bool = False,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> str:
+        """Text of one reply; with ``schema``, the reply is JSON matching that model."""
+        model = model or gemini.model
+        body = request_body(prompt, schema)
+
+        async def call() -> str:
+            return extract_text(await self.post(model, body, timeout=timeout))
+
+        if cache:
+            # JSON-mode and free-text replies to one prompt are different entries.
+            config = body.get("generationConfig")
+            variant = json.dumps(config, sort_keys=True) if config else ""
+            return await response_cache.get_or_call(model, prompt, call, variant)
+        return await call()
+
+    async def stream(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> AsyncIterator[str]:
+        """Yield text chunks from streamGenerateContent as they arrive (``timeout`` applies per read)."""
+        model = model or gemini.model
+        payload = json.dumps(request_body(prompt, schema)).encode("utf-8")
+        performance.gemini_prompt_bytes.observe(len(payload), model)
+        guard = upstream.guard(model)
+        # Streams are not retried; admission may wait for the rate budget up to one read timeout.
+        rejected = await guard.admit(time.monotonic() + (timeout or self.timeout))
+        if rejected is not None:
+            performance.gemini_calls.inc(model, "short_circuit" if rejected[0] == 503 else "rate_limited")
+            raise UpstreamUnavailable(*rejected)
+        t0 = time.perf_counter()
+        outcome = "error"
+        received = 0
+        status = retry_after = None
+        try:
+            async with self._semaphore:
+                async with self._client().stream(
+                    "POST",
+                    self.url(model, "streamGenerateContent"),
+                    params={"alt": "sse"},
+                    content=payload,
+                    headers={"x-goog-api-key": gemini.api_key, "content-type": "application/json"},
+                    timeout=timeout or self.timeout,
+                ) as resp:
+                    status = resp.status_code
+                    if status != 200:
+                        outcome = f"http_{status}"
+                        await resp.aread()
+                        retry_after = upstream.parse_retry_after(resp.headers.get("retry-after"), resp.text)
+                        raise GeminiError(status, resp.text, retry_after)
+                    async for line in resp.aiter_lines():
+                        received += len(line)
+                        if not line.startswith("data:"):
+                            continue
+                        try:
+                            chunk = extract_text(json.loads(line[5:]))
+                        except (GeminiError, json.JSONDecodeError):
+                            # e.g. the final event carrying only finishReason/usage
+                            continue
+                        if chunk:
+                            yield chunk
+                    outcome = "ok"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise GeminiError(504, f"Gemini stream from {model} timed out")
+        except httpx.HTTPError as e:
+            raise GeminiError(502, f"Gemini stream from {model} failed: {e}")
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            if outcome == "cancelled":
+                guard.breaker.abandon()
+            else:
+                # Timeouts and streams that broke after a 200 count as transport failures.
+                guard.record(status if outcome == "ok" or outcome.startswith("http_") else None, retry_after)
+            performance.gemini_calls.inc(model, outcome)
+            performance.gemini_latency.observe(time.perf_counter() - t0, model, outcome)
+            performance.gemini_response_bytes.observe(received, model)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+client = GeminiClient()
@@ -0,0 +1,223 @@
+import heapq
+import math
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from server.config.campus import campus
+
+
+# Tile values are decayed counts times QUANT, rounded and capped to uint16.
+QUANT = 100
+MAX_TILE_CELLS = 128 * 128
+# magic, zoom, grid size, row0, col0, rows, cols, quant; then zlib'd little-endian uint16 values row by row.
+BINARY_HEADER = struct.Struct('<4sBHHHHHH')
+BINARY_MAGIC = b'HMT1'
+# Past this exponent the scaled weights are rebased onto a new epoch (about every
+# 36 hours at a 30 minute half-life), long before doubles lose precision.
+_REBASE_AT = 50.0
+
+
+class Tile:
+    __slots__ = ('zoom', 'grid', 'row0', 'col0', 'rows', 'cols', 'values')
+
+    def __init__(self, zoom: int, grid: int, row0: int, col0: int, rows: int, cols: int, values: array):
+        self.zoom = zoom
+        self.grid = grid
+        self.row0 = row0
+        self.col0 = col0
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+
+
+class DensityPyramid:
+    """Time-decayed check-in density over the campus box, kept at every zoom level.
+
+    Zoom 0 is the coarsest grid and each level doubles the cells per side up to
+    ``finest``; row 0 is the north edge. A check-in adds its weight to one cell
+    per level and a check-out (or TTL expiry) subtracts exactly what it added, so
+    updates cost O(levels) however many people are on campus.
+
+    Decay is applied on read: a check-in at time t is stored with weight
+    e^(rate * (t - epoch)) and every read multiplies by e^(-rate * (now - epoch)),
+    so stored cells never need touching as time passes.
+    """
+
+    def __init__(self, south: float, west: float, north: float, east: float, levels: int, finest: int, half_life: float):
+        self.south, self.west, self.north, self.east = south, west, north, east
+        self.levels = levels
+        self.sizes = [max(1, finest >> (levels - 1 - z)) for z in range(levels)]
+        self.finest = self.sizes[-1]
+        self.grids = [array('d', bytes(8 * n * n)) for n in self.sizes]
+        self.rate = math.log(2) / half_life
+        self.half_life = half_life
+        self.epoch = time.time()
+        # id -> ((row, col) at the finest level, scaled weight added, expires_at)
+        self._members: Dict[str, Tuple[Tuple[int, int], float, Optional[float]]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self.version = 0
+        self.outside = 0
+        self.rebases = 0
+
+    def _cell(self, lat: float, lng: float) -> Optional[Tuple[int, int]]:
+        if not (self.south <= lat < self.north and self.west <= lng < self.east):
+            return None
+        n = self.finest
+        row = int((self.north - lat) / (self.north - self.south) * n)
+        col = int((lng - self.west) / (self.east - self.west) * n)
+        return min(row, n - 1), min(col, n - 1)
+
+    def _add(self, row: int, col: int, weight: float) -> None:
+        top = self.levels - 1
+        for z, n in enumerate(self.sizes):
+            shift = top - z
+            self.grids[z][(row >> shift) * n + (col >> shift)] += weight
+
+    def check_in(self, point_id: str, lat: float, lng: float, ttl: Optional[float] = None, now: Optional[float] = None) -> bool:
+        now = now or time.time()
+        self.expire(now)
+        self.check_out(point_id)
+        cell = self._cell(lat, lng)
+        if cell is None:
+            self.outside += 1
+            return False
+        if self.rate * (now - self.epoch) > _REBASE_AT:
+            self._rebase(now)
+        weight = math.exp(self.rate * (now - self.epoch))
+        self._add(cell[0], cell[1], weight)
+        expires_at = now + ttl if ttl else None
+        self._members[point_id] = (cell, weight, expires_at)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, point_id))
+        self.version += 1
+        return True
+
+    def check_out(self, point_id: str) -> bool:
+        member = self._members.pop(point_id, None)
+        if member is None:
+            return False
+        (row, col), weight, _ = member
+        self._add(row, col, -weight)
+        self.version += 1
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, point_id = heapq.heappop(self._expiry)
+            member = self._members.get(point_id)
+            # Skip heap entries left behind by a later check-in of the same id.
+            if member is not None and member[2] == expires_at:
+                self.check_out(point_id)
+                removed += 1
+        return removed
+
+    def _rebase(self, now: float) -> None:
+        factor = math.exp(-self.rate * (now - self.epoch))
+        for grid in self.grids:
+            for i in range(len(grid)):
+                grid[i] *= factor
+        self._members = {pid: (cell, weight * factor, exp) for pid, (cell, weight, exp) in self._members.items()}
+        self.epoch = now
+        self.rebases += 1
+
+    def _span(self, lo: float, hi: float, origin: float, extent: float, n: int, flip: bool) -> Tuple[int, int]:
+        a = (origin - hi) / extent if flip else (lo - origin) / extent
+        b = (origin - lo) / extent if flip else (hi - origin) / extent
+        start = max(0, min(n - 1, int(math.floor(a * n))))
+        end = max(start, min(n - 1, int(math.ceil(b * n)) - 1))
+        return start, end - start + 1
+
+    def tile(
+        self,
+        zoom: int,
+        south: Optional[float] = None,
+        west: Optional[float] = None,
+        north: Optional[float] = None,
+        east: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> Tile:
+        """Quantized decayed counts for the cells of ``zoom`` covering the viewport (default: whole campus)."""
+        if not 0 <= zoom < self.levels:
+            raise ValueError(f'zoom must be between 0 and {self.levels - 1}')
+        now = now or time.time()
+        self.expire(now)
+        n = self.sizes[zoom]
+        south = self.south if south is None else south
+        north = self.north if north is None else north
+        west = self.west if west is None else west
+        east = self.east if east is None else east
+        if south >= north or west >= east:
+            raise ValueError('empty viewport')
+        row0, rows = self._span(south, north, self.north, self.north - self.south, n, flip=True)
+        col0, cols = self._span(west, east, self.west, self.east - self.west, n, flip=False)
+        if rows * cols > MAX_TILE_CELLS:
+            raise ValueError(f'viewport covers {rows * cols} cells at zoom {zoom}; zoom out or narrow it (max {MAX_TILE_CELLS})')
+        scale = math.exp(-self.rate * (now - self.epoch)) * QUANT
+        grid = self.grids[zoom]
+        values = array('H')
+        for r in range(row0, row0 + rows):
+            start = r * n + col0
+            # Cells can sit a hair below zero after subtracting float weights.
+            values.extend(min(65535, max(0, int(v * scale + 0.5))) for v in grid[start:start + cols])
+        return Tile(zoom, n, row0, col0, rows, cols, values)
+
+    def meta(self) -> dict:
+        return {
+            'bbox': {'south': self.south, 'west': self.west, 'north': self.north, 'east': self.east},
+            'grids': self.sizes,
+            'quant': QUANT,
+            'half_life_s': self.half_life,
+        }
+
+    def stats(self) -> dict:
+        return {
+            'checked_in': len(self._members),
+            'expiry_heap': len(self._expiry),
+            'updates': self.version,
+            'outside': self.outside,
+            'rebases': self.rebases,
+            'cells': sum(len(g) for g in self.grids),
+        }
+
+
+def encode_binary(tile: Tile) -> bytes:
+    values = tile.values
+    if sys.byteorder == 'big':
+        values = array('H', values)
+        values.byteswap()
+    header = BINARY_HEADER.pack(BINARY_MAGIC, tile.zoom, tile.grid, tile.row0, tile.col0, tile.rows, tile.cols, QUANT)
+    return header + zlib.compress(values.tobytes(), 6)
+
+
+def encode_delta(tile: Tile) -> dict:
+    """Sparse JSON: ``cells`` alternates the gap since the previous non-zero cell
+    (row-major within the tile, starting from -1) and that cell's value."""
+    cells = []
+    last = -1
+    for i, v in enumerate(tile.values):
+        if v:
+            cells.append(i - last - 1)
+            cells.append(v)
+            last = i
+    return {
+        'zoom': tile.zoom,
+        'grid': tile.grid,
+        'row0': tile.row0,
+        'col0': tile.col0,
+        'rows': tile.rows,
+        'cols': tile.cols,
+        'quant': QUANT,
+        'cells': cells,
+    }
+
+
+heatmap = DensityPyramid(
+    campus.south, campus.west, campus.north, campus.east,
+    campus.heatmap_levels, campus.heatmap_finest, campus.heatmap_half_life,
+)
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from server.utils.gemini_client import GeminiError
+
+
+class HedgeResult:
+    def __init__(self, model: str, value: Any, valid: bool, attempts: List[dict]):
+        self.model = model
+        self.value = value
+        self.valid = valid
+        self.attempts = attempts
+
+
+async def hedged(
+    models: List[str],
+    call: Callable[[str], Awaitable[Any]],
+    hedge_after: Optional[float],
+    validate: Callable[[Any], bool] = lambda value: True,
+) -> HedgeResult:
+    """Call ``models`` in order, starting the next one early if the current ones are slow.
+
+    A new attempt starts when every running attempt has failed, or when none has
+    answered within ``hedge_after`` seconds (``None`` disables hedging, giving plain
+    sequential fallback). The first result passing ``validate`` wins and the other
+    attempts are cancelled. If no attempt is valid, the first invalid result is
+    returned with ``valid=False``; if every attempt errored, the last error is raised.
+    """
+    models = list(dict.fromkeys(models))
+    attempts: List[dict] = []
+    running = {}
+    first_invalid = None
+    last_error: Optional[GeminiError] = None
+    next_index = 0
+
+    def launch() -> None:
+        nonlocal next_index
+        model = models[next_index]
+        next_index += 1
+        attempt = {"model": model, "started_ms": _ms_since(t0), "latency_ms": None, "outcome": "pending"}
+        attempts.append(attempt)
+        running[asyncio.ensure_future(call(model))] = attempt
+
+    t0 = time.perf_counter()
+    launch()
+    try:
+        while running:
+            can_hedge = hedge_after is not None and next_index < len(models)
+            done, _ = await asyncio.wait(
+                running, timeout=hedge_after if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch()
+                continue
+            for task in done:
+                attempt = running.pop(task)
+                attempt["latency_ms"] = _ms_since(t0) - attempt["started_ms"]
+                error = task.exception()
+                if error is not None:
+                    if not isinstance(error, GeminiError):
+                        raise error
+                    attempt["outcome"] = f"error {error.status_code}"
+                    last_error = error
+                elif validate(task.result()):
+                    attempt["outcome"] = "won"
+                    return HedgeResult(attempt["model"], task.result(), True, attempts)
+                else:
+                    attempt["outcome"] = "invalid"
+                    if first_invalid is None:
+                        first_invalid = (attempt["model"], task.result())
+            if not running and next_index < len(models):
+                launch()
+    finally:
+        for task, attempt in running.items():
+            task.cancel()
+            attempt["outcome"] = "cancelled"
+            attempt["latency_ms"] = _ms_since(t0) - attempt["started_ms"]
+
+    if first_invalid is not None:
+        return HedgeResult(first_invalid[0], first_invalid[1], False, attempts)
+    raise last_error or GeminiError(500, "Gemini request failed for all models tried")
+
+
+def _ms_since(t0: float) -> int:
+    return int((time.perf_counter() - t0) * 1000)
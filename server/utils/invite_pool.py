@@ -0,0 +1,120 @@
+import asyncio
+import random
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from server.config.gemini import gemini
+
+
+# Generic one-liners served while a pool is still being filled (or with no API key).
+STARTER_MESSAGES = (
+    "Hey, want to study together later today?",
+    "Hey, want to go over the practice problems together?",
+    "Hey, up for a quick review session this week?",
+    "Hey, want to compare notes before the next exam?",
+    "Hey, free to work through the homework together?",
+    "Hey, want to quiz each other on this week's material?",
+)
+
+
+class InvitePool:
+    """Pregenerated invite messages per key ('CSE310', 'CSE' or '*'), refilled in the background.
+
+    ``take`` never waits: it rotates through the pools from most to least
+    specific, taking each message at most once per call, retires each message after ``max_uses`` picks, and schedules one
+    ``refill(key, n)`` per key once a pool is below ``watermark``. At most
+    ``max_keys`` pools are kept (least recently used dropped first).
+    """
+
+    def __init__(
+        self,
+        refill: Callable[[str, int], Awaitable[List[str]]],
+        size: Optional[int] = None,
+        watermark: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        max_keys: Optional[int] = None,
+    ):
+        self.refill = refill
+        self.size = size or gemini.invite_pool_size
+        self.watermark = watermark or gemini.invite_pool_watermark
+        self.max_uses = max_uses or gemini.invite_message_uses
+        self.max_keys = max_keys or gemini.invite_pool_keys
+        self._pools: 'OrderedDict[str, Deque[list]]' = OrderedDict()
+        self._refilling: Dict[str, asyncio.Task] = {}
+        self.served = 0
+        self.starter = 0
+        self.refills = 0
+        self.refill_failures = 0
+
+    def _pool(self, key: str) -> Deque[list]:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = deque()
+            while len(self._pools) > self.max_keys:
+                self._pools.popitem(last=False)
+        else:
+            self._pools.move_to_end(key)
+        return pool
+
+    def take(self, keys: List[str], n: int, can_refill: bool = True) -> List[str]:
+        """``n`` different messages, from ``keys`` in order (most specific first), then starters."""
+        if can_refill:
+            for key in keys:
+                if len(self._pool(key)) < self.watermark:
+                    self._schedule(key)
+        out: List[str] = []
+        for key in keys:
+            pool = self._pools.get(key)
+            # One pass over the pool at most, so a small pool never repeats a message.
+            for _ in range(len(pool) if pool else 0):
+                if len(out) >= n:
+                    break
+                entry = pool.popleft()
+                if entry[0] not in out:
+                    out.append(entry[0])
+                    entry[1] += 1
+                if entry[1] < self.max_uses:
+                    pool.append(entry)
+            if len(out) >= n:
+                break
+        self.served += len(out)
+        missing = n - len(out)
+        if missing > 0:
+            self.starter += missing
+            unused = [m for m in STARTER_MESSAGES if m not in out]
+            out += random.sample(unused, min(missing, len(unused)))
+            out += [random.choice(STARTER_MESSAGES) for _ in range(n - len(out))]
+        return out
+
+    def _schedule(self, key: str) -> None:
+        if key in self._refilling:
+            return
+        task = asyncio.ensure_future(self._refill(key))
+        self._refilling[key] = task
+        task.add_done_callback(lambda _: self._refilling.pop(key, None))
+
+    async def _refill(self, key: str) -> None:
+        try:
+            messages = await self.refill(key, self.size - len(self._pool(key)))
+        except Exception:
+            self.refill_failures += 1
+            return
+        self.refills += 1
+        pool = self._pools.get(key)
+        if pool is None:
+            return
+        have = {entry[0] for entry in pool}
+        fresh = [m for m in dict.fromkeys(messages) if m not in have]
+        random.shuffle(fresh)
+        pool.extend([m, 0] for m in fresh[:max(0, self.size - len(pool))])
+
+    def stats(self) -> dict:
+        return {
+            'pools': len(self._pools),
+            'messages': sum(len(p) for p in self._pools.values()),
+            'refilling': len(self._refilling),
+            'served': self.served,
+            'starter_served': self.starter,
+            'refills': self.refills,
+            'refill_failures': self.refill_failures,
+        }
@@ -0,0 +1,130 @@
+import json
+from typing import Dict, List, Tuple
+
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class ObjectStreamParser:
+    """Incremental parser for the first top-level JSON object in a stream of text chunks.
+
+    ``feed()`` returns ``(key, delta)`` pairs for string values as their characters
+    arrive, so callers can forward e.g. a reply's ``text`` before the object is
+    complete. A ``(key, None)`` pair marks the end of a string value. Text before the
+    first ``{`` that opens an object (prose, markdown fences) is skipped; non-string
+    values are captured whole and decoded into ``values`` once they end.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, object] = {}
+        self.started = False
+        self.done = False
+        self._state = 'before'
+        self._key = ''
+        self._buf = ''
+        self._escape = ''
+        self._depth = 0
+        self._in_str = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        events: List[Tuple[str, object]] = []
+        delta: List[str] = []
+        for ch in chunk:
+            if self.done:
+                break
+            st = self._state
+            if st == 'before':
+                if ch == '{':
+                    self.started = True
+                    self._state = 'key_or_end'
+            elif st == 'key_or_end':
+                if ch == '"':
+                    self._key, self._escape, self._state = '', '', 'key'
+                elif ch == '}':
+                    self.done = True
+                elif not self.values and not ch.isspace() and ch != ',':
+                    # A brace in prose ("{as requested}"), not an object: keep looking.
+                    self.started = ch == '{'
+                    self._state = 'key_or_end' if self.started else 'before'
+            elif st == 'key':
+                out = self._string_char(ch)
+                if out is None:
+                    self._state = 'colon'
+                else:
+                    self._key += out
+            elif st == 'colon':
+                if ch == ':':
+                    self._state = 'value'
+            elif st == 'value':
+                if ch == '"':
+                    self.values[self._key] = ''
+                    self._escape, self._state = '', 'string'
+                elif not ch.isspace():
+                    self._buf, self._depth, self._in_str = '', 0, False
+                    self._state = 'other'
+                    self._other_char(ch)
+            elif st == 'string':
+                out = self._string_char(ch)
+                if out is None:
+                    if delta:
+                        events.append((self._key, ''.join(delta)))
+                        delta = []
+                    events.append((self._key, None))
+                    self._state = 'key_or_end'
+                elif out:
+                    self.values[self._key] += out
+                    delta.append(out)
+            elif st == 'other':
+                self._other_char(ch)
+        if delta:
+            events.append((self._key, ''.join(delta)))
+        return events
+
+    def _string_char(self, ch: str):
+        # Returns decoded text ('' while inside an escape) or None at the closing quote.
+        if self._escape:
+            self._escape += ch
+            if self._escape[1] == 'u':
+                if len(self._escape) < 6:
+                    return ''
+                out = chr(int(self._escape[2:], 16))
+            else:
+                out = _ESCAPES.get(ch, ch)
+            self._escape = ''
+            return out
+        if ch == '\\':
+            self._escape = ch
+            return ''
+        if ch == '"':
+            return None
+        return ch
+
+    def _other_char(self, ch: str) -> None:
+        if self._in_str:
+            if self._escape:
+                self._escape = ''
+            elif ch == '\\':
+                self._escape = ch
+            elif ch == '"':
+                self._in_str = False
+        elif ch == '"':
+            self._in_str = True
+        elif ch in '[{':
+            self._depth += 1
+        elif ch in ']}':
+            if self._depth == 0:
+                self._end_other()
+                self.done = True
+                return
+            self._depth -= 1
+        elif ch == ',' and self._depth == 0:
+            self._end_other()
+            self._state = 'key_or_end'
+            return
+        self._buf += ch
+
+    def _end_other(self) -> None:
+        try:
+            self.values[self._key] = json.loads(self._buf)
+        except json.JSONDecodeError:
+            self.values[self._key] = self._buf.strip()
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from server.config.firebase import firebase
+
+
+# Log records: a new user id ('N', byte length, UTF-8) takes the next interned
+# number, so ids are implied by record order; a like is ('L', liker, likee).
+_NAME = struct.Struct('<cH')
+_LIKE = struct.Struct('<cII')
+
+
+class LikeGraph:
+    """Who liked whom, with mutual likes detected as the second like arrives.
+
+    User ids are interned to ints and each user's outgoing likes are a sorted
+    ``array('I')``, so a like is one bisect into the likee's row and memory is
+    4 bytes per like. Mutations happen on the event loop thread only (the like
+    endpoint is async), so there is nothing to lock.
+
+    Every new id and like is appended to a buffer that a background task writes
+    to ``log_path`` every ``flush_interval`` seconds; ``load`` replays the log
+    on start. A like is durable once its flush completes.
+    """
+
+    def __init__(self, log_path: str = '', flush_interval: float = 0.5):
+        self.log_path = log_path
+        self.flush_interval = flush_interval
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._out: List[array] = []
+        self._buffer = bytearray()
+        self._task: Optional[asyncio.Task] = None
+        self.likes = 0
+        self.mutual = 0
+        self.duplicates = 0
+        self.replayed = 0
+        self.log_bytes = 0
+        self.torn_bytes = 0
+
+    def _intern(self, user_id: str, log: bool = True) -> int:
+        n = self._ids.get(user_id)
+        if n is None:
+            n = len(self._names)
+            self._ids[user_id] = n
+            self._names.append(user_id)
+            self._out.append(array('I'))
+            if log and self.log_path:
+                data = user_id.encode('utf-8')
+                self._buffer += _NAME.pack(b'N', len(data)) + data
+        return n
+
+    def _has(self, a: int, b: int) -> bool:
+        row = self._out[a]
+        i = bisect_left(row, b)
+        return i < len(row) and row[i] == b
+
+    def _link(self, a: int, b: int) -> bool:
+        row = self._out[a]
+        i = bisect_left(row, b)
+        if i < len(row) and row[i] == b:
+            return False
+        row.insert(i, b)
+        return True
+
+    def like(self, liker: str, likee: str) -> bool:
+        """Record ``liker`` -> ``likee``; True only when this like completes a mutual pair."""
+        if liker == likee:
+            raise ValueError('cannot like yourself')
+        a = self._intern(liker)
+        b = self._intern(likee)
+        if not self._link(a, b):
+            self.duplicates += 1
+            return False
+        self.likes += 1
+        if self.log_path:
+            self._buffer += _LIKE.pack(b'L', a, b)
+        if self._has(b, a):
+            self.mutual += 1
+            return True
+        return False
+
+    def likes_of(self, user_id: str) -> List[str]:
+        n = self._ids.get(user_id)
+        return [] if n is None else [self._names[b] for b in self._out[n]]
+
+    def mutuals_of(self, user_id: str) -> List[str]:
+        n = self._ids.get(user_id)
+        return [] if n is None else [self._names[b] for b in self._out[n] if self._has(b, n)]
+
+    def load(self) -> int:
+        """Rebuild from the log (call before serving likes); returns the likes replayed.
+
+        A record cut short by a crash mid-write is truncated away so later appends line up.
+        """
+        if not self.log_path or not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, 'rb') as f:
+            data = f.read()
+        view = memoryview(data)
+        pos, end, replayed = 0, len(data), 0
+        while pos < end:
+            kind = data[pos:pos + 1]
+            if kind == b'L' and pos + _LIKE.size <= end:
+                _, a, b = _LIKE.unpack_from(view, pos)
+                if max(a, b) >= len(self._names):
+                    break
+                if self._link(a, b):
+                    replayed += 1
+                pos += _LIKE.size
+            elif kind == b'N' and pos + _NAME.size <= end:
+                _, size = _NAME.unpack_from(view, pos)
+                if pos + _NAME.size + size > end:
+                    break
+                self._intern(bytes(view[pos + _NAME.size:pos + _NAME.size + size]).decode('utf-8'), log=False)
+                pos += _NAME.size + size
+            else:
+                break
+        if pos < end:
+            self.torn_bytes += end - pos
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(pos)
+        self.likes += replayed
+        self.mutual += sum(1 for a, row in enumerate(self._out) for b in row if b > a and self._has(b, a))
+        self.replayed = replayed
+        self.log_bytes = pos
+        return replayed
+
+    def _append(self, data: bytes) -> None:
+        with open(self.log_path, 'ab') as f:
+            f.write(data)
+
+    async def flush(self) -> int:
+        if not self._buffer or not self.log_path:
+            return 0
+        # Swap first: likes arriving during the write go to the next flush.
+        data, self._buffer = bytes(self._buffer), bytearray()
+        try:
+            await asyncio.to_thread(self._append, data)
+        except Exception:
+            self._buffer[:0] = data
+            raise
+        self.log_bytes += len(data)
+        return len(data)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except OSError:
+                pass  # still buffered; retried next round
+
+    def start(self) -> None:
+        if self._task is None:
+            self.load()
+            if self.log_path:
+                self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            'users': len(self._names),
+            'likes': self.likes,
+            'mutual': self.mutual,
+            'duplicates': self.duplicates,
+            'replayed': self.replayed,
+            'pending_log_bytes': len(self._buffer),
+            'log_bytes': self.log_bytes,
+            'torn_bytes': self.torn_bytes,
+            'adjacency_bytes': sum(len(row) * row.itemsize for row in self._out),
+        }
+
+
+likes = LikeGraph(firebase.likes_log_path, flush_interval=firebase.flush_ms / 1000.0)
@@ -0,0 +1,128 @@
+import asyncio
+import math
+from collections import deque
+from typing import Awaitable, Deque, Dict, TypeVar
+
+from server.config.gemini import gemini
+
+
+T = TypeVar('T')
+
+# name -> limiter, for /stats/limits
+limiters: Dict[str, 'RouteLimiter'] = {}
+
+
+class Overloaded(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class RouteLimiter:
+    """Caps concurrent requests on a route and sheds the excess instead of queueing forever.
+
+    Up to ``max_concurrent`` callers run at once. Past that, up to ``max_waiting``
+    callers wait in FIFO order for at most ``wait_timeout`` seconds (then 503);
+    anyone beyond the queue is rejected immediately (429).
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int, wait_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.active = 0
+        self.waiting = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        limiters[name] = self
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.wait_timeout))
+
+    async def acquire(self) -> None:
+        if self.active < self.max_concurrent and not self.waiting:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise Overloaded(429, f'Too many {self.name} requests in flight', self.retry_after)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.waiting += 1
+        try:
+            # A released slot is handed over by resolving the future; `active` is unchanged.
+            await asyncio.wait_for(fut, self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(503, f'{self.name} is overloaded, try again shortly', self.retry_after)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        finally:
+            self.waiting -= 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_waiting': self.max_waiting,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+        }
+
+
+def route_limiter(name: str) -> RouteLimiter:
+    limiter = limiters.get(name)
+    if limiter is None:
+        limiter = RouteLimiter(name, gemini.concurrency_for(name), gemini.route_queue, gemini.route_queue_timeout)
+    return limiter
+
+
+async def _wait_disconnect(receive) -> None:
+    # Once the body has been read, the next ASGI message is the disconnect.
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def until_disconnected(receive, aw: Awaitable[T]) -> T:
+    """Await ``aw``, cancelling it (and whatever upstream call it is in) if the client goes away."""
+    work = asyncio.ensure_future(aw)
+    watcher = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if not work.done():
+        work.cancel()
+        # Let the cancellation unwind (releasing limiter slots and sockets) before returning.
+        await asyncio.wait({work})
+        raise ClientDisconnected()
+    return work.result()
@@ -1,3 +1,243 @@
-def measure() -> dict:
-  return {"ok": True}
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
 
+# Metrics are only updated from the event loop thread (ASGI middleware and the
+# async Gemini client), so plain dict/list increments need no locks.
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+  parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+  if extra:
+    parts.append(extra)
+  return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(v) -> str:
+  return str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+  kind = 'counter'
+
+  def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+    self.name, self.help, self.labels = name, help, labels
+    self._values: Dict[tuple, float] = {}
+
+  def inc(self, *labels, value: float = 1) -> None:
+    self._values[labels] = self._values.get(labels, 0) + value
+
+  def render(self) -> List[str]:
+    return [f'{self.name}{_fmt_labels(self.labels, k)} {v}' for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+  kind = 'gauge'
+
+  def dec(self, *labels, value: float = 1) -> None:
+    self.inc(*labels, value=-value)
+
+
+class Histogram:
+  kind = 'histogram'
+
+  def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = ()):
+    self.name, self.help, self.labels = name, help, labels
+    self.buckets = tuple(sorted(buckets))
+    # labels -> [per-bucket counts..., +Inf count, sum]
+    self._values: Dict[tuple, list] = {}
+
+  def observe(self, value: float, *labels) -> None:
+    row = self._values.get(labels)
+    if row is None:
+      row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+    row[bisect_left(self.buckets, value)] += 1
+    row[-1] += value
+
+  def render(self) -> List[str]:
+    lines = []
+    for k, row in self._values.items():
+      cumulative = 0
+      for bound, count in zip(self.buckets, row):
+        cumulative += count
+        le = 'le="%s"' % bound
+        lines.append(f'{self.name}_bucket{_fmt_labels(self.labels, k, le)} {cumulative}')
+      cumulative += row[len(self.buckets)]
+      le = 'le="+Inf"'
+      lines.append(f'{self.name}_bucket{_fmt_labels(self.labels, k, le)} {cumulative}')
+      lines.append(f'{self.name}_sum{_fmt_labels(self.labels, k)} {row[-1]}')
+      lines.append(f'{self.name}_count{_fmt_labels(self.labels, k)} {cumulative}')
+    return lines
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+_metrics: List = []
+# name -> callable returning a flat dict of numbers, exported as gauges
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def _register(metric):
+  _metrics.append(metric)
+  return metric
+
+
+http_requests = _register(Counter('http_requests_total', 'HTTP requests served.', ('method', 'route', 'status')))
+http_latency = _register(Histogram('http_request_duration_seconds', 'HTTP request latency.', ('method', 'route'), LATENCY_BUCKETS))
+http_in_flight = _register(Gauge('http_requests_in_flight', 'HTTP requests currently being served.', ('method',)))
+gemini_calls = _register(Counter('gemini_requests_total', 'Upstream Gemini calls.', ('model', 'outcome')))
+gemini_latency = _register(Histogram('gemini_request_duration_seconds', 'Upstream Gemini call latency.', ('model', 'outcome'), LATENCY_BUCKETS))
+gemini_prompt_bytes = _register(Histogram('gemini_prompt_bytes', 'Request body size sent to Gemini.', ('model',), BYTES_BUCKETS))
+gemini_response_bytes = _register(Histogram('gemini_response_bytes', 'Response body size received from Gemini.', ('model',), BYTES_BUCKETS))
+json_parses = _register(Counter('gemini_json_parses_total', 'Parses of structured model output by outcome (ok, no_json, schema).', ('route', 'model', 'outcome')))
+
+
+def register_collector(prefix: str, fn: Callable[[], dict]) -> None:
+  _collectors[prefix] = fn
+
+
+@contextmanager
+def measure(histogram: Histogram, *labels):
+  t0 = time.perf_counter()
+  try:
+    yield
+  finally:
+    histogram.observe(time.perf_counter() - t0, *labels)
+
+
+def render() -> str:
+  lines = []
+  for m in _metrics:
+    lines.append(f'# HELP {m.name} {m.help}')
+    lines.append(f'# TYPE {m.name} {m.kind}')
+    lines.extend(m.render())
+  for prefix, fn in _collectors.items():
+    for key, value in _flatten(fn()):
+      if isinstance(value, bool) or not isinstance(value, (int, float)):
+        continue
+      name = f'aithena_{prefix}_{key}'
+      lines.append(f'# TYPE {name} gauge')
+      lines.append(f'{name} {value}')
+  return '\n'.join(lines) + '\n'
+
+
+def _flatten(d: dict, prefix: str = ''):
+  for k, v in d.items():
+    key = f'{prefix}{k}'.replace('-', '_').replace('.', '_')
+    if isinstance(v, dict):
+      yield from _flatten(v, key + '_')
+    else:
+      yield key, v
+
+
+# --- per-request profiling -------------------------------------------------
+# A request carrying `X-Profile: <AITHENA_PROFILE_TOKEN>` runs under a sampling
+# profiler (pyinstrument, when installed; cProfile otherwise). The report is
+# kept in memory and its id returned in the `X-Profile-Id` response header.
+# Either profiler hooks the whole loop thread, so one request is profiled at a
+# time; a second profiled request meanwhile gets a 409.
+
+PROFILE_TOKEN = os.getenv('AITHENA_PROFILE_TOKEN', '')
+_profiles: 'OrderedDict[str, tuple]' = OrderedDict()
+_MAX_PROFILES = 20
+_profiling = False
+
+
+def profile_report(profile_id: str):
+  """(media_type, body) for a stored profile, or None."""
+  return _profiles.get(profile_id)
+
+
+class _Profiler:
+  def __init__(self):
+    try:
+      from pyinstrument import Profiler
+    except ImportError:
+      Profiler = None
+    if Profiler is not None:
+      self._impl, self._p = 'pyinstrument', Profiler(interval=0.001, async_mode='enabled')
+    else:
+      import cProfile
+      self._impl, self._p = 'cprofile', cProfile.Profile()
+
+  def start(self):
+    self._p.start() if self._impl == 'pyinstrument' else self._p.enable()
+
+  def stop(self) -> tuple:
+    if self._impl == 'pyinstrument':
+      self._p.stop()
+      return 'text/html', self._p.output_html().encode('utf-8')
+    self._p.disable()
+    import io
+    import pstats
+    out = io.StringIO()
+    pstats.Stats(self._p, stream=out).sort_stats('cumulative').print_stats(60)
+    return 'text/plain', out.getvalue().encode('utf-8')
+
+
+async def _busy(send):
+  body = json.dumps({'detail': 'Another request is being profiled, try again shortly'}).encode()
+  await send({'type': 'http.response.start', 'status': 409, 'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+  await send({'type': 'http.response.body', 'body': body})
+
+
+class MetricsMiddleware:
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] != 'http':
+      return await self.app(scope, receive, send)
+
+    global _profiling
+    method = scope['method']
+    status = [500]
+    profiler = None
+    profile_id = None
+    if PROFILE_TOKEN:
+      for k, v in scope.get('headers') or ():
+        if k == b'x-profile' and v.decode('latin-1') == PROFILE_TOKEN:
+          if _profiling:
+            return await _busy(send)
+          profiler, profile_id = _Profiler(), uuid.uuid4().hex[:12]
+          _profiling = True
+          break
+
+    async def send_wrapper(message):
+      if message['type'] == 'http.response.start':
+        status[0] = message['status']
+        if profile_id is not None:
+          message = {**message, 'headers': list(message.get('headers', [])) + [(b'x-profile-id', profile_id.encode())]}
+      await send(message)
+
+    if profiler is not None:
+      try:
+        profiler.start()
+      except BaseException:
+        _profiling = False
+        raise
+    http_in_flight.inc(method)
+    t0 = time.perf_counter()
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      elapsed = time.perf_counter() - t0
+      if profiler is not None:
+        try:
+          _profiles[profile_id] = profiler.stop()
+        finally:
+          _profiling = False
+        while len(_profiles) > _MAX_PROFILES:
+          _profiles.popitem(last=False)
+      http_in_flight.dec(method)
+      route = scope.get('route')
+      # Route templates (not raw paths) keep label cardinality bounded.
+      path = getattr(route, 'path', None) or 'unmatched'
+      http_requests.inc(method, path, str(status[0]))
+      http_latency.observe(elapsed, method, path)
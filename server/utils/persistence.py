@@ -0,0 +1,359 @@
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from server.config.firebase import firebase
+from server.models.match import Match
+from server.models.session import StudySession
+from server.models.user import User
+from server.utils.limits import Overloaded
+
+
+# (collection, document id) -> document, or None for a delete
+Op = Tuple[str, str, Optional[dict]]
+
+
+class MemoryStore:
+    """In-process stand-in for Firestore, for tests and benchmarks."""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, dict]] = {}
+        self.commits = 0
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        doc = self._docs.get(collection, {}).get(doc_id)
+        return dict(doc) if doc is not None else None
+
+    def list(self, collection: str, limit: int) -> List[dict]:
+        return [dict(d) for d in list(self._docs.get(collection, {}).values())[:limit]]
+
+    def commit(self, ops: List[Op]) -> None:
+        for collection, doc_id, doc in ops:
+            docs = self._docs.setdefault(collection, {})
+            if doc is None:
+                docs.pop(doc_id, None)
+            else:
+                docs[doc_id] = dict(doc)
+        self.commits += 1
+
+
+class SqliteStore:
+    """File-backed stand-in for Firestore; one transaction per committed batch."""
+
+    def __init__(self, path: str):
+        self.commits = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            ' collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL,'
+            ' PRIMARY KEY (collection, id))'
+        )
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute('SELECT data FROM documents WHERE collection = ? AND id = ?', (collection, doc_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, collection: str, limit: int) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT data FROM documents WHERE collection = ? ORDER BY updated_at LIMIT ?', (collection, limit)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def commit(self, ops: List[Op]) -> None:
+        now = time.time()
+        puts = [(c, i, json.dumps(d), now) for c, i, d in ops if d is not None]
+        deletes = [(c, i) for c, i, d in ops if d is None]
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany(
+                    'INSERT INTO documents (collection, id, data, updated_at) VALUES (?, ?, ?, ?)'
+                    ' ON CONFLICT (collection, id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at',
+                    puts,
+                )
+                self._db.executemany('DELETE FROM documents WHERE collection = ? AND id = ?', deletes)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        self.commits += 1
+
+
+class FirestoreStore:
+    """Cloud Firestore via google-cloud-firestore (installed separately in production)."""
+
+    # Firestore rejects batched writes with more than 500 operations.
+    MAX_BATCH = 500
+
+    def __init__(self, project_id: str):
+        from google.cloud import firestore
+
+        self._client = firestore.Client(project=project_id)
+        self.commits = 0
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        snap = self._client.collection(collection).document(doc_id).get()
+        return snap.to_dict() if snap.exists else None
+
+    def list(self, collection: str, limit: int) -> List[dict]:
+        return [snap.to_dict() for snap in self._client.collection(collection).limit(limit).stream()]
+
+    def commit(self, ops: List[Op]) -> None:
+        for start in range(0, len(ops), self.MAX_BATCH):
+            batch = self._client.batch()
+            for collection, doc_id, doc in ops[start:start + self.MAX_BATCH]:
+                ref = self._client.collection(collection).document(doc_id)
+                if doc is None:
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, doc)
+            batch.commit()
+            self.commits += 1
+
+
+_DELETED = object()
+
+
+class DocumentStore:
+    """Read-through cache and write-behind queue in front of a document backend.
+
+    Writes land in the cache (so they are read back at once) and in a dirty map
+    keyed by document, where repeated writes to the same document coalesce. A
+    background task commits the dirty map in batches of up to ``batch_size``
+    every ``flush_interval`` seconds, or as soon as that many documents are
+    dirty; ``close`` commits whatever is left. A failed commit puts its writes
+    back (unless newer ones arrived meanwhile) and is retried on the next flush.
+    Reads check the dirty map before the backend, so a pending write evicted from
+    the cache is still what is read back. While the backend is down, at most
+    ``max_pending`` documents wait; writes to further documents are refused with
+    ``Overloaded`` (503) until flushes catch up.
+    Backend calls run in a thread so they never block the event loop; everything
+    else must be called on the event loop.
+    """
+
+    def __init__(self, backend, flush_interval: float = 0.5, batch_size: int = 500, cache_size: int = 10000, max_pending: int = 100000):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self._cache: 'OrderedDict[Tuple[str, str], Any]' = OrderedDict()
+        self._dirty: 'OrderedDict[Tuple[str, str], Optional[dict]]' = OrderedDict()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.writes = 0
+        self.coalesced = 0
+        self.flushed_docs = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.refused = 0
+
+    def _remember(self, key: Tuple[str, str], value: Any) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _admit(self, key: Tuple[str, str]) -> None:
+        # Rewrites of an already pending document coalesce and are always taken.
+        if len(self._dirty) >= self.max_pending and key not in self._dirty:
+            self.refused += 1
+            if self._wake is not None:
+                self._wake.set()
+            raise Overloaded(503, 'Document writes are backed up, try again shortly', max(1, math.ceil(self.flush_interval)))
+
+    def _enqueue(self, key: Tuple[str, str], doc: Optional[dict]) -> None:
+        self.writes += 1
+        if key in self._dirty:
+            self.coalesced += 1
+        self._dirty[key] = doc
+        if len(self._dirty) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    def put(self, collection: str, doc_id: str, doc: dict) -> None:
+        key = (collection, doc_id)
+        self._admit(key)
+        doc = dict(doc)
+        self._remember(key, doc)
+        self._enqueue(key, doc)
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        key = (collection, doc_id)
+        self._admit(key)
+        self._remember(key, _DELETED)
+        self._enqueue(key, None)
+
+    def _local(self, key: Tuple[str, str]) -> Any:
+        # The cached value, else a pending write the cache has already evicted.
+        value = self._cache.get(key)
+        if value is None and key in self._dirty:
+            doc = self._dirty[key]
+            value = _DELETED if doc is None else doc
+            self._remember(key, value)
+        return value
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        key = (collection, doc_id)
+        value = self._local(key)
+        if value is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return None if value is _DELETED else dict(value)
+        self.misses += 1
+        doc = await asyncio.to_thread(self.backend.get, collection, doc_id)
+        # A local write that landed while the read was in flight wins. Misses aren't
+        # cached: another worker may create the document.
+        value = self._local(key)
+        if value is None:
+            if doc is None:
+                return None
+            value = doc
+            self._remember(key, value)
+        return None if value is _DELETED else dict(value)
+
+    async def list(self, collection: str, limit: int = 100) -> List[dict]:
+        """Committed documents overlaid with pending writes (which are not yet ordered like the backend's)."""
+        docs = await asyncio.to_thread(self.backend.list, collection, limit + len(self._dirty))
+        pending = {doc_id: doc for (c, doc_id), doc in self._dirty.items() if c == collection}
+        out = [d for d in docs if d.get('id') not in pending]
+        out += [dict(d) for d in pending.values() if d is not None]
+        return out[:limit]
+
+    async def flush(self) -> int:
+        """Commit what is dirty now (writes arriving meanwhile wait for the next flush);
+        returns the number of documents written."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            remaining = len(self._dirty)
+            written = 0
+            while remaining > 0 and self._dirty:
+                ops = []
+                while self._dirty and len(ops) < min(self.batch_size, remaining):
+                    (collection, doc_id), doc = self._dirty.popitem(last=False)
+                    ops.append((collection, doc_id, doc))
+                remaining -= len(ops)
+                try:
+                    await asyncio.to_thread(self.backend.commit, ops)
+                except Exception:
+                    self.flush_failures += 1
+                    for collection, doc_id, doc in reversed(ops):
+                        key = (collection, doc_id)
+                        if key not in self._dirty:
+                            self._dirty[key] = doc
+                            self._dirty.move_to_end(key, last=False)
+                    raise
+                self.flushes += 1
+                self.flushed_docs += len(ops)
+                written += len(ops)
+            return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Counted in flush_failures; the writes are back in the queue for the next round.
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._dirty:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            'backend': type(self.backend).__name__,
+            'pending': len(self._dirty),
+            'max_pending': self.max_pending,
+            'refused': self.refused,
+            'cached': len(self._cache),
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'flushes': self.flushes,
+            'flushed_docs': self.flushed_docs,
+            'flush_failures': self.flush_failures,
+            'commits': self.backend.commits,
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+        }
+
+
+M = TypeVar('M', bound=BaseModel)
+
+
+class Collection(Generic[M]):
+    """Typed access to one collection of a DocumentStore; documents are ``model.model_dump()``."""
+
+    def __init__(self, store: DocumentStore, name: str, model: Type[M]):
+        self.store = store
+        self.name = name
+        self.model = model
+
+    async def get(self, doc_id: str) -> Optional[M]:
+        doc = await self.store.get(self.name, doc_id)
+        return self.model.model_validate(doc) if doc is not None else None
+
+    async def list(self, limit: int = 100) -> List[M]:
+        return [self.model.model_validate(d) for d in await self.store.list(self.name, limit)]
+
+    def put(self, item: M) -> M:
+        self.store.put(self.name, item.id, item.model_dump())
+        return item
+
+    def put_many(self, items: Iterable[M]) -> None:
+        for item in items:
+            self.put(item)
+
+    def delete(self, doc_id: str) -> None:
+        self.store.delete(self.name, doc_id)
+
+
+def _default_backend():
+    if firebase.backend == 'firestore':
+        return FirestoreStore(firebase.project_id)
+    if firebase.backend == 'sqlite':
+        return SqliteStore(firebase.sqlite_path)
+    return MemoryStore()
+
+
+documents = DocumentStore(
+    _default_backend(),
+    flush_interval=firebase.flush_ms / 1000.0,
+    batch_size=firebase.batch_size,
+    cache_size=firebase.cache_size,
+    max_pending=firebase.max_pending,
+)
+study_sessions: Collection[StudySession] = Collection(documents, 'sessions', StudySession)
+matches: Collection[Match] = Collection(documents, 'matches', Match)
+users: Collection[User] = Collection(documents, 'users', User)
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from server.utils.tokens import canonical_subject
+
+
+MIN_DURATION = 30
+MAX_DURATION = 90
+DEFAULT_DURATION = 45
+
+# Focus block (title, desc) pairs per course subject; "{course}" is filled per request.
+SUBJECT_FOCUS: Dict[str, List[Tuple[str, str]]] = {
+    'CSE': [
+        ('Code walkthrough', 'Trace {course} examples together and predict the output before running.'),
+        ('Implement & debug', 'Pair-program a practice problem; swap driver halfway.'),
+        ('Practice round', 'Timed {course} exercise, then review each other\'s solution.'),
+    ],
+    'SER': [
+        ('Design review', 'Sketch the {course} design together and question each choice.'),
+        ('Build & test', 'Pair-program a small feature with tests; swap driver halfway.'),
+        ('Practice round', 'Timed {course} exercise, then review each other\'s solution.'),
+    ],
+    'EEE': [
+        ('Circuit analysis', 'Work {course} circuits step by step and check units.'),
+        ('Problem set', 'Solve practice problems separately, then compare methods.'),
+        ('Practice round', 'Timed {course} problems, then review answers together.'),
+    ],
+    'MAT': [
+        ('Worked problems', 'Solve {course} problems side by side, then compare steps.'),
+        ('Concept check', 'Explain one key theorem or method to each other from scratch.'),
+        ('Practice round', 'Timed {course} problems, then grade each other\'s work.'),
+    ],
+    'PHY': [
+        ('Problem solving', 'Work {course} problems: draw the diagram, list knowns, check units.'),
+        ('Concept check', 'Explain the governing principles behind each problem.'),
+        ('Practice round', 'Timed {course} problems, then review answers together.'),
+    ],
+    'CHM': [
+        ('Reaction review', 'Walk through the key {course} reactions and mechanisms.'),
+        ('Problem set', 'Balance, predict and calculate; compare approaches.'),
+        ('Practice round', 'Timed {course} questions, then review answers together.'),
+    ],
+    'BIO': [
+        ('Concept mapping', 'Map the main {course} processes and their key terms.'),
+        ('Active recall', 'Quiz each other with flashcards on weak spots.'),
+        ('Practice round', 'Answer past {course} questions, then explain misses.'),
+    ],
+    'ECN': [
+        ('Models & graphs', 'Redraw the key {course} graphs and explain what shifts them.'),
+        ('Applied problems', 'Work numeric problems and interpret the results.'),
+        ('Practice round', 'Timed {course} questions, then review answers together.'),
+    ],
+    'PSY': [
+        ('Key studies', 'Summarize the main {course} studies, methods and findings.'),
+        ('Self-test', 'Quiz each other and explain every wrong answer.'),
+        ('Practice round', 'Answer past {course} questions, then compare reasoning.'),
+    ],
+}
+DEFAULT_FOCUS = [
+    ('Focus block 1', 'Work problems and compare approaches.'),
+    ('Focus block 2', 'Discuss tricky concepts and summarize.'),
+    ('Focus block 3', 'Practice under time pressure and review together.'),
+]
+_OPENING = ('Set goals', 'Define 2–3 outcomes and pick topics.')
+_BREAK = ('Break', 'Rest, stretch, hydrate.')
+_CLOSING = ('Wrap-up', 'Agree on next steps and resources.')
+
+# Block lengths as shares of the session (the 45-minute plan is 5/15/5/15/5).
+_SHORT_LAYOUT = (('open', 5), ('focus', 15), ('break', 5), ('focus', 15), ('close', 5))
+_LONG_LAYOUT = (('open', 5), ('focus', 15), ('break', 4), ('focus', 15), ('break', 4), ('focus', 12), ('close', 5))
+# From this length on, a third focus block (and second break) is added.
+LONG_SESSION = 75
+
+_SUBJECT_RE = re.compile(r'[A-Z]+')
+
+
+def canonical_course(course: Optional[str]) -> Optional[str]:
+    """One spelling per course ('cse310', 'CSE  310' -> 'CSE 310'), so plans shared across
+    requesters don't carry the first one's typing."""
+    key = (course or '').upper().replace(' ', '')
+    if not key:
+        return None
+    match = _SUBJECT_RE.match(key)
+    if match is None or match.end() == len(key):
+        return key
+    return f'{key[:match.end()]} {key[match.end():]}'
+
+
+def subject_of(course: Optional[str]) -> Optional[str]:
+    match = _SUBJECT_RE.match((course or '').strip().upper())
+    return canonical_subject(match.group(0)) if match else None
+
+
+def clamp_duration(duration: Optional[int]) -> int:
+    return max(MIN_DURATION, min(MAX_DURATION, duration or DEFAULT_DURATION))
+
+
+def _skeleton(focus: List[Tuple[str, str]], duration: int) -> Tuple[tuple, ...]:
+    layout = _LONG_LAYOUT if duration >= LONG_SESSION else _SHORT_LAYOUT
+    total = sum(weight for _, weight in layout)
+    blocks = []
+    elapsed = 0
+    focus_i = 0
+    for kind, weight in layout:
+        start = int(round(elapsed * duration / total))
+        elapsed += weight
+        end = int(round(elapsed * duration / total))
+        if kind == 'focus':
+            title, desc = focus[focus_i]
+            focus_i += 1
+        else:
+            title, desc = {'open': _OPENING, 'break': _BREAK, 'close': _CLOSING}[kind]
+        blocks.append((start, end, title, desc))
+    return tuple(blocks)
+
+
+# (subject or None, duration) -> blocks as (start, end, title, desc template), built once at import.
+_SKELETONS: Dict[Tuple[Optional[str], int], Tuple[tuple, ...]] = {
+    (subject, duration): _skeleton(focus, duration)
+    for subject, focus in [(None, DEFAULT_FOCUS), *SUBJECT_FOCUS.items()]
+    for duration in range(MIN_DURATION, MAX_DURATION + 1)
+}
+
+
+def render(course: Optional[str], duration: Optional[int]) -> dict:
+    """A complete draft plan from the precomputed skeleton for the course's subject."""
+    dur = clamp_duration(duration)
+    subject = subject_of(course)
+    blocks = _SKELETONS.get((subject, dur)) or _SKELETONS[(None, dur)]
+    name = course or 'your course'
+    return {
+        'course': name,
+        'duration': dur,
+        'blocks': [
+            {'start': start, 'end': end, 'title': title, 'desc': desc.format(course=name) if '{' in desc else desc}
+            for start, end, title, desc in blocks
+        ],
+        'notes': 'This is a suggested structure. Adjust as needed.',
+        'status': 'draft',
+    }
@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+
+_ids = itertools.count(1)
+
+# Rooms only the server publishes to: match notifications and study-plan enrichment.
+SERVER_ROOMS = ('user:', 'study-plan:')
+
+# Signs the tokens /ws accepts as proof of a user_id: "<user_id>.<hex HMAC-SHA256>".
+# Whatever authenticates users mints them with presence_token(). Without a secret
+# no connection is verified, so user:<id> rooms (private match events) can't be joined.
+TOKEN_SECRET = os.getenv('PRESENCE_TOKEN_SECRET', '')
+
+
+def _sign(user_id: str) -> str:
+    return hmac.new(TOKEN_SECRET.encode(), user_id.encode(), hashlib.sha256).hexdigest()
+
+
+def presence_token(user_id: str) -> str:
+    if not TOKEN_SECRET:
+        raise RuntimeError('PRESENCE_TOKEN_SECRET is not set')
+    return f'{user_id}.{_sign(user_id)}'
+
+
+def verify_token(token: str) -> Optional[str]:
+    """The user_id a token was minted for, or None if it isn't genuine."""
+    user_id, _, sig = (token or '').rpartition('.')
+    if not TOKEN_SECRET or not user_id or not hmac.compare_digest(sig, _sign(user_id)):
+        return None
+    return user_id
+
+
+class Connection:
+    """One subscriber's outbound queue of pre-serialized frames.
+
+    The queue is bounded; when a client falls behind, the oldest location
+    frames (superseded by newer ones anyway) are shed before any events.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        close: Callable[[], Awaitable[None]],
+        max_queue: int,
+        user_id: Optional[str] = None,
+        verified: bool = False,
+    ):
+        self.id = next(_ids)
+        self.user_id = user_id
+        # True when user_id came from a token checked by verify_token.
+        self.verified = verified
+        self.send = send
+        self.close = close
+        self.max_queue = max_queue
+        self.rooms: Set[str] = set()
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+        self.sending_since: Optional[float] = None
+        # (droppable, frame) pairs
+        self._frames: deque = deque()
+        self._wake = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, frame: str, droppable: bool) -> None:
+        self._frames.append((droppable, frame))
+        if len(self._frames) > self.max_queue:
+            self._shed()
+        self._wake.set()
+
+    def _shed(self) -> None:
+        for i, (droppable, _) in enumerate(self._frames):
+            if droppable:
+                del self._frames[i]
+                break
+        else:
+            self._frames.popleft()
+        self.dropped += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._frames)
+
+    def take_batch(self) -> Optional[str]:
+        if not self._frames:
+            return None
+        batch = '[' + ','.join(frame for _, frame in self._frames) + ']'
+        self._frames.clear()
+        return batch
+
+
+class PresenceHub:
+    """Room-based pub/sub for the /ws endpoint.
+
+    Publishing only records the update on its room; location updates for the same
+    user within a tick replace each other. Every ``tick_interval`` seconds each
+    dirty room is serialized once and the resulting frame is handed to all of its
+    subscribers, so per-tick cost is O(updates + subscribers) rather than
+    O(updates * subscribers). Clients that stay silent longer than
+    ``heartbeat_timeout`` or stall a send past ``send_timeout`` are evicted; the
+    socket is closed in its own task, bounded by ``close_timeout``, so a stalled
+    close never holds up the tick.
+
+    Clients publish only into rooms they are subscribed to and never into
+    ``SERVER_ROOMS``; ``user:<id>`` rooms can be joined only by a connection
+    verified as that user, and location updates are published under the
+    connection's own ``user_id``.
+    """
+
+    def __init__(
+        self,
+        tick_interval: float = 0.1,
+        max_queue: int = 256,
+        heartbeat_timeout: float = 45.0,
+        send_timeout: float = 5.0,
+        close_timeout: float = 1.0,
+    ):
+        self.tick_interval = tick_interval
+        self.max_queue = max_queue
+        self.heartbeat_timeout = heartbeat_timeout
+        self.send_timeout = send_timeout
+        self.close_timeout = close_timeout
+        self.rooms: Dict[str, Set[Connection]] = {}
+        self.connections: Dict[int, Connection] = {}
+        # room -> {user_id: location dict} / [event data] accumulated for the next tick
+        self._pending_locations: Dict[str, Dict[str, dict]] = {}
+        self._pending_events: Dict[str, list] = {}
+        self._ticker: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+        self.published = 0
+        self.coalesced = 0
+        self.frames_sent = 0
+        self.evicted = 0
+        self.refused = 0
+
+    def start(self) -> None:
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.ensure_future(self._tick_loop())
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        for conn in list(self.connections.values()):
+            self._evict(conn)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def connect(self, send, close, user_id: Optional[str] = None, verified: bool = False) -> Connection:
+        self.start()
+        conn = Connection(send, close, self.max_queue, user_id, verified)
+        self.connections[conn.id] = conn
+        conn._writer = asyncio.ensure_future(self._write_loop(conn))
+        return conn
+
+    def disconnect(self, conn: Connection) -> None:
+        self.unsubscribe(conn, list(conn.rooms))
+        self.connections.pop(conn.id, None)
+        if conn._writer is not None and conn._writer is not asyncio.current_task():
+            conn._writer.cancel()
+
+    def touch(self, conn: Connection) -> None:
+        conn.last_seen = time.monotonic()
+
+    def may_subscribe(self, conn: Connection, room: str) -> bool:
+        return not room.startswith('user:') or (conn.verified and room == f'user:{conn.user_id}')
+
+    def may_publish(self, conn: Connection, room: str) -> bool:
+        return room in conn.rooms and not room.startswith(SERVER_ROOMS)
+
+    def refuse(self, conn: Connection, detail: str) -> None:
+        self.refused += 1
+        conn.enqueue(json.dumps({'type': 'error', 'detail': detail}), droppable=False)
+
+    def subscribe(self, conn: Connection, rooms: Iterable[str]) -> None:
+        for room in rooms:
+            self.rooms.setdefault(room, set()).add(conn)
+            conn.rooms.add(room)
+
+    def unsubscribe(self, conn: Connection, rooms: Iterable[str]) -> None:
+        for room in rooms:
+            members = self.rooms.get(room)
+            if members is not None:
+                members.discard(conn)
+                if not members:
+                    del self.rooms[room]
+            conn.rooms.discard(room)
+
+    def publish_location(self, rooms: Iterable[str], user_id: str, payload: dict) -> None:
+        for room in rooms:
+            if room not in self.rooms:
+                continue
+            pending = self._pending_locations.setdefault(room, {})
+            if user_id in pending:
+                self.coalesced += 1
+            pending[user_id] = {'user_id': user_id, **payload}
+            self.published += 1
+
+    def publish(self, room: str, data: dict) -> None:
+        if room not in self.rooms:
+            return
+        self._pending_events.setdefault(room, []).append(data)
+        self.published += 1
+
+    def flush(self) -> None:
+        locations, self._pending_locations = self._pending_locations, {}
+        events, self._pending_events = self._pending_events, {}
+        for room, items in events.items():
+            members = self.rooms.get(room)
+            if members:
+                frame = ','.join(json.dumps({'type': 'event', 'room': room, 'data': d}) for d in items)
+                for conn in members:
+                    conn.enqueue(frame, droppable=False)
+        for room, by_user in locations.items():
+            members = self.rooms.get(room)
+            if members:
+                frame = json.dumps({'type': 'locations', 'room': room, 'items': list(by_user.values())})
+                for conn in members:
+                    conn.enqueue(frame, droppable=True)
+
+    async def _tick_loop(self) -> None:
+        last_sweep = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.flush()
+            now = time.monotonic()
+            if now - last_sweep >= 1.0:
+                last_sweep = now
+                for conn in [c for c in self.connections.values() if self._is_stale(c, now)]:
+                    self._evict(conn)
+
+    def _is_stale(self, conn: Connection, now: float) -> bool:
+        if now - conn.last_seen > self.heartbeat_timeout:
+            return True
+        return conn.sending_since is not None and now - conn.sending_since > self.send_timeout
+
+    async def _write_loop(self, conn: Connection) -> None:
+        while True:
+            await conn._wake.wait()
+            conn._wake.clear()
+            batch = conn.take_batch()
+            if batch is None:
+                continue
+            # Stalled sends are caught by the sweep in _tick_loop rather than a
+            # per-send timer, which would cost a timer handle on every frame.
+            conn.sending_since = time.monotonic()
+            try:
+                await conn.send(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._evict(conn)
+                return
+            conn.sending_since = None
+            self.frames_sent += 1
+
+    def _evict(self, conn: Connection) -> None:
+        if conn.id not in self.connections:
+            return
+        self.evicted += 1
+        self.disconnect(conn)
+        task = asyncio.ensure_future(self._close(conn))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, conn: Connection) -> None:
+        # A stalled client can hold up its close handshake; give up on it after close_timeout.
+        try:
+            await asyncio.wait_for(conn.close(), self.close_timeout)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        conns = self.connections.values()
+        return {
+            'connections': len(self.connections),
+            'rooms': len(self.rooms),
+            'published': self.published,
+            'frames_sent': self.frames_sent,
+            'queued': sum(c.pending for c in conns),
+            'dropped': sum(c.dropped for c in conns),
+            'coalesced': self.coalesced,
+            'evicted': self.evicted,
+            'refused': self.refused,
+        }
+
+
+hub = PresenceHub()
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Readiness:
+    """Startup work run after the server starts listening, reported by ``/ready``.
+
+    Steps are plain callables (loading data, building indexes, opening clients)
+    run in order off the event loop, so requests are served meanwhile; anything
+    a request needs before its step has run is still built on demand.
+    """
+
+    def __init__(self):
+        self._steps: List[Tuple[str, Callable[[], object]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.started_at = time.monotonic()
+        self.state = 'starting'
+        self.timings_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def step(self, name: str, fn: Callable[[], object]) -> None:
+        self._steps.append((name, fn))
+
+    async def _run(self) -> None:
+        self.state = 'warming'
+        for name, fn in self._steps:
+            t0 = time.perf_counter()
+            try:
+                await asyncio.to_thread(fn)
+            except Exception as e:
+                # A failed step only means its first request builds it instead.
+                self.errors[name] = f'{type(e).__name__}: {e}'
+            self.timings_ms[name] = round((time.perf_counter() - t0) * 1000, 1)
+        self.state = 'ready'
+        self.timings_ms['total'] = round((time.monotonic() - self.started_at) * 1000, 1)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def wait(self) -> None:
+        self.start()
+        await asyncio.shield(self._task)
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def stats(self) -> dict:
+        return {'state': self.state, 'steps_ms': dict(self.timings_ms), 'errors': dict(self.errors)}
+
+
+readiness = Readiness()
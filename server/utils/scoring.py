@@ -0,0 +1,188 @@
+import math
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from server.utils.students import course_key, students as student_repo
+
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+else:
+    # Bound by _load_numeric() when the first engine is built (lifespan warmup or the
+    # first matching request), keeping NumPy/SciPy's ~250 ms off process startup.
+    np = sparse = None
+
+
+# Weight of a shared feature in the raw dot product. Features are stored as
+# sqrt(weight) on both sides so a match contributes exactly `weight`.
+WEIGHTS = {
+    'course': 3.0,
+    'subject': 1.0,
+    'major': 1.5,
+    'year': 0.5,
+    'avail': 1.0,
+    'cell': 1.0,
+    'building': 0.5,
+}
+
+_AVAILABILITY = {
+    'MORNINGS': ('MORNING',),
+    'AFTERNOONS': ('AFTERNOON',),
+    'EVENINGS': ('EVENING',),
+    'FLEXIBLE': ('MORNING', 'AFTERNOON', 'EVENING'),
+}
+_SUBJECT_RE = re.compile(r'[A-Z]+')
+# ~450 m grid cells for "studies nearby".
+_CELL_DEG = 0.004
+
+
+def profile_features(p: dict) -> Dict[str, float]:
+    """Sparse feature map for a student or profile dict (keys as in students.json)."""
+    feats: Dict[str, float] = {}
+    courses = p.get('courses') or []
+    if isinstance(courses, str):
+        courses = courses.split(',')
+    for c in courses:
+        key = course_key(str(c))
+        if not key:
+            continue
+        feats['course:' + key] = math.sqrt(WEIGHTS['course'])
+        subject = _SUBJECT_RE.match(key)
+        if subject:
+            feats['subject:' + subject.group(0)] = math.sqrt(WEIGHTS['subject'])
+    if p.get('major'):
+        feats['major:' + str(p['major']).strip().lower()] = math.sqrt(WEIGHTS['major'])
+    if p.get('year'):
+        feats['year:' + str(p['year']).strip().lower()] = math.sqrt(WEIGHTS['year'])
+    buckets = _AVAILABILITY.get(str(p.get('availability') or '').strip().upper(), ())
+    for b in buckets:
+        # Spread "Flexible" over its buckets so it never outscores an exact slot match.
+        feats['avail:' + b] = math.sqrt(WEIGHTS['avail'] / len(buckets))
+    if p.get('lat') is not None and p.get('lng') is not None:
+        cell = (math.floor(p['lat'] / _CELL_DEG), math.floor(p['lng'] / _CELL_DEG))
+        feats[f'cell:{cell[0]}:{cell[1]}'] = math.sqrt(WEIGHTS['cell'])
+    if p.get('location'):
+        feats['building:' + str(p['location']).strip().lower()] = math.sqrt(WEIGHTS['building'])
+    return feats
+
+
+def pair_score(a: dict, b: dict) -> float:
+    """Symmetric 0-100 score for two profiles, scaled against the richer profile's
+    self-score; no roster or NumPy needed."""
+    fa, fb = profile_features(a), profile_features(b)
+    best = max(sum(v * v for v in fa.values()), sum(v * v for v in fb.values()))
+    if best <= 0:
+        return 0.0
+    shared = sum(v * fb[name] for name, v in fa.items() if name in fb)
+    return round(min(100.0, shared * 100.0 / best), 1)
+
+
+def _load_numeric() -> None:
+    global np, sparse
+    if sparse is None:
+        import numpy as np
+        from scipy import sparse
+
+
+class ScoringEngine:
+    """Compatibility scores for a profile against a whole roster in one sparse mat-vec.
+
+    The roster is encoded once into a CSR matrix (students x features). Scores are
+    the weighted count of shared features, scaled to 0-100 against the query's own
+    best possible score.
+    """
+
+    def __init__(self, students: List[dict]):
+        _load_numeric()
+        self.students = students
+        self.vocab: Dict[str, int] = {}
+        rows, cols, vals = [], [], []
+        for i, s in enumerate(students):
+            for name, value in profile_features(s).items():
+                col = self.vocab.setdefault(name, len(self.vocab))
+                rows.append(i)
+                cols.append(col)
+                vals.append(value)
+        self.matrix = sparse.csr_matrix(
+            (np.asarray(vals, dtype=np.float32), (rows, cols)),
+            shape=(len(students), len(self.vocab)),
+            dtype=np.float32,
+        )
+        self._ids = {s.get('id'): i for i, s in enumerate(students)}
+
+    def encode(self, profiles: Iterable[dict]) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Dense query block (len(profiles) x features) plus each query's self-score."""
+        profiles = list(profiles)
+        q = np.zeros((len(profiles), len(self.vocab)), dtype=np.float32)
+        norms = np.zeros(len(profiles), dtype=np.float32)
+        for r, p in enumerate(profiles):
+            for name, value in profile_features(p).items():
+                col = self.vocab.get(name)
+                if col is not None:
+                    q[r, col] = value
+                    norms[r] += value * value
+        return q, norms
+
+    # Queries scored per matrix product; bounds the students x queries block in memory.
+    BATCH = 256
+
+    def score_many(self, profiles: List[dict], k: int = 10, exclude_ids: Optional[List] = None) -> List[List[Tuple[int, float]]]:
+        """Top-k (roster position, score 0-100) per profile, best first."""
+        exclude_ids = list(exclude_ids) if exclude_ids else [None] * len(profiles)
+        out = []
+        for start in range(0, len(profiles), self.BATCH):
+            end = start + self.BATCH
+            out.extend(self._score_block(profiles[start:end], k, exclude_ids[start:end]))
+        return out
+
+    def _score_block(self, profiles: List[dict], k: int, exclude_ids: List) -> List[List[Tuple[int, float]]]:
+        n = len(self.students)
+        if not n:
+            return [[] for _ in profiles]
+        q, norms = self.encode(profiles)
+        # (students x features) @ (features x queries), laid out one row per query
+        raw = np.ascontiguousarray(np.asarray(self.matrix @ q.T).T)
+        scale = np.divide(100.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        scores = np.minimum(raw * scale[:, None], 100.0)
+        k = max(0, min(k, n))
+        out = []
+        for row in range(scores.shape[0]):
+            col_scores = scores[row]
+            pos = self._ids.get(exclude_ids[row])
+            if pos is not None:
+                col_scores[pos] = -1.0
+            kk = min(k, n - 1) if pos is not None else k
+            if kk <= 0:
+                out.append([])
+                continue
+            top = np.argpartition(-col_scores, kk - 1)[:kk]
+            top = top[np.argsort(-col_scores[top], kind='stable')]
+            out.append([(int(i), round(float(col_scores[i]), 1)) for i in top])
+        return out
+
+    def score(self, profile: dict, k: int = 10, exclude_id=None) -> List[Tuple[int, float]]:
+        return self.score_many([profile], k, [exclude_id])[0]
+
+    def by_id(self, student_id) -> Optional[dict]:
+        pos = self._ids.get(student_id)
+        return self.students[pos] if pos is not None else None
+
+
+_engine: Optional[ScoringEngine] = None
+_engine_version = None
+_engine_lock = threading.Lock()
+
+
+def roster_engine() -> ScoringEngine:
+    """Engine over students.json, rebuilt when the roster file changes."""
+    global _engine, _engine_version
+    version = student_repo.version
+    if _engine is not None and version == _engine_version:
+        return _engine
+    # Double-checked: warmup builds on a worker thread while a request may build on the loop.
+    with _engine_lock:
+        if _engine is None or version != _engine_version:
+            _engine = ScoringEngine(student_repo.all())
+            _engine_version = version
+        return _engine
@@ -1,6 +1,206 @@
-from math import hypot
+import heapq
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_np = False
+
+
+def _numpy():
+    # Imported on first bulk call rather than at startup; None when not installed.
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:  # bulk helpers fall back to pure Python
+            numpy = None
+        _np = numpy
+    return _np
+
+
+EARTH_RADIUS_M = 6371008.8
+_M_PER_DEG_LAT = math.pi * EARTH_RADIUS_M / 180.0
 
 
 def distance(a: tuple[float, float], b: tuple[float, float]) -> float:
-    return hypot(a[0] - b[0], a[1] - b[1])
+    """Great-circle (haversine) distance in meters between two (lat, lng) points."""
+    lat1, lng1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lng2 = math.radians(b[0]), math.radians(b[1])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def distance_many(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]):
+    """Haversine distances in meters from one point to many; vectorized when NumPy is available."""
+    np = _numpy()
+    if np is None:
+        return [distance((lat, lng), (la, ln)) for la, ln in zip(lats, lngs)]
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs, dtype=np.float64))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+
+class GeoIndex:
+    """Uniform lat/lng grid of points with optional per-point expiry.
+
+    Queries walk rings of cells outward from the query cell and stop as soon as
+    no unvisited cell can hold a closer point or every point has been seen, so
+    cost depends on local density and ``k`` rather than on the total number of
+    points. Once a ring would hold more cells than are occupied, the remaining
+    occupied cells are scanned directly instead, so a lone far-off point can't
+    make a query walk thousands of empty rings.
+    """
+
+    # Above this many candidates in a ring, distances are computed with NumPy.
+    VECTORIZE_MIN = 256
+
+    def __init__(self, cell_m: float = 100.0):
+        self.cell_deg = cell_m / _M_PER_DEG_LAT
+        self._cells: Dict[Tuple[int, int], Dict[str, tuple]] = {}
+        # id -> (lat, lng, expires_at, payload, cell)
+        self._points: Dict[str, tuple] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._lat_range = (0, -1)
+        self._lng_range = (0, -1)
+        # occupied cells per grid row / column, so the ranges shrink on removal
+        self._rows: Dict[int, int] = {}
+        self._cols: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def upsert(self, point_id: str, lat: float, lng: float, ttl: Optional[float] = None, payload: Optional[dict] = None) -> None:
+        self.remove(point_id)
+        cell = self._cell(lat, lng)
+        expires_at = time.time() + ttl if ttl else None
+        entry = (lat, lng, expires_at, payload or {}, cell)
+        self._points[point_id] = entry
+        bucket = self._cells.get(cell)
+        if bucket is None:
+            bucket = self._cells[cell] = {}
+            self._rows[cell[0]] = self._rows.get(cell[0], 0) + 1
+            self._cols[cell[1]] = self._cols.get(cell[1], 0) + 1
+        bucket[point_id] = entry
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, point_id))
+        if self._lat_range[0] > self._lat_range[1]:
+            self._lat_range, self._lng_range = (cell[0], cell[0]), (cell[1], cell[1])
+        else:
+            self._lat_range = (min(self._lat_range[0], cell[0]), max(self._lat_range[1], cell[0]))
+            self._lng_range = (min(self._lng_range[0], cell[1]), max(self._lng_range[1], cell[1]))
+
+    def remove(self, point_id: str) -> bool:
+        entry = self._points.pop(point_id, None)
+        if entry is None:
+            return False
+        bucket = self._cells.get(entry[4])
+        if bucket is not None:
+            bucket.pop(point_id, None)
+            if not bucket:
+                del self._cells[entry[4]]
+                self._lat_range = _vacate(self._rows, entry[4][0], self._lat_range)
+                self._lng_range = _vacate(self._cols, entry[4][1], self._lng_range)
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, point_id = heapq.heappop(self._expiry)
+            entry = self._points.get(point_id)
+            # Skip heap entries left behind by a later upsert of the same id.
+            if entry is not None and entry[2] == expires_at:
+                self.remove(point_id)
+                removed += 1
+        return removed
+
+    def nearest(self, lat: float, lng: float, k: int = 10, radius_m: Optional[float] = None) -> List[Tuple[float, str, tuple]]:
+        """Up to ``k`` closest points as (distance_m, id, entry), optionally capped by ``radius_m``."""
+        self.expire()
+        if not self._points or k <= 0:
+            return []
+        center = self._cell(lat, lng)
+        # Narrowest cell side in meters (longitude cells shrink with latitude).
+        cell_m = self.cell_deg * _M_PER_DEG_LAT * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + self.cell_deg))))
+        max_ring = max(
+            abs(center[0] - self._lat_range[0]), abs(center[0] - self._lat_range[1]),
+            abs(center[1] - self._lng_range[0]), abs(center[1] - self._lng_range[1]),
+        )
+        if radius_m is not None:
+            max_ring = min(max_ring, int(radius_m / cell_m) + 1)
+        best: List[Tuple[float, str, tuple]] = []  # max-heap via negated distance
+
+        def consider(candidates):
+            if len(candidates) >= self.VECTORIZE_MIN and _numpy() is not None:
+                dists = distance_many(lat, lng, [e[0] for _, e in candidates], [e[1] for _, e in candidates]).tolist()
+            else:
+                dists = [distance((lat, lng), (e[0], e[1])) for _, e in candidates]
+            for d, (pid, entry) in zip(dists, candidates):
+                if radius_m is not None and d > radius_m:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-d, pid, entry))
+                elif -best[0][0] > d:
+                    heapq.heapreplace(best, (-d, pid, entry))
+
+        seen = 0
+        for ring in range(max_ring + 1):
+            if ring and 8 * ring > len(self._cells):
+                # Sparse outskirts: every occupied cell not yet visited, in one pass.
+                ci, cj = center
+                consider([
+                    item
+                    for cell, bucket in self._cells.items()
+                    if ring <= max(abs(cell[0] - ci), abs(cell[1] - cj)) <= max_ring
+                    for item in bucket.items()
+                ])
+                break
+            candidates = []
+            for cell in _ring_cells(center, ring):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    candidates.extend(bucket.items())
+            if candidates:
+                consider(candidates)
+                seen += len(candidates)
+            if seen >= len(self._points):
+                break
+            # Every unvisited cell is at least `ring` whole cells away.
+            if len(best) == k and -best[0][0] <= ring * cell_m:
+                break
+        return sorted(((-nd, pid, entry) for nd, pid, entry in best), key=lambda r: r[0])
+
+    def within(self, lat: float, lng: float, radius_m: float, limit: Optional[int] = None) -> List[Tuple[float, str, tuple]]:
+        return self.nearest(lat, lng, k=limit or len(self._points), radius_m=radius_m)
+
+
+def _vacate(counts: Dict[int, int], key: int, bounds: Tuple[int, int]) -> Tuple[int, int]:
+    # One fewer occupied cell at grid row/column `key`; the new (min, max) of the rest.
+    left = counts[key] - 1
+    if left:
+        counts[key] = left
+        return bounds
+    del counts[key]
+    if not counts:
+        return (0, -1)
+    if key in bounds:
+        return (min(counts), max(counts))
+    return bounds
+
 
+def _ring_cells(center: Tuple[int, int], ring: int):
+    ci, cj = center
+    if ring == 0:
+        yield center
+        return
+    for j in range(cj - ring, cj + ring + 1):
+        yield (ci - ring, j)
+        yield (ci + ring, j)
+    for i in range(ci - ring + 1, ci + ring):
+        yield (i, cj - ring)
+        yield (i, cj + ring)
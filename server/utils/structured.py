@@ -0,0 +1,163 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from server.utils import performance
+
+
+# A JSON string literal (unrolled so it never backtracks; an unterminated one runs
+# to the end instead of failing and being retried from every later quote) or one bracket.
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}\[\]]')
+_CLOSER = {'{': '}', '[': ']'}
+
+
+def _decode_first(text: str, spans: list) -> Optional[Any]:
+    # Spans are properly nested or disjoint; trying them by start and skipping any
+    # inside one already tried decodes each character at most once.
+    tried_end = -1
+    for start, end in sorted(spans):
+        if start < tried_end:
+            continue
+        try:
+            return json.loads(text[start:end])
+        except ValueError:
+            tried_end = end
+    return None
+
+
+def first_json(text: str, opener: str = '{') -> Optional[Any]:
+    """The first balanced JSON object (or array, with ``opener='['``) in ``text``, decoded.
+
+    Prose and markdown fences around it are skipped. One left-to-right pass keeps a
+    stack of open brackets and where each began; string literals are consumed whole
+    so brackets in them don't count. Every ``opener`` that closes is a candidate,
+    and candidates are decoded earliest first whenever the stack empties, a closer
+    mismatches or the text ends. Linear in ``len(text)`` whatever the model wrote.
+    """
+    if not text:
+        return None
+    if text[0] == opener:
+        # JSON mode replies are the bare value; one C-speed decode covers them.
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    start = text.find(opener)
+    if start == -1:
+        return None
+    stack = []  # (closer, start) of each open bracket
+    spans = []  # (start, end) of each closed ``opener``
+    for m in _TOKEN_RE.finditer(text, start):
+        c = m.group()[0]
+        if c == '"':
+            continue
+        if c in _CLOSER:
+            stack.append((_CLOSER[c], m.start()))
+            continue
+        if stack and stack[-1][0] == c:
+            begin = stack.pop()[1]
+            if text[begin] == opener:
+                spans.append((begin, m.end()))
+            if stack:
+                continue
+        else:
+            # A stray or mismatched closer: nothing open so far can balance.
+            stack.clear()
+        if spans:
+            value = _decode_first(text, spans)
+            if value is not None:
+                return value
+            spans.clear()
+    # Brackets left open at the end never close; what closed inside them may still decode.
+    return _decode_first(text, spans) if spans else None
+
+
+def _gemini_schema(node: dict, defs: dict) -> dict:
+    # Pydantic's JSON Schema -> the OpenAPI subset Gemini takes: refs inlined,
+    # Optional as nullable, titles/defaults dropped, properties kept in field order.
+    if '$ref' in node:
+        return _gemini_schema(defs[node['$ref'].rsplit('/', 1)[-1]], defs)
+    if 'anyOf' in node:
+        options = [o for o in node['anyOf'] if o.get('type') != 'null']
+        out = _gemini_schema(options[0], defs) if len(options) == 1 else {'anyOf': [_gemini_schema(o, defs) for o in options]}
+        if len(options) < len(node['anyOf']):
+            out['nullable'] = True
+        return out
+    out: Dict[str, Any] = {}
+    kind = node.get('type')
+    if kind:
+        out['type'] = kind.upper()
+    if kind == 'object':
+        props = node.get('properties') or {}
+        out['properties'] = {name: _gemini_schema(p, defs) for name, p in props.items()}
+        out['propertyOrdering'] = list(props)
+        if node.get('required'):
+            out['required'] = list(node['required'])
+    elif kind == 'array' and 'items' in node:
+        out['items'] = _gemini_schema(node['items'], defs)
+    for key in ('enum', 'description', 'minItems', 'maxItems'):
+        if key in node:
+            out[key] = node[key]
+    return out
+
+
+@lru_cache(maxsize=None)
+def _schemas(model: Type[BaseModel]) -> Tuple[dict, str]:
+    raw = model.model_json_schema()
+    return _gemini_schema(raw, raw.get('$defs') or {}), '[' if raw.get('type') == 'array' else '{'
+
+
+def response_schema(model: Type[BaseModel]) -> dict:
+    """Gemini ``responseSchema`` for a Pydantic model (computed once per model)."""
+    return _schemas(model)[0]
+
+
+M = TypeVar('M', bound=BaseModel)
+
+OUTCOMES = ('ok', 'no_json', 'schema')
+
+
+class ParseStats:
+    """Structured-output parse outcomes per (route, model), so wasted calls show up."""
+
+    def __init__(self):
+        self._counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def record(self, route: str, model: str, outcome: str) -> None:
+        counts = self._counts.get((route, model))
+        if counts is None:
+            counts = self._counts[(route, model)] = dict.fromkeys(OUTCOMES, 0)
+        counts[outcome] += 1
+        performance.json_parses.inc(route, model, outcome)
+
+    def stats(self) -> dict:
+        out = {}
+        for (route, model), counts in self._counts.items():
+            total = sum(counts.values())
+            failed = total - counts['ok']
+            out.setdefault(route, {})[model] = {**counts, 'failure_rate': round(failed / total, 4) if total else 0.0}
+        return out
+
+
+parse_stats = ParseStats()
+
+
+def parse(text: str, schema: Type[M], route: str, model: str) -> Optional[M]:
+    """Validate the first JSON value in a model reply against ``schema``; None (and a
+    recorded failure) when there is none or it doesn't fit."""
+    opener = _schemas(schema)[1]
+    value = first_json(text, opener)
+    result = None
+    if value is None:
+        outcome = 'no_json'
+    else:
+        try:
+            result = schema.model_validate(value)
+            outcome = 'ok'
+        except ValidationError:
+            outcome = 'schema'
+    parse_stats.record(route, model, outcome)
+    return result
@@ -0,0 +1,236 @@
+import math
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class _Categorical:
+    """Interned values stored as small integer codes; code 0 is "missing"."""
+
+    def __init__(self):
+        self.levels: List[Optional[str]] = [None]
+        self._index: Dict[str, int] = {}
+        self.codes = array('I')
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.levels)
+            self.levels.append(value)
+        return code
+
+    def append(self, value: Optional[str]) -> None:
+        self.codes.append(self.intern(value))
+
+    def __getitem__(self, pos: int) -> Optional[str]:
+        return self.levels[self.codes[pos]]
+
+    def nbytes(self) -> int:
+        return _array_bytes(self.codes) + sum(sys.getsizeof(v) for v in self.levels[1:])
+
+
+class _Packed:
+    """Mostly-unique strings packed into one UTF-8 buffer plus offsets (no object per value)."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('I', [0])
+        self.missing = set()
+
+    def append(self, value: Optional[str]) -> None:
+        if value is None:
+            self.missing.add(len(self.offsets) - 1)
+        else:
+            self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, pos: int) -> Optional[str]:
+        if pos in self.missing:
+            return None
+        return self.data[self.offsets[pos]:self.offsets[pos + 1]].decode('utf-8')
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.data) + _array_bytes(self.offsets) + sys.getsizeof(self.missing)
+
+
+def _array_bytes(a: array) -> int:
+    return a.buffer_info()[1] * a.itemsize
+
+
+def _split_url(url: str):
+    # "https://host/path/photo-123?q=80&w=..." -> ("https://host/path/", "photo-123", "?q=80&w=...")
+    head, q, query = url.partition('?')
+    cut = head.rfind('/') + 1
+    return head[:cut], head[cut:], q + query
+
+
+_NAN = float('nan')
+# Field order of students.json, which dict views follow.
+FIELDS = ('id', 'name', 'gender', 'major', 'year', 'courses', 'availability', 'location', 'compatibility', 'photo', 'lat', 'lng')
+CATEGORICAL = ('gender', 'major', 'year', 'availability', 'location')
+
+
+class StudentStore(Sequence):
+    """Columnar, read-only roster: a sequence of students whose dicts are built on access.
+
+    Categorical fields are interned codes, ``name`` and the unique part of
+    ``photo`` are packed into shared buffers (the URL's base and query string
+    are interned), ``lat``/``lng``/``compatibility`` are ``array('d')`` columns
+    (NaN when missing, exposed to NumPy without copying via ``numpy_column``),
+    and course lists are offsets into one array of codes over a shared course
+    table. Values that don't fit a column's type, and fields outside
+    ``FIELDS``, are kept per student as given. Missing and null are the same.
+    """
+
+    def __init__(self):
+        self.ids: Any = array('q')
+        self.names = _Packed()
+        self.categorical = {field: _Categorical() for field in CATEGORICAL}
+        self.photo_base = _Categorical()
+        self.photo_name = _Packed()
+        self.photo_query = _Categorical()
+        # Shared course table; each student's courses are course_codes[offsets[i]:offsets[i + 1]].
+        self.courses = _Categorical()
+        self.course_codes = array('I')
+        self.course_offsets = array('I', [0])
+        self._no_courses = set()
+        self.numeric = {field: array('d') for field in ('lat', 'lng', 'compatibility')}
+        self._int_compatibility = True
+        self.extras: Dict[int, dict] = {}
+        self._positions: Optional[Dict[Any, int]] = None
+
+    @classmethod
+    def from_dicts(cls, students: Iterable[dict]) -> 'StudentStore':
+        store = cls()
+        for s in students:
+            store._append(s)
+        return store
+
+    def _extra(self, pos: int, key: str, value: Any) -> None:
+        self.extras.setdefault(pos, {})[key] = value
+
+    def _append(self, s: dict) -> None:
+        pos = len(self.course_offsets) - 1
+        sid = s.get('id')
+        if isinstance(self.ids, array) and not (type(sid) is int and -2**63 <= sid < 2**63):
+            self.ids = list(self.ids)
+        self.ids.append(sid)
+
+        name = s.get('name')
+        self.names.append(name if isinstance(name, str) else None)
+        if name is not None and not isinstance(name, str):
+            self._extra(pos, 'name', name)
+        for field, column in self.categorical.items():
+            value = s.get(field)
+            column.append(value if isinstance(value, str) else None)
+            if value is not None and not isinstance(value, str):
+                self._extra(pos, field, value)
+
+        photo = s.get('photo')
+        base, stem, query = _split_url(photo) if isinstance(photo, str) else (None, None, None)
+        self.photo_base.append(base)
+        self.photo_name.append(stem)
+        self.photo_query.append(query)
+        if photo is not None and not isinstance(photo, str):
+            self._extra(pos, 'photo', photo)
+
+        courses = s.get('courses')
+        if isinstance(courses, list) and all(isinstance(c, str) for c in courses):
+            self.course_codes.extend(self.courses.intern(c) for c in courses)
+        else:
+            self._no_courses.add(pos)
+            if courses is not None:
+                self._extra(pos, 'courses', courses)
+        self.course_offsets.append(len(self.course_codes))
+
+        for field, column in self.numeric.items():
+            value = s.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                column.append(float(value))
+                if field == 'compatibility' and not isinstance(value, int):
+                    self._int_compatibility = False
+            else:
+                column.append(_NAN)
+                if value is not None:
+                    self._extra(pos, field, value)
+
+        for key, value in s.items():
+            if key not in FIELDS:
+                self._extra(pos, key, value)
+
+    def __len__(self) -> int:
+        return len(self.course_offsets) - 1
+
+    def courses_of(self, pos: int) -> List[str]:
+        levels = self.courses.levels
+        return [levels[c] for c in self.course_codes[self.course_offsets[pos]:self.course_offsets[pos + 1]]]
+
+    def position(self, student_id) -> Optional[int]:
+        if self._positions is None:
+            self._positions = {}
+            for pos, sid in enumerate(self.ids):
+                self._positions.setdefault(sid, pos)
+        return self._positions.get(student_id)
+
+    def _number(self, field: str, pos: int):
+        value = self.numeric[field][pos]
+        if math.isnan(value):
+            return None
+        return int(value) if field == 'compatibility' and self._int_compatibility else value
+
+    def _photo(self, pos: int) -> Optional[str]:
+        base = self.photo_base[pos]
+        return None if base is None else base + self.photo_name[pos] + self.photo_query[pos]
+
+    def row(self, pos: int) -> dict:
+        """The student at ``pos`` as a fresh dict, in students.json field order."""
+        values = {
+            'id': self.ids[pos],
+            'name': self.names[pos],
+            'gender': self.categorical['gender'][pos],
+            'major': self.categorical['major'][pos],
+            'year': self.categorical['year'][pos],
+            'courses': None if pos in self._no_courses else self.courses_of(pos),
+            'availability': self.categorical['availability'][pos],
+            'location': self.categorical['location'][pos],
+            'compatibility': self._number('compatibility', pos),
+            'photo': self._photo(pos),
+            'lat': self._number('lat', pos),
+            'lng': self._number('lng', pos),
+        }
+        out = {k: v for k, v in values.items() if v is not None}
+        extra = self.extras.get(pos)
+        if extra:
+            out.update(extra)
+        return out
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self.row(p) for p in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError('student position out of range')
+        return self.row(pos)
+
+    def rows(self, positions: Iterable[int]) -> List[dict]:
+        return [self.row(p) for p in positions]
+
+    def numpy_column(self, field: str):
+        """``lat``, ``lng`` or ``compatibility`` as a float64 NumPy view (NaN when missing)."""
+        import numpy as np
+
+        return np.frombuffer(self.numeric[field], dtype=np.float64)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (excluding the id lookup and extras)."""
+        total = sys.getsizeof(self.ids) if isinstance(self.ids, list) else _array_bytes(self.ids)
+        total += self.names.nbytes() + self.photo_name.nbytes() + self.photo_base.nbytes() + self.photo_query.nbytes()
+        total += sum(c.nbytes() for c in self.categorical.values())
+        total += self.courses.nbytes() + _array_bytes(self.course_codes) + _array_bytes(self.course_offsets)
+        total += sys.getsizeof(self._no_courses)
+        total += sum(_array_bytes(a) for a in self.numeric.values())
+        return total
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from server.utils.student_store import StudentStore
+
+
+STUDENTS_PATH = Path(__file__).resolve().parents[2] / 'src' / 'data' / 'students.json'
+
+
+_SUBJECT_RE = re.compile(r'[A-Z]+')
+
+
+def course_key(course: str) -> str:
+    return (course or '').upper().replace(' ', '')
+
+
+def _prefix_range(keys: List[str], prefix: str) -> Iterable[str]:
+    i = bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix):
+        yield keys[i]
+        i += 1
+
+
+class StudentRepository:
+    """Roster loaded once from students.json and reloaded when the file's mtime changes.
+
+    Students are held in a columnar ``StudentStore`` (dicts are built per access,
+    so take what you need by position). Keeps inverted indexes from course key ('CSE310') and subject ('CSE') to
+    student positions, plus sorted key lists so prefix lookups are a bisect over
+    distinct keys instead of a scan over every student.
+    """
+
+    def __init__(self, path: Path = STUDENTS_PATH):
+        self.path = Path(path)
+        self._mtime: Optional[float] = None
+        # Warmup loads on a worker thread while requests may load on the event loop.
+        self._lock = threading.Lock()
+        self._students = StudentStore()
+        self._by_key: Dict[str, Set[int]] = {}
+        self._sorted_keys: List[str] = []
+        self._by_subject: Dict[str, Set[int]] = {}
+        self._sorted_subjects: List[str] = []
+
+    def _refresh(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self._mtime = None
+            self._students, self._by_key, self._by_subject = StudentStore(), {}, {}
+            self._sorted_keys, self._sorted_subjects = [], []
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with self.path.open('r', encoding='utf-8') as f:
+                students = StudentStore.from_dicts(json.load(f))
+            # Keys are worked out once per distinct course, not once per enrollment.
+            level_keys = [course_key(c) if c else '' for c in students.courses.levels]
+            level_subjects = [_SUBJECT_RE.match(k) for k in level_keys]
+            by_key: Dict[str, Set[int]] = {}
+            by_subject: Dict[str, Set[int]] = {}
+            codes, offsets = students.course_codes, students.course_offsets
+            for pos in range(len(students)):
+                for code in codes[offsets[pos]:offsets[pos + 1]]:
+                    key = level_keys[code]
+                    if not key:
+                        continue
+                    by_key.setdefault(key, set()).add(pos)
+                    subject = level_subjects[code]
+                    if subject:
+                        by_subject.setdefault(subject.group(0), set()).add(pos)
+            self._students, self._by_key, self._by_subject = students, by_key, by_subject
+            self._sorted_keys, self._sorted_subjects = sorted(by_key), sorted(by_subject)
+            self._mtime = mtime
+
+    @property
+    def version(self) -> Optional[float]:
+        """Changes whenever the roster is reloaded; lets derived indexes know to rebuild."""
+        self._refresh()
+        return self._mtime
+
+    def all(self) -> StudentStore:
+        """Every student, as a sequence of dicts built on access."""
+        self._refresh()
+        return self._students
+
+    def _positions_for(self, token: str) -> Set[int]:
+        prefix = course_key(token)
+        if not prefix:
+            return set()
+        # A purely alphabetic prefix can only match within the subject part of a key.
+        if prefix.isalpha():
+            index, keys = self._by_subject, self._sorted_subjects
+        else:
+            index, keys = self._by_key, self._sorted_keys
+        out: Set[int] = set()
+        for key in _prefix_range(keys, prefix):
+            out |= index[key]
+        return out
+
+    def match_positions(self, tokens: Iterable[str]) -> List[int]:
+        """Roster positions of students with at least one course starting with any token (e.g. 'CSE', 'CSE 310')."""
+        self._refresh()
+        hits: Set[int] = set()
+        for t in tokens:
+            hits |= self._positions_for(t)
+        return sorted(hits)
+
+
+students = StudentRepository()
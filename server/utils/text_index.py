@@ -0,0 +1,425 @@
+import json
+import math
+import os
+import re
+import threading
+import uuid
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from server.config.matching import matching
+from server.utils.students import course_key, students as student_repo
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    # Bound by _load_numpy() when the first index is built or loaded, like scoring.py.
+    np = None
+
+
+def _load_numpy() -> None:
+    global np
+    if np is None:
+        import numpy as np
+
+
+# Weight of each kind of term before IDF; courses dominate as in the roster scorer.
+FIELD_WEIGHTS = {
+    'course': 3.0,
+    'subject': 1.0,
+    'level': 0.5,
+    'major': 1.5,
+    'word': 1.0,
+    'bigram': 0.5,
+}
+# Document frequencies are kept per hashed bucket rather than per term.
+DF_BUCKETS = 1 << 20
+_SEED_DIM = 0x9E3779B9
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#']*")
+_SUBJECT_RE = re.compile(r'[A-Z]+')
+_STOPWORDS = frozenset(
+    "a about am an and are as at be but by for from have i i'm im in is it looking me my of on or so "
+    "the to want we with you your".split()
+)
+# Profile fields kept for ids upserted outside the roster, so a rebuild can re-vectorize them.
+PROFILE_FIELDS = ('name', 'major', 'year', 'courses', 'bio')
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def profile_terms(p: dict) -> Dict[str, float]:
+    """Weighted terms for a profile's courses, major and bio (keys as in students.json)."""
+    terms: Dict[str, float] = {}
+
+    def add(term: str, weight: float) -> None:
+        terms[term] = terms.get(term, 0.0) + weight
+
+    courses = p.get('courses') or []
+    if isinstance(courses, str):
+        courses = courses.split(',')
+    for c in courses:
+        key = course_key(str(c).strip())
+        if not key:
+            continue
+        add('course:' + key, FIELD_WEIGHTS['course'])
+        subject = _SUBJECT_RE.match(key)
+        if subject:
+            add('subject:' + subject.group(0), FIELD_WEIGHTS['subject'])
+            level = key[subject.end():subject.end() + 1]
+            if level.isdigit():
+                add('level:' + subject.group(0) + level, FIELD_WEIGHTS['level'])
+    if p.get('major'):
+        major = str(p['major'])
+        add('major:' + major.strip().lower(), FIELD_WEIGHTS['major'])
+        for w in _words(major):
+            add('word:' + w, FIELD_WEIGHTS['word'])
+    if p.get('bio'):
+        words = _words(str(p['bio']))
+        counts: Dict[str, int] = {}
+        for w in words:
+            counts[w] = counts.get(w, 0) + 1
+        for w, n in counts.items():
+            # Sublinear tf: a word repeated through a long bio shouldn't swamp the courses.
+            add('word:' + w, FIELD_WEIGHTS['word'] * (1.0 + math.log(n)))
+        for a, b in zip(words, words[1:]):
+            add('bigram:' + a + '_' + b, FIELD_WEIGHTS['bigram'])
+    return terms
+
+
+class SimilarityIndex:
+    """Approximate nearest neighbours over hashed TF-IDF profile vectors.
+
+    Each profile's terms (``profile_terms``) are hashed with a random sign into a
+    ``dim``-wide float32 vector, weighted by IDF and L2-normalized, so cosine
+    similarity is a dot product and no vocabulary is stored. Stable CRC32 hashes
+    keep vectors comparable across processes and saved files.
+
+    Built rows are clustered with spherical k-means (about sqrt(n) clusters) and
+    stored cluster by cluster, so a query scores the centroids and then only the
+    contiguous rows of the ``probes`` nearest clusters. Rows inserted later go to
+    an in-memory tail that is always scanned exhaustively; replaced rows are
+    masked out. ``save`` compacts everything into a fresh clustered layout and
+    ``load`` memory-maps it back.
+
+    Not thread-safe: build and save an index before publishing it, then query
+    and upsert from one thread.
+    """
+
+    def __init__(self, dim: int, probes: int = 8, min_cluster_rows: int = 4096):
+        _load_numpy()
+        self.dim = dim
+        self.probes = probes
+        self.min_cluster_rows = min_cluster_rows
+        self.df = np.zeros(DF_BUCKETS, dtype=np.uint32)
+        self.docs = 0
+        self.roster_version = None
+        # row -> id for base rows then tail rows; id -> its live row
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.base = np.zeros((0, dim), dtype=np.float32)
+        # base rows of cluster c are base[offsets[c]:offsets[c + 1]]
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self._tail = np.zeros((64, dim), dtype=np.float32)
+        self._tail_len = 0
+        self._alive = np.ones(64, dtype=bool)
+        self.profiles: Dict[str, dict] = {}
+        self.dirty = False
+        self._hashes: Dict[str, Tuple[int, int, float]] = {}
+
+    def _hash(self, term: str) -> Tuple[int, int, float]:
+        cached = self._hashes.get(term)
+        if cached is None:
+            data = term.encode('utf-8')
+            h = zlib.crc32(data)
+            g = zlib.crc32(data, _SEED_DIM)
+            cached = (h % DF_BUCKETS, g % self.dim, 1.0 if g & 0x80000000 else -1.0)
+            if len(self._hashes) < 1 << 18:
+                self._hashes[term] = cached
+        return cached
+
+    def _count(self, terms: Dict[str, float]) -> None:
+        for term in terms:
+            self.df[self._hash(term)[0]] += 1
+        self.docs += 1
+
+    def _vector(self, terms: Dict[str, float], out=None):
+        v = np.zeros(self.dim, dtype=np.float32) if out is None else out
+        # Accumulated in Python and written once: per-element NumPy indexing dominates otherwise.
+        slots: Dict[int, float] = {}
+        df = self.df
+        log_docs = math.log(1.0 + self.docs)
+        for term, weight in terms.items():
+            bucket, slot, sign = self._hash(term)
+            idf = log_docs - math.log(1.0 + int(df[bucket])) + 1.0
+            slots[slot] = slots.get(slot, 0.0) + sign * weight * idf
+        norm = math.sqrt(sum(x * x for x in slots.values()))
+        if norm > 0:
+            v[list(slots)] = [x / norm for x in slots.values()]
+        return v
+
+    def vectorize(self, profile: dict):
+        return self._vector(profile_terms(profile))
+
+    @classmethod
+    def build(cls, profiles: Iterable[Tuple[str, dict]], dim: int, probes: int = 8, min_cluster_rows: int = 4096) -> 'SimilarityIndex':
+        index = cls(dim, probes, min_cluster_rows)
+        ids, terms = [], []
+        for doc_id, profile in profiles:
+            t = profile_terms(profile)
+            index._count(t)
+            ids.append(doc_id)
+            terms.append(t)
+        vectors = np.zeros((len(ids), dim), dtype=np.float32)
+        for row, t in enumerate(terms):
+            index._vector(t, vectors[row])
+        index._layout(ids, vectors)
+        return index
+
+    def _layout(self, ids: List[str], vectors) -> None:
+        n = len(ids)
+        clusters = 1 if n < self.min_cluster_rows else max(1, int(math.sqrt(n)))
+        centroids = _spherical_kmeans(vectors, clusters)
+        assign = np.zeros(n, dtype=np.int64)
+        for start in range(0, n, 16384):
+            block = vectors[start:start + 16384]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        self.base = np.ascontiguousarray(vectors[order])
+        self.offsets = np.searchsorted(assign[order], np.arange(clusters + 1)).astype(np.int64)
+        self.centroids = centroids
+        self.ids = [ids[i] for i in order]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._tail = np.zeros((64, self.dim), dtype=np.float32)
+        self._tail_len = 0
+        self._alive = np.ones(n + len(self._tail), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.rows
+
+    def _row_vector(self, row: int):
+        nb = len(self.base)
+        return np.asarray(self.base[row]) if row < nb else self._tail[row - nb]
+
+    def vector_of(self, doc_id: str):
+        row = self.rows.get(doc_id)
+        return None if row is None else self._row_vector(row)
+
+    def upsert(self, doc_id: str, profile: dict, keep_profile: bool = False) -> None:
+        terms = profile_terms(profile)
+        if doc_id not in self.rows:
+            self._count(terms)
+        self.remove(doc_id)
+        if self._tail_len == len(self._tail):
+            self._tail = np.concatenate([self._tail, np.zeros_like(self._tail)])
+            self._alive = np.concatenate([self._alive, np.ones(len(self._tail) - self._tail_len, dtype=bool)])
+        self._vector(terms, self._tail[self._tail_len])
+        row = len(self.base) + self._tail_len
+        self._tail_len += 1
+        self.ids.append(doc_id)
+        self.rows[doc_id] = row
+        if keep_profile:
+            self.profiles[doc_id] = {f: profile.get(f) for f in PROFILE_FIELDS if profile.get(f) is not None}
+        self.dirty = True
+
+    def remove(self, doc_id: str) -> bool:
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self.dirty = True
+        return True
+
+    def query(self, vector, k: int = 10, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-k (id, cosine similarity) for a unit vector, best first."""
+        rows, scores = [], []
+        clusters = len(self.centroids)
+        if len(self.base) and clusters:
+            if clusters <= self.probes:
+                probe = range(clusters)
+            else:
+                probe = np.argpartition(-(self.centroids @ vector), self.probes - 1)[:self.probes]
+            for c in probe:
+                start, end = int(self.offsets[c]), int(self.offsets[c + 1])
+                if end > start:
+                    rows.append(np.arange(start, end))
+                    scores.append(np.asarray(self.base[start:end]) @ vector)
+        if self._tail_len:
+            rows.append(np.arange(len(self.base), len(self.base) + self._tail_len))
+            scores.append(self._tail[:self._tail_len] @ vector)
+        if not rows:
+            return []
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+        scores[~self._alive[rows]] = -np.inf
+        skip = self.rows.get(exclude) if exclude is not None else None
+        if skip is not None:
+            scores[rows == skip] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.ids[int(rows[i])], round(float(scores[i]), 4)) for i in top if scores[i] > -np.inf]
+
+    def save(self, path: str) -> None:
+        """Compact live rows into a new clustered layout and write it under ``path``.
+
+        Files carry a generation suffix and ``meta.json`` is replaced last, so a
+        crash mid-save leaves the previous index loadable.
+        """
+        live = sorted(self.rows.items(), key=lambda item: item[1])
+        ids = [doc_id for doc_id, _ in live]
+        vectors = np.zeros((len(ids), self.dim), dtype=np.float32)
+        for i, (_, row) in enumerate(live):
+            vectors[i] = self._row_vector(row)
+        self._layout(ids, vectors)
+        os.makedirs(path, exist_ok=True)
+        gen = uuid.uuid4().hex[:8]
+        files = {name: f'{name}-{gen}.npy' for name in ('vectors', 'offsets', 'centroids', 'df')}
+        np.save(os.path.join(path, files['vectors']), self.base)
+        np.save(os.path.join(path, files['offsets']), self.offsets)
+        np.save(os.path.join(path, files['centroids']), self.centroids)
+        np.save(os.path.join(path, files['df']), self.df)
+        meta = {
+            'dim': self.dim,
+            'docs': self.docs,
+            'roster_version': self.roster_version,
+            'files': files,
+            'ids': self.ids,
+            'profiles': self.profiles,
+        }
+        tmp = os.path.join(path, f'meta-{gen}.json')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+        for name in os.listdir(path):
+            if name.endswith('.npy') and name not in files.values():
+                os.remove(os.path.join(path, name))
+        self.dirty = False
+
+    @staticmethod
+    def read_meta(path: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, path: str, probes: int = 8, min_cluster_rows: int = 4096) -> Optional['SimilarityIndex']:
+        """The index saved under ``path`` with its vectors memory-mapped, or None if there isn't one."""
+        meta = cls.read_meta(path)
+        if meta is None:
+            return None
+        index = cls(meta['dim'], probes, min_cluster_rows)
+        files = meta['files']
+        index.base = np.load(os.path.join(path, files['vectors']), mmap_mode='r')
+        index.offsets = np.load(os.path.join(path, files['offsets']))
+        index.centroids = np.load(os.path.join(path, files['centroids']))
+        index.df = np.array(np.load(os.path.join(path, files['df'])), dtype=np.uint32)
+        index.docs = meta['docs']
+        index.roster_version = meta.get('roster_version')
+        index.ids = list(meta['ids'])
+        index.rows = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        index.profiles = meta.get('profiles') or {}
+        index._alive = np.ones(len(index.ids) + len(index._tail), dtype=bool)
+        return index
+
+    def stats(self) -> dict:
+        return {
+            'rows': len(self.rows),
+            'base_rows': len(self.base),
+            'tail_rows': self._tail_len,
+            'clusters': len(self.centroids),
+            'dim': self.dim,
+            'mmapped': isinstance(self.base, np.memmap),
+            'dirty': self.dirty,
+        }
+
+
+def _spherical_kmeans(vectors, clusters: int, iterations: int = 8, sample: int = 64):
+    """Unit-norm centroids fitted on a sample of at most ``sample`` rows per cluster."""
+    n = len(vectors)
+    if clusters <= 1 or n <= clusters:
+        c = vectors.sum(axis=0, keepdims=True) if n else np.zeros((1, vectors.shape[1]), dtype=np.float32)
+        norm = np.linalg.norm(c)
+        return (c / norm if norm > 0 else c).astype(np.float32)
+    rng = np.random.default_rng(0)
+    points = vectors[rng.choice(n, size=min(n, clusters * sample), replace=False)]
+    centroids = points[rng.choice(len(points), size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(points @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, points)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Reseed empty clusters from random points rather than losing them.
+        sums[empty] = points[rng.choice(len(points), size=int(empty.sum()))]
+        norms[empty] = np.linalg.norm(sums[empty], axis=1)
+        centroids = sums / np.maximum(norms, 1e-12)[:, None]
+    return centroids.astype(np.float32)
+
+
+_index: Optional[SimilarityIndex] = None
+# Warmup builds the index on a worker thread while requests may build it on the
+# loop; without the lock a late build could replace one already holding upserts.
+_index_lock = threading.Lock()
+
+
+def _roster_profiles(extra: Dict[str, dict]) -> Iterable[Tuple[str, dict]]:
+    for s in student_repo.all():
+        doc_id = str(s.get('id'))
+        if doc_id not in extra:
+            yield doc_id, s
+    yield from extra.items()
+
+
+def similarity_index() -> SimilarityIndex:
+    """Index over students.json plus upserted profiles; loaded from ``MATCH_INDEX_PATH``
+    when saved for the current roster, otherwise built (and saved) and rebuilt when
+    the roster file changes."""
+    version = student_repo.version
+    index = _index
+    if index is not None and index.roster_version == version:
+        return index
+    with _index_lock:
+        return _load_or_build(version)
+
+
+def _load_or_build(version) -> SimilarityIndex:
+    global _index
+    if _index is not None and _index.roster_version == version:
+        return _index
+    path = matching.index_path
+    index = None
+    if _index is None and path:
+        loaded = SimilarityIndex.load(path, matching.probes, matching.min_cluster_rows)
+        if loaded is not None and loaded.roster_version == version and loaded.dim == matching.dim:
+            index = loaded
+    if index is None:
+        if _index is not None:
+            profiles = _index.profiles
+        else:
+            profiles = (SimilarityIndex.read_meta(path) or {}).get('profiles') or {} if path else {}
+        index = SimilarityIndex.build(_roster_profiles(profiles), matching.dim, matching.probes, matching.min_cluster_rows)
+        index.profiles = dict(profiles)
+        index.roster_version = version
+        if path:
+            index.save(path)
+    _index = index
+    return index
+
+
+def save_similarity_index() -> None:
+    if _index is not None and _index.dirty and matching.index_path:
+        _index.save(matching.index_path)
+
+
+def index_stats() -> dict:
+    return _index.stats() if _index is not None else {'rows': 0}
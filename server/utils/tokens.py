@@ -0,0 +1,58 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+
+# Alternate spellings mapped to the subject codes used in course listings.
+ALIASES = {
+    'BIOL': 'BIO',
+    'BIOLOGY': 'BIO',
+    'ECON': 'ECN',
+    'ECONOMICS': 'ECN',
+    'MATH': 'MAT',
+    'PSYCH': 'PSY',
+}
+
+SUBJECTS = ('BIO', 'BIOL', 'BIOLOGY', 'ECN', 'ECON', 'ECONOMICS', 'CSE', 'CS', 'EE', 'EEE', 'MAT', 'MATH', 'PSY', 'PSYCH')
+
+# One pass: a course code like "CSE 230" / "CSE-230" / "CSE230", or a bare subject word.
+# Longer subject spellings come first so the alternation never stops at a prefix.
+_TOKEN_RE = re.compile(
+    r'\b(?:([A-Z]{2,4})\s?-?\s?(\d{2,3})|('
+    + '|'.join(sorted(SUBJECTS, key=len, reverse=True))
+    + r'))\b'
+)
+_WS_RE = re.compile(r'\s+')
+
+
+def canonical_subject(subject: str) -> str:
+    return ALIASES.get(subject, subject)
+
+
+@lru_cache(maxsize=4096)
+def _tokens(normalized: str) -> Tuple[str, ...]:
+    tokens = set()
+    for code_subject, number, subject in _TOKEN_RE.findall(normalized):
+        if number:
+            code_subject = canonical_subject(code_subject)
+            tokens.add(f'{code_subject} {number}')
+            tokens.add(f'{code_subject}{number}')
+            tokens.add(code_subject)
+        else:
+            tokens.add(canonical_subject(subject))
+    return tuple(sorted(tokens))
+
+
+def extract_tokens(text: str) -> List[str]:
+    """Canonical course/subject tokens, e.g. 'Math 243, biology' -> ['BIO', 'MAT', 'MAT 243', 'MAT243']."""
+    if not text:
+        return []
+    return list(_tokens(_WS_RE.sub(' ', text.upper()).strip()))
+
+
+def extract_many(texts: Iterable[str]) -> List[List[str]]:
+    return [extract_tokens(t) for t in texts]
+
+
+def cache_info():
+    return _tokens.cache_info()
@@ -0,0 +1,214 @@
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional, Tuple
+
+from server.config.gemini import gemini
+
+
+# Upstream statuses worth another attempt; other 4xx are the request's fault.
+RETRIABLE = frozenset({429, 500, 502, 503, 504})
+_RETRY_DELAY_RE = re.compile(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"')
+
+
+def parse_retry_after(header: Optional[str], body: str = '') -> Optional[float]:
+    """Seconds from a Retry-After header (delta or HTTP date) or a RetryInfo ``retryDelay`` in the body."""
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    m = _RETRY_DELAY_RE.search(body or '')
+    return float(m.group(1)) if m else None
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose rate adapts AIMD-style: halved on 429 (and paused for
+    Retry-After), cut on upstream errors, raised a little on every success."""
+
+    def __init__(self, max_rate: float, min_rate: float, burst: float):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.rate = max_rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token, possibly on credit; returns how long to wait before using it."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate, self.paused_until - now)
+
+    def refund(self) -> None:
+        self.tokens += 1
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+    def on_throttle(self, retry_after: Optional[float]) -> None:
+        self.throttled += 1
+        self._refill(time.monotonic())
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def on_error(self) -> None:
+        self._refill(time.monotonic())
+        self.rate = max(self.min_rate, self.rate * 0.8)
+
+
+class CircuitBreaker:
+    """closed -> open when recent calls fail too often -> half_open after a cooldown,
+    where one probe decides between closed and open again (with a longer cooldown)."""
+
+    def __init__(self, window: int, min_calls: int, failure_ratio: float, cooldown: float, max_cooldown: float):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.open_until = 0.0
+        self.probing = False
+        self.opened = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+
+    def allow(self) -> bool:
+        if self.state == 'open':
+            if time.monotonic() < self.open_until:
+                return False
+            self.state, self.probing = 'half_open', False
+        if self.state == 'half_open':
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def retry_in(self) -> float:
+        return max(0.0, self.open_until - time.monotonic())
+
+    def abandon(self) -> None:
+        # The admitted call never produced an outcome (cancelled or out of budget).
+        self.probing = False
+
+    def record(self, ok: bool, retry_after: Optional[float] = None) -> None:
+        if self.state == 'half_open':
+            self.probing = False
+            if ok:
+                self.state = 'closed'
+                self.cooldown = self.base_cooldown
+                self._outcomes.clear()
+            else:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open(retry_after)
+            return
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio:
+            self._open(retry_after)
+
+    def _open(self, retry_after: Optional[float]) -> None:
+        self.state = 'open'
+        self.opened += 1
+        self.open_until = time.monotonic() + max(self.cooldown, retry_after or 0.0)
+        self._outcomes.clear()
+
+
+class ModelGuard:
+    """Admission control for calls to one model: circuit breaker, then rate budget."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.bucket = AdaptiveTokenBucket(gemini.rate_limit_rps, gemini.rate_limit_min_rps, gemini.rate_limit_burst)
+        self.breaker = CircuitBreaker(
+            gemini.breaker_window, gemini.breaker_min_calls, gemini.breaker_failure_ratio,
+            gemini.breaker_cooldown, gemini.breaker_max_cooldown,
+        )
+        self.short_circuited = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    async def admit(self, deadline: float) -> Optional[Tuple[int, str, float]]:
+        """Wait for a token if it arrives before ``deadline`` (monotonic). Returns None
+        when the call may go ahead, else (status, detail, retry_after): 503 while the
+        circuit is open, 429 when the rate budget cannot be met in time."""
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            return 503, f'{self.model} is temporarily unavailable (circuit open)', self.breaker.retry_in()
+        wait = self.bucket.reserve()
+        if time.monotonic() + wait >= deadline:
+            self.bucket.refund()
+            self.breaker.abandon()
+            self.rate_limited += 1
+            return 429, f'{self.model} rate budget exhausted', wait
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+        return None
+
+    def record(self, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """Outcome of an admitted call; ``status`` None means timeout or transport error."""
+        if status == 429:
+            self.bucket.on_throttle(retry_after)
+            self.breaker.record(False, retry_after)
+        elif status is None or status >= 500:
+            self.bucket.on_error()
+            self.breaker.record(False, retry_after)
+        else:
+            self.bucket.on_success()
+            self.breaker.record(True)
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Full jitter, but never sooner than the server asked for.
+        delay = random.uniform(0, min(gemini.retry_cap, gemini.retry_base * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    def stats(self) -> dict:
+        return {
+            'state': self.breaker.state,
+            'open_for_s': round(self.breaker.retry_in(), 2),
+            'opened': self.breaker.opened,
+            'rate_rps': round(self.bucket.rate, 2),
+            'throttled': self.bucket.throttled,
+            'short_circuited': self.short_circuited,
+            'rate_limited': self.rate_limited,
+            'retries': self.retries,
+        }
+
+
+_guards: Dict[str, ModelGuard] = {}
+
+
+def guard(model: str) -> ModelGuard:
+    g = _guards.get(model)
+    if g is None:
+        g = _guards[model] = ModelGuard(model)
+    return g
+
+
+def available(model: str) -> bool:
+    """False while the model's circuit is open, so callers with a local fallback can skip the wait."""
+    g = _guards.get(model)
+    return g is None or g.breaker.state != 'open' or g.breaker.retry_in() == 0
+
+
+def stats() -> dict:
+    return {model: g.stats() for model, g in _guards.items()}